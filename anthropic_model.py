@@ -4,12 +4,28 @@ import logging
 import anthropic
 from dotenv import load_dotenv
 
+from repair import extract_json
+from tracing import span, record_usage
+
 load_dotenv()
-client = anthropic.Anthropic()
+_client = None
+
+
+def get_client():
+    """Shared Anthropic client, created on first use so offline runs don't need an API key."""
+    global _client
+    if _client is None:
+        _client = anthropic.Anthropic()
+    return _client
+
 
 MAX_RETRIES = 3
 RETRY_DELAY_BASE = 1
 
+# Exchanges kept in a threaded conversation. Every prompt restates the player's role and
+# situation, so older turns can go; the first kept turn notes how many were dropped.
+MAX_HISTORY_TURNS = 12
+
 SYSTEM_PROMPT = """You are an AI playing Among Us, a social deduction game.
 You are one of 6 players on a spaceship with 5 rooms: Cafeteria, Electrical, MedBay, Navigation, Reactor.
 There is 1 impostor and 5 crewmates. The impostor tries to kill crewmates; crewmates try to find and eject the impostor.
@@ -47,53 +63,136 @@ VOTE_SCHEMA = {
     "additionalProperties": False
 }
 
+SCHEMAS = {
+    "action": ACTION_SCHEMA,
+    "discussion": DISCUSSION_SCHEMA,
+    "vote": VOTE_SCHEMA,
+}
 
-def _call_claude(prompt: str, model: str, use_thinking: bool, schema: dict) -> tuple[dict, str | None]:
-    """Generic Claude API call with structured output. Returns (parsed_dict, thinking_summary)."""
+BETAS = ["structured-outputs-2025-11-13"]
+
+
+def _build_messages(prompt: str, conversation: dict | None):
+    """Build (system, messages) for a call.
+
+    Stateless calls send the bare prompt. Threaded calls replay the conversation's
+    message history and put cache breakpoints on the system prompt and on the newest
+    user turn, so everything before it is read from the prompt cache.
+    """
+    if conversation is None:
+        return SYSTEM_PROMPT, [{"role": "user", "content": prompt}]
+
+    system = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+    new_turn = {
+        "role": "user",
+        "content": [{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}],
+    }
+    return system, conversation.get("messages", []) + [new_turn]
+
+
+def _trim_history(conversation: dict, messages: list) -> list:
+    """Cap a conversation's messages at MAX_HISTORY_TURNS user/assistant pairs.
+
+    Past the cap the oldest half is dropped at once, so the cached prompt prefix only
+    changes every MAX_HISTORY_TURNS / 2 turns instead of on every turn.
+    """
+    turns = len(messages) // 2
+    if turns <= MAX_HISTORY_TURNS:
+        return messages
+    excess = turns - MAX_HISTORY_TURNS // 2
+    dropped = conversation["dropped_turns"] = conversation.get("dropped_turns", 0) + excess
+    # The old first turn (the only one carrying a note) is always among the dropped ones
+    first, rest = messages[2 * excess], messages[2 * excess + 1:]
+    note = f"[{dropped} earlier turns of this game are no longer shown.]\n\n"
+    return [{"role": "user", "content": [{"type": "text", "text": note + first["content"][0]["text"]}]}] + rest
+
+
+def _request_params(prompt: str, model: str, use_thinking: bool, schema: dict,
+                    conversation: dict | None = None) -> dict:
+    """Messages API parameters shared by live calls and batch requests."""
+    system, messages = _build_messages(prompt, conversation)
+    params = {
+        "model": model,
+        "max_tokens": 2048,
+        "system": system,
+        "messages": messages,
+        "output_format": {"type": "json_schema", "schema": schema},
+    }
+
+    if use_thinking:
+        params["thinking"] = {"type": "enabled", "budget_tokens": 1024}
+    return params
+
+
+def _parse_content(content, use_thinking: bool) -> tuple[str, str | None]:
+    """Split response content blocks into (json_text, thinking_summary)."""
+    # Extract thinking
+    thinking_summary = None
+    if use_thinking:
+        thinking_parts = []
+        for block in content:
+            if getattr(block, "type", None) == "thinking":
+                s = getattr(block, "thinking", None) or getattr(block, "summary", None) or ""
+                if s:
+                    thinking_parts.append(s)
+        if thinking_parts:
+            thinking_summary = "\n".join(thinking_parts).strip()
+
+    # Extract JSON
+    json_text = ""
+    for block in content:
+        if getattr(block, "type", None) == "text":
+            t = getattr(block, "text", "") or ""
+            if t.strip():
+                json_text += t
+    return json_text, thinking_summary
+
+
+def _call_claude(prompt: str, model: str, use_thinking: bool, schema: dict,
+                 conversation: dict | None = None) -> tuple[dict, str | None]:
+    """Generic Claude API call with structured output. Returns (parsed_dict, thinking_summary).
+
+    If a conversation dict is given, the exchange is appended to its message list on success.
+    """
     for attempt in range(MAX_RETRIES):
-        kwargs = {
-            "model": model,
-            "max_tokens": 2048,
-            "betas": ["structured-outputs-2025-11-13"],
-            "system": SYSTEM_PROMPT,
-            "messages": [{"role": "user", "content": prompt}],
-            "output_format": {"type": "json_schema", "schema": schema},
-        }
-
-        if use_thinking:
-            kwargs["thinking"] = {"type": "enabled", "budget_tokens": 1024}
-
-        response = client.beta.messages.create(**kwargs)
-
-        # Extract thinking
-        thinking_summary = None
-        if use_thinking:
-            thinking_parts = []
-            for block in response.content:
-                if getattr(block, "type", None) == "thinking":
-                    s = getattr(block, "thinking", None) or getattr(block, "summary", None) or ""
-                    if s:
-                        thinking_parts.append(s)
-            if thinking_parts:
-                thinking_summary = "\n".join(thinking_parts).strip()
-
-        # Extract JSON
-        json_text = ""
-        for block in response.content:
-            if getattr(block, "type", None) == "text":
-                t = getattr(block, "text", "") or ""
-                if t.strip():
-                    json_text += t
+        kwargs = _request_params(prompt, model, use_thinking, schema, conversation)
+        kwargs["betas"] = BETAS
+
+        with span("anthropic.messages.create", "network", model=model, attempt=attempt + 1) as s:
+            response = get_client().beta.messages.create(**kwargs)
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                s.set(input_tokens=usage.input_tokens, output_tokens=usage.output_tokens,
+                      cache_read_tokens=getattr(usage, "cache_read_input_tokens", None))
+                record_usage(usage.input_tokens, usage.output_tokens)
+        json_text, thinking_summary = _parse_content(response.content, use_thinking)
 
         if not json_text.strip():
             if attempt < MAX_RETRIES - 1:
                 delay = RETRY_DELAY_BASE * (2 ** attempt)
                 logging.warning(f"Claude returned empty response, retry {attempt+1}/{MAX_RETRIES} in {delay}s")
-                time.sleep(delay)
+                with span("retry_backoff", delay=delay):
+                    time.sleep(delay)
                 continue
             raise RuntimeError(f"No text response from Claude after {MAX_RETRIES} attempts.")
 
-        data = json.loads(json_text)
+        try:
+            with span("json_parse", chars=len(json_text)):
+                data = json.loads(json_text)
+        except ValueError:
+            try:
+                data = extract_json(json_text)
+                logging.info(f"Repaired malformed JSON from Claude: {json_text[:200]!r}")
+            except ValueError:
+                if attempt < MAX_RETRIES - 1:
+                    logging.warning(f"Claude returned no usable JSON, retry {attempt+1}/{MAX_RETRIES}: {json_text[:200]!r}")
+                    continue
+                raise
+        if conversation is not None:
+            conversation["messages"] = _trim_history(conversation, conversation.get("messages", []) + [
+                {"role": "user", "content": [{"type": "text", "text": prompt}]},
+                {"role": "assistant", "content": json_text},
+            ])
         return data, thinking_summary
 
     raise RuntimeError("Unexpected error in _call_claude")
@@ -101,16 +200,34 @@ def _call_claude(prompt: str, model: str, use_thinking: bool, schema: dict) -> t
 
 # ─── Public API Functions ─────────────────────────────────────────────
 
-def call_claude_action(prompt: str, model: str, use_thinking: bool) -> tuple[dict, str | None]:
+def call_claude_action(prompt: str, model: str, use_thinking: bool,
+                       conversation: dict | None = None) -> tuple[dict, str | None]:
     """Call Claude for an action decision. Returns (action_dict, reasoning)."""
-    return _call_claude(prompt, model, use_thinking, ACTION_SCHEMA)
+    return _call_claude(prompt, model, use_thinking, ACTION_SCHEMA, conversation)
 
 
-def call_claude_discussion(prompt: str, model: str, use_thinking: bool) -> tuple[dict, str | None]:
+def call_claude_discussion(prompt: str, model: str, use_thinking: bool,
+                           conversation: dict | None = None) -> tuple[dict, str | None]:
     """Call Claude for a discussion statement. Returns (discussion_dict, reasoning)."""
-    return _call_claude(prompt, model, use_thinking, DISCUSSION_SCHEMA)
+    return _call_claude(prompt, model, use_thinking, DISCUSSION_SCHEMA, conversation)
 
 
-def call_claude_vote(prompt: str, model: str, use_thinking: bool) -> tuple[dict, str | None]:
+def call_claude_vote(prompt: str, model: str, use_thinking: bool,
+                     conversation: dict | None = None) -> tuple[dict, str | None]:
     """Call Claude for a vote decision. Returns (vote_dict, reasoning)."""
-    return _call_claude(prompt, model, use_thinking, VOTE_SCHEMA)
+    return _call_claude(prompt, model, use_thinking, VOTE_SCHEMA, conversation)
+
+
+# ─── Batch Requests ───────────────────────────────────────────────────
+
+def build_batch_params(prompt_type: str, prompt: str, model: str, use_thinking: bool) -> dict:
+    """Params for one request of a Message Batches submission (betas are set on the batch)."""
+    return _request_params(prompt, model, use_thinking, SCHEMAS[prompt_type])
+
+
+def parse_batch_message(message, use_thinking: bool) -> tuple[dict, str | None]:
+    """Parse a succeeded batch result message. Returns (result_dict, reasoning)."""
+    json_text, thinking_summary = _parse_content(message.content, use_thinking)
+    if not json_text.strip():
+        raise RuntimeError("No text response in Claude batch result.")
+    return extract_json(json_text), thinking_summary
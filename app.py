@@ -1,17 +1,40 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, send_from_directory, make_response
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
+import contextvars
+import json
+import logging
 import random
 from datetime import datetime
 import time
+import uuid
 import os
 
 from openai_model import call_gpt_action, call_gpt_discussion, call_gpt_vote
 from anthropic_model import call_claude_action, call_claude_discussion, call_claude_vote
+from repair import build_index, mentioned_names, resolve_name
+from stub_model import call_stub
+import tracing
+from tracing import span, traced
+from game_store import open_store
+from spectator_hub import SpectatorHub, HubFull, LONG_POLL_TIMEOUT
+from serialization import FastJSONProvider, compress_response
+from results_store import get_store as get_results_store
+from leaderboard import Leaderboard
+import replay
+from archive import get_archive
+import assets
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
+app.json = FastJSONProvider(app)
+app.jinja_env.globals.update(asset=assets.asset_url, has_asset=assets.has_asset)
 
-# Server-side game state
-GAME_STATE = {}
+# Server-side game state, shared by all worker processes (see game_store.py)
+STORE = open_store()
+
+# Identifies this process in phase leases
+WORKER_ID = f"{os.uname().nodename}:{os.getpid()}"
 
 # Map configuration
 ROOMS = ['Cafeteria', 'Electrical', 'MedBay', 'Navigation', 'Reactor']
@@ -77,8 +100,56 @@ CLAUDE_DISPLAY_NAMES = {
 
 NON_THINKING_CLAUDE = {'claude-haiku-4.5-standard', 'claude-sonnet-4.5-standard'}
 
+# How a meeting's statements are produced (see execute_discussion_phase)
+DISCUSSION_MODES = ('sequential', 'simultaneous')
+
+# Indexes for repairing names in model answers (see repair.py)
+ROOM_ALIASES = {
+    'Cafe': 'Cafeteria', 'Caf': 'Cafeteria', 'Mess Hall': 'Cafeteria',
+    'Elec': 'Electrical', 'Electric': 'Electrical', 'Electricity': 'Electrical',
+    'Med': 'MedBay', 'Med Bay': 'MedBay', 'Medical': 'MedBay', 'Medical Bay': 'MedBay',
+    'Nav': 'Navigation', 'Navigations': 'Navigation',
+    'Reactors': 'Reactor', 'Reactor Room': 'Reactor',
+}
+ROOM_INDEX = build_index(ROOMS, ROOM_ALIASES)
+
+ACTIONS = ['do_task', 'fake_task', 'kill', 'wait']
+ACTION_INDEX = build_index(ACTIONS, {
+    'task': 'do_task', 'do a task': 'do_task', 'complete task': 'do_task',
+    'fake': 'fake_task', 'pretend task': 'fake_task',
+    'move': 'wait', 'observe': 'wait', 'look around': 'wait', 'idle': 'wait', 'none': 'wait',
+})
+
+# Player names (and ids) plus every way of saying "skip"
+VOTE_INDEX = build_index([p['name'] for p in PLAYER_DEFS] + ['skip'], {
+    **{p['id']: p['name'] for p in PLAYER_DEFS},
+    'none': 'skip', 'no one': 'skip', 'nobody': 'skip', 'abstain': 'skip', 'no vote': 'skip', 'pass': 'skip',
+})
+PLAYER_INDEX = {k: v for k, v in VOTE_INDEX.items() if v != 'skip'}
+
+# Keep only the most recent repairs per game
+REPAIR_LOG_LIMIT = 50
+
+# Model text kept in the game state. Thinking models can return tens of kilobytes
+# of reasoning per call; the UI shows the first 500 characters of it.
+REASONING_MAX_CHARS = 4000
+STATEMENT_MAX_CHARS = 600  # discussion statements and vote reasons
+
+# Events kept per game; older ones are replaced by a single summary line (see trim_event_log).
+# discussion_log needs no limit: it is cleared at every meeting.
+EVENT_LOG_LIMIT = 300
+
+CREWMATE_ACTION_FORMAT = '{"room": "RoomName", "action": "do_task" | "wait", "target": null}'
+IMPOSTOR_ACTION_FORMAT = '{"room": "RoomName", "action": "fake_task" | "kill" | "wait", "target": "PlayerName" | null}'
+VOTE_FORMAT = '{"vote": "PlayerName" | "skip", "reason": "Brief reason for your vote"}'
+
+# Threaded conversations older than this are dropped and the player goes back to
+# stateless prompts (provider-side prompt caches expire after ~5 minutes anyway).
+CONVERSATION_TTL = 300
+
 
-def init_game_state(gpt_model='gpt-5.1', claude_model='claude-haiku-4.5'):
+def init_game_state(gpt_model='gpt-5.1', claude_model='claude-haiku-4.5', conversation_mode=False, backend='live',
+                    discussion_mode='sequential', speculative_votes=False):
     """Initialize a fresh Among Us game."""
     # Create players
     players = []
@@ -115,6 +186,7 @@ def init_game_state(gpt_model='gpt-5.1', claude_model='claude-haiku-4.5'):
     total_needed = sum(1 for p in players if p['role'] == 'crewmate') * 2
 
     return {
+        'game_id': uuid.uuid4().hex[:12],
         'players': players,
         'round': 1,
         'phase': 'action',  # action | discovery | discussion | voting | results
@@ -125,8 +197,15 @@ def init_game_state(gpt_model='gpt-5.1', claude_model='claude-haiku-4.5'):
         'kill_cooldown': False,
         'discussion_log': [],  # current meeting statements
         'discussion_round': 0,  # 0 or 1 (2 rounds of discussion)
+        'discussion_mode': discussion_mode,  # one of DISCUSSION_MODES
+        # Start each player's vote call during the last discussion round (see prefetch_vote)
+        'speculative_votes': bool(speculative_votes),
+        'vote_prefetch': {},  # {player_id: prefetched vote}, consumed by the voting phase
+        'vote_prefetch_stats': {'prefetched': 0, 'hits': 0, 'revotes': 0,
+                                'wasted_input_tokens': 0, 'wasted_output_tokens': 0},
         'vote_results': {},
-        'event_log': [],  # full game history
+        'event_log': [],  # game history, the last EVENT_LOG_LIMIT events
+        'events_dropped': 0,  # events trimmed from the front of event_log
         'game_over': False,
         'winner': None,
         'win_reason': None,
@@ -137,6 +216,17 @@ def init_game_state(gpt_model='gpt-5.1', claude_model='claude-haiku-4.5'):
         # Per-player reasoning and timing
         'reasoning': {},  # {player_id: 'reasoning text'}
         'timing': {},  # {player_id: {'last': 0.0, 'total': 0.0}}
+        'call_log': [],  # [player_id, prompt_type, round, seconds, input_tokens, output_tokens, ok] per model call
+        'vote_history': [],  # [round, voter_id, vote] for every vote cast
+        'meeting_log': [],  # wall-clock time of each meeting, see record_meeting_time()
+
+        # Per-player threaded conversations (only used when conversation_mode is on)
+        'conversation_mode': bool(conversation_mode),
+        'conversations': {},  # {player_id: conversation dict, see new_conversation()}
+
+        # Model answers that named a room/player/action wrongly and were fixed (see resolve_answer)
+        'repairs': [],  # most recent REPAIR_LOG_LIMIT entries
+        'repair_stats': {'repaired': 0, 'reasked': 0, 'unresolved': 0},
 
         # Model settings
         'gpt_model_key': gpt_model,
@@ -145,6 +235,12 @@ def init_game_state(gpt_model='gpt-5.1', claude_model='claude-haiku-4.5'):
         'claude_model_id': CLAUDE_MODELS.get(claude_model, 'claude-haiku-4-5-20251001'),
         'gpt_display_name': GPT_DISPLAY_NAMES.get(gpt_model, 'GPT 5.1 Medium'),
         'claude_display_name': CLAUDE_DISPLAY_NAMES.get(claude_model, 'Claude Haiku 4.5 Thinking'),
+
+        # Which entry of CALL_BACKENDS answers this game's model calls
+        'backend': backend,
+
+        # Bumped after every phase; spectators are served one snapshot per version
+        'version': 0,
     }
 
 
@@ -178,6 +274,48 @@ def get_impostor(state):
     return None
 
 
+# ─── Conversation Threading ──────────────────────────────────────────
+
+def new_conversation():
+    """Fresh per-player conversation: provider thread handles plus what the player has already seen."""
+    return {
+        'previous_response_id': None,  # OpenAI: last response in the chain
+        'messages': [],  # Anthropic: prior user/assistant turns
+        'event_cursor': 0,  # event_count() at the player's last turn
+        'discussion_cursor': [0, 0],  # [round, len(discussion_log)] at the player's last turn
+        'turns': 0,
+        'updated_at': time.time(),
+    }
+
+
+def get_conversation(state, player):
+    """Return the player's conversation, or None when the game runs stateless.
+
+    Expired conversations are replaced with a fresh one, so the next prompt is a full one.
+    """
+    if not state.get('conversation_mode'):
+        return None
+    conv = state['conversations'].get(player['id'])
+    if conv is None or time.time() - conv['updated_at'] > CONVERSATION_TTL:
+        conv = new_conversation()
+        state['conversations'][player['id']] = conv
+    return conv
+
+
+def threaded_conversation(state, player):
+    """Return the player's conversation only if it already has turns to build on."""
+    conv = get_conversation(state, player)
+    if conv and conv['turns']:
+        return conv
+    return None
+
+
+def reset_conversation(state, player):
+    """Drop the player's thread; their next prompt will be a full stateless one."""
+    state.get('conversations', {}).pop(player['id'], None)
+
+
+@traced()
 def check_win_conditions(state):
     """Check if the game is over. Returns (game_over, winner, reason) or (False, None, None)."""
     impostor = get_impostor(state)
@@ -208,6 +346,7 @@ def check_win_conditions(state):
 
 # ─── Prompt Generation ───────────────────────────────────────────────
 
+@traced('prompt.action')
 def generate_action_prompt(player, state):
     """Generate the action phase prompt for a player."""
     alive = alive_players(state)
@@ -234,14 +373,14 @@ YOUR REMAINING TASKS:
 ROOMS: Cafeteria, Electrical, MedBay, Navigation, Reactor
 
 GAME HISTORY (recent events):
-{format_recent_events(state)}
+{format_player_events(player, state)}
 
 Choose a room to move to and an action:
 - If you move to a room where you have a task, choose "do_task" to complete it.
 - Otherwise choose "wait" (look around).
 
 OUTPUT FORMAT (JSON):
-{{"room": "RoomName", "action": "do_task" | "wait", "target": null}}
+{CREWMATE_ACTION_FORMAT}
 
 Pick the room strategically — prioritize completing your tasks, but also consider safety (don't go where you might be alone with a suspicious player)."""
 
@@ -260,7 +399,7 @@ KILL COOLDOWN: {cooldown_msg}
 ROOMS: Cafeteria, Electrical, MedBay, Navigation, Reactor
 
 GAME HISTORY (recent events):
-{format_recent_events(state)}
+{format_player_events(player, state)}
 
 Your goal: Kill crewmates without getting caught. You win if alive crewmates drop to 1 (or fewer).
 PRIMARY OBJECTIVE: Create kill opportunities. Lure a lone crewmate, kill them, and leave before anyone arrives.
@@ -278,11 +417,12 @@ STRATEGY:
 - Keep your story consistent for discussion; never admit the kill.
 
 OUTPUT FORMAT (JSON):
-{{"room": "RoomName", "action": "fake_task" | "kill" | "wait", "target": "PlayerName" | null}}
+{IMPOSTOR_ACTION_FORMAT}
 
 If you choose "kill", you MUST specify a target player name. The target must be alive and will need to be in the same room (the game resolves this)."""
 
 
+@traced('prompt.discussion')
 def generate_discussion_prompt(player, state, round_num):
     """Generate the discussion prompt for a player."""
     alive = alive_players(state)
@@ -303,9 +443,10 @@ def generate_discussion_prompt(player, state, round_num):
         observation += f" You found the body of {', '.join(dead_names)}!"
 
     prev_statements = ""
-    if state['discussion_log']:
+    new_statements = unseen_statements(player, state)
+    if new_statements:
         prev_statements = "\nPREVIOUS STATEMENTS THIS MEETING:\n"
-        for entry in state['discussion_log']:
+        for entry in new_statements:
             prev_statements += f"  {entry['player']}: \"{entry['statement']}\"\n"
 
     if player['role'] == 'crewmate':
@@ -331,7 +472,7 @@ MEETING CALLED: {meeting_reason}
 ALIVE PLAYERS: {', '.join(alive_names)} (and you)
 {prev_statements}
 GAME HISTORY:
-{format_recent_events(state)}
+{format_player_events(player, state)}
 
 Generate a short discussion statement (1-3 sentences). Be strategic:
 - Share (or fabricate) what you observed
@@ -342,15 +483,17 @@ OUTPUT FORMAT (JSON):
 {{"statement": "Your statement here"}}"""
 
 
+@traced('prompt.vote')
 def generate_vote_prompt(player, state):
     """Generate the voting prompt for a player."""
     alive = alive_players(state)
     voteable = [p['name'] for p in alive if p['id'] != player['id']]
 
     discussion_summary = ""
-    if state['discussion_log']:
+    new_statements = unseen_statements(player, state)
+    if new_statements:
         discussion_summary = "\nDISCUSSION LOG:\n"
-        for entry in state['discussion_log']:
+        for entry in new_statements:
             discussion_summary += f"  {entry['player']}: \"{entry['statement']}\"\n"
 
     if player['role'] == 'crewmate':
@@ -364,12 +507,24 @@ ALIVE PLAYERS YOU CAN VOTE FOR: {', '.join(voteable)}
 You can also vote "skip" (no ejection).
 {discussion_summary}
 GAME HISTORY:
-{format_recent_events(state)}
+{format_player_events(player, state)}
 
 {role_hint}
 
 OUTPUT FORMAT (JSON):
-{{"vote": "PlayerName" | "skip", "reason": "Brief reason for your vote"}}"""
+{VOTE_FORMAT}"""
+
+
+def generate_reask_prompt(player, field, raw, choices, previous, answer_format):
+    """Short follow-up prompt for an answer whose `field` couldn't be matched to a valid choice."""
+    return f"""You are {player['name']}. Your answer used {field} "{raw}", which is not a valid choice.
+YOUR ANSWER: {json.dumps(previous)}
+VALID CHOICES FOR {field.upper()}: {', '.join(choices)}
+
+Give the same decision again, with {field} set to one of the valid choices exactly as written.
+
+OUTPUT FORMAT (JSON):
+{answer_format}"""
 
 
 def format_recent_events(state, max_events=10):
@@ -379,32 +534,171 @@ def format_recent_events(state, max_events=10):
     return "\n".join([f"  - {e}" for e in recent])
 
 
+def event_count(state):
+    """Events logged over the whole game, including the ones trimmed from event_log."""
+    dropped = state.get('events_dropped', 0)
+    return dropped + len(state['event_log']) - (1 if dropped else 0)  # minus the summary line
+
+
+def events_since(state, count):
+    """The events logged after the first count ones, as far as event_log still has them."""
+    log = state['event_log']
+    return log[max(len(log) - (event_count(state) - count), 0):]
+
+
+def trim_event_log(state):
+    """Keep the last EVENT_LOG_LIMIT events, after a line saying how many earlier ones were dropped."""
+    dropped = state.get('events_dropped', 0)
+    events = state['event_log'][1:] if dropped else state['event_log']
+    excess = len(events) - EVENT_LOG_LIMIT
+    if excess <= 0:
+        return
+    state['events_dropped'] = dropped + excess
+    state['event_log'] = [f"({dropped + excess} earlier events not kept)"] + events[excess:]
+
+
+def format_player_events(player, state):
+    """Recent events for a stateless prompt, or only the events a threaded player hasn't seen yet."""
+    conv = threaded_conversation(state, player)
+    if not conv:
+        return format_recent_events(state)
+    new_events = events_since(state, conv['event_cursor'])
+    if not new_events:
+        return "  No new events since your last turn."
+    return "\n".join([f"  - {e}" for e in new_events])
+
+
+def unseen_statements(player, state):
+    """Discussion entries to show the player: all of them, or only new ones for a threaded player."""
+    conv = threaded_conversation(state, player)
+    if not conv:
+        return state['discussion_log']
+    seen_round, seen_count = conv['discussion_cursor']
+    if seen_round != state['round']:
+        return state['discussion_log']
+    return state['discussion_log'][seen_count:]
+
+
+# ─── Answer Validation ───────────────────────────────────────────────
+
+def log_repair(state, player, field, raw, value, outcome):
+    """Record a fixed answer. outcome is 'repaired' (locally), 'reasked' or 'unresolved'."""
+    logging.info(f"Round {state['round']}: {player['name']} {field} {raw!r} -> {value!r} ({outcome})")
+    state['repair_stats'][outcome] += 1
+    state['repairs'].append({
+        'round': state['round'],
+        'player_id': player['id'],
+        'field': field,
+        'raw': raw,
+        'value': value,
+        'outcome': outcome,
+    })
+    del state['repairs'][:-REPAIR_LOG_LIMIT]
+
+
+def resolve_answer(player, state, prompt_type, result, field, index, choices, answer_format):
+    """Return result[field] as one of `choices`, or None.
+
+    Near-misses ("medbay", "the Reactor room", "gpt 2") are repaired locally. Only when
+    that fails is the player re-asked, once, with a short prompt listing the valid choices.
+    """
+    raw = result.get(field)
+    value = resolve_name(raw, index, allowed=choices)
+    if value is not None:
+        if value != raw:
+            log_repair(state, player, field, raw, value, 'repaired')
+        return value
+
+    prompt = generate_reask_prompt(player, field, raw, choices, result, answer_format)
+    with span('reask', field=field, raw=raw):
+        retry, reasoning, elapsed = call_ai(player, state, prompt_type, prompt)
+    record_call(state, player, elapsed)
+    value = None if reasoning.startswith('API Error') else resolve_name(retry.get(field), index, allowed=choices)
+    log_repair(state, player, field, raw, value, 'reasked' if value is not None else 'unresolved')
+    return value
+
+
+def validate_action(player, state, result):
+    """Return a clean {room, action, target} for an action answer."""
+    answer_format = IMPOSTOR_ACTION_FORMAT if player['role'] == 'impostor' else CREWMATE_ACTION_FORMAT
+    action = resolve_answer(player, state, 'action', result, 'action', ACTION_INDEX, ACTIONS, answer_format) or 'wait'
+    room = resolve_answer(player, state, 'action', result, 'room', ROOM_INDEX, ROOMS, answer_format) or 'Cafeteria'
+
+    target = result.get('target')
+    if action == 'kill' and player['role'] == 'impostor':
+        others = [p['name'] for p in alive_players(state) if p['id'] != player['id']]
+        target = resolve_answer(player, state, 'action', result, 'target', PLAYER_INDEX, others, answer_format)
+    return {'room': room, 'action': action, 'target': target}
+
+
+def validate_vote(player, state, result):
+    """Return the vote as an alive player's name or 'skip'."""
+    if not result.get('vote'):
+        return 'skip'
+    choices = [p['name'] for p in alive_players(state) if p['id'] != player['id']] + ['skip']
+    return resolve_answer(player, state, 'vote', result, 'vote', VOTE_INDEX, choices, VOTE_FORMAT) or 'skip'
+
+
 # ─── Phase Execution ─────────────────────────────────────────────────
 
-def call_ai(player, state, prompt_type, prompt, round_num=0):
-    """Call the appropriate AI model for a player and return result + reasoning + time."""
+def call_model(team, prompt_type, prompt, model_id, model_key, use_thinking, conversation=None):
+    """Call the provider API directly. Returns (result, reasoning)."""
+    if team == 'openai':
+        if prompt_type == 'action':
+            return call_gpt_action(prompt, model_id, model_key=model_key, conversation=conversation)
+        elif prompt_type == 'discussion':
+            return call_gpt_discussion(prompt, model_id, model_key=model_key, conversation=conversation)
+        else:
+            return call_gpt_vote(prompt, model_id, model_key=model_key, conversation=conversation)
+    else:
+        if prompt_type == 'action':
+            return call_claude_action(prompt, model_id, use_thinking, conversation=conversation)
+        elif prompt_type == 'discussion':
+            return call_claude_discussion(prompt, model_id, use_thinking, conversation=conversation)
+        else:
+            return call_claude_vote(prompt, model_id, use_thinking, conversation=conversation)
+
+
+# Model call backends, selected per game by state['backend'].
+# Each takes call_model's arguments and returns (result, reasoning).
+CALL_BACKENDS = {
+    'live': call_model,
+    'stub': call_stub,  # offline, for benchmarks and load tests
+}
+
+# Backend for games started from the web UI. A load-test server runs with
+# AMONG_US_BACKEND=stub, optionally with AMONG_US_STUB_LATENCY seconds per call
+# to stand in for model response times.
+WEB_BACKEND = os.getenv('AMONG_US_BACKEND', 'live')
+STUB_LATENCY = float(os.getenv('AMONG_US_STUB_LATENCY', '0'))
+if STUB_LATENCY:
+    CALL_BACKENDS['stub'] = lambda *args, **kwargs: call_stub(*args, latency=STUB_LATENCY, **kwargs)
+
+
+@traced()
+def call_ai(player, state, prompt_type, prompt, round_num=0, call_kind=None):
+    """Call the appropriate AI model for a player and return result + reasoning + time.
+
+    call_kind is the kind recorded in the call log, if not prompt_type.
+    """
     model_key = state['gpt_model_key'] if player['team'] == 'openai' else state['claude_model_key']
     model_id = state['gpt_model_id'] if player['team'] == 'openai' else state['claude_model_id']
     use_thinking = model_key not in NON_THINKING_CLAUDE
+    conversation = state['conversations'].get(player['id']) if state.get('conversation_mode') else None
+    backend = CALL_BACKENDS[state.get('backend', 'live')]
 
     start_time = time.time()
     try:
-        if player['team'] == 'openai':
-            if prompt_type == 'action':
-                result, reasoning = call_gpt_action(prompt, model_id, model_key=model_key)
-            elif prompt_type == 'discussion':
-                result, reasoning = call_gpt_discussion(prompt, model_id, model_key=model_key)
-            else:
-                result, reasoning = call_gpt_vote(prompt, model_id, model_key=model_key)
-        else:
-            if prompt_type == 'action':
-                result, reasoning = call_claude_action(prompt, model_id, use_thinking)
-            elif prompt_type == 'discussion':
-                result, reasoning = call_claude_discussion(prompt, model_id, use_thinking)
-            else:
-                result, reasoning = call_claude_vote(prompt, model_id, use_thinking)
+        with span('model_call', 'model', player=player['name'], prompt_type=prompt_type,
+                  backend=state.get('backend', 'live'), model=model_id, prompt_chars=len(prompt)), \
+                tracing.meter() as usage:
+            result, reasoning = backend(player['team'], prompt_type, prompt, model_id, model_key, use_thinking,
+                                        conversation=conversation)
     except Exception as e:
         elapsed = time.time() - start_time
+        log_call(state, player, call_kind or prompt_type, elapsed, usage, ok=False)
+        # A broken thread (expired response id, rejected history...) must not poison later turns
+        reset_conversation(state, player)
         # Fallback defaults
         if prompt_type == 'action':
             result = {'room': 'Cafeteria', 'action': 'wait', 'target': None}
@@ -416,36 +710,69 @@ def call_ai(player, state, prompt_type, prompt, round_num=0):
         return result, reasoning, round(elapsed, 2)
 
     elapsed = time.time() - start_time
-    return result, reasoning or '', round(elapsed, 2)
+    log_call(state, player, call_kind or prompt_type, elapsed, usage, ok=True)
+    if conversation is not None:
+        # Everything in the prompt has now been seen by this player's thread
+        conversation['event_cursor'] = event_count(state)
+        conversation['discussion_cursor'] = [state['round'], len(state['discussion_log'])]
+        conversation['turns'] += 1
+        conversation['updated_at'] = time.time()
+    return result, clip_text(reasoning or '', REASONING_MAX_CHARS), round(elapsed, 2)
+
+
+def clip_text(text, limit):
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+def log_call(state, player, prompt_type, elapsed, usage, ok):
+    """Keep one compact row per model call for the results store."""
+    state.setdefault('call_log', []).append([
+        player['id'], prompt_type, state['round'], round(elapsed, 3),
+        usage['input_tokens'], usage['output_tokens'], ok,
+    ])
+
+
+def record_call(state, player, elapsed, reasoning=None):
+    """Add a call's time to the player's timing (and keep its reasoning, if given)."""
+    timing = state['timing'].setdefault(player['id'], {'last': 0.0, 'total': 0.0})
+    timing['last'] = elapsed
+    timing['total'] = round(timing['total'] + elapsed, 2)
+    if reasoning is not None:
+        state['reasoning'][player['id']] = reasoning
+
+
+def call_ai_many(state, calls):
+    """Run independent call_ai requests at the same time.
+
+    calls is a list of (player, prompt_type, prompt); results come back in the same order.
+    """
+    if not calls:
+        return []
+    with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+        # Each call runs in a copy of this context so its spans nest under the current trace
+        futures = [pool.submit(contextvars.copy_context().run, call_ai, player, state, prompt_type, prompt)
+                   for player, prompt_type, prompt in calls]
+        return [f.result() for f in futures]
 
 
+@traced()
 def execute_action_phase(state):
     """Execute action phase for all alive players. Returns event descriptions."""
     events = []
     alive = alive_players(state)
     actions = {}  # player_id -> {room, action, target}
 
-    # Collect actions from all alive players
-    for player in alive:
-        prompt = generate_action_prompt(player, state)
-        result, reasoning, elapsed = call_ai(player, state, 'action', prompt)
-
-        # Record timing/reasoning
-        if player['id'] not in state['timing']:
-            state['timing'][player['id']] = {'last': 0.0, 'total': 0.0}
-        state['timing'][player['id']]['last'] = elapsed
-        state['timing'][player['id']]['total'] = round(state['timing'][player['id']]['total'] + elapsed, 2)
-        state['reasoning'][player['id']] = reasoning
-
-        # Validate room
-        room = result.get('room', 'Cafeteria')
-        if room not in ROOMS:
-            room = 'Cafeteria'
+    # Collect actions from all alive players. Nothing changes until every action is in,
+    # so all prompts are built up front and the calls go out together.
+    calls = [(player, 'action', generate_action_prompt(player, state)) for player in alive]
+    responses = call_ai_many(state, calls)
 
-        action = result.get('action', 'wait')
-        target = result.get('target')
+    for player, (result, reasoning, elapsed) in zip(alive, responses):
+        record_call(state, player, elapsed, reasoning)
 
-        actions[player['id']] = {'room': room, 'action': action, 'target': target}
+        # Validate room, action and kill target
+        actions[player['id']] = validate_action(player, state, result)
 
     # Resolve actions: move everyone first
     for player in alive:
@@ -501,6 +828,7 @@ def execute_action_phase(state):
     return events
 
 
+@traced()
 def execute_discovery_phase(state):
     """Check if any alive player discovers a body. Returns True if meeting triggered."""
     alive = alive_players(state)
@@ -521,43 +849,131 @@ def execute_discovery_phase(state):
     return False
 
 
+@traced()
 def execute_discussion_phase(state, round_num):
-    """Execute one round of discussion for all alive players."""
+    """Execute one round of discussion for all alive players.
+
+    Sequential mode: players speak in turn, each seeing the statements made before it.
+    Simultaneous mode: every prompt is built from the log as it stood after the previous
+    round and the calls go out together, so a round costs one model latency, not one per player.
+    """
     alive = alive_players(state)
-    for player in alive:
-        prompt = generate_discussion_prompt(player, state, round_num)
-        result, reasoning, elapsed = call_ai(player, state, 'discussion', prompt)
+    # In the last round a player's vote goes out together with their final statement
+    speculate = round_num == 1 and state.get('speculative_votes') and not state.get('conversation_mode')
+    prefetches = {}
+    with ThreadPoolExecutor(max_workers=len(alive)) if speculate else contextlib.nullcontext() as pool:
+        if state.get('discussion_mode') == 'simultaneous':
+            calls = [(player, 'discussion', generate_discussion_prompt(player, state, round_num)) for player in alive]
+            if speculate:
+                prefetches = {player['id']: prefetch_vote(state, player, pool) for player in alive}
+            responses = zip(alive, call_ai_many(state, calls))
+        else:
+            def speak(player):
+                if speculate:
+                    prefetches[player['id']] = prefetch_vote(state, player, pool)
+                return call_ai(player, state, 'discussion', generate_discussion_prompt(player, state, round_num))
+
+            # Lazy: each prompt is built after the previous player's statement is in the log
+            responses = ((player, speak(player)) for player in alive)
+
+        for player, (result, reasoning, elapsed) in responses:
+            record_call(state, player, elapsed, reasoning)
+
+            statement = clip_text(result.get('statement', 'I have nothing to say.'), STATEMENT_MAX_CHARS)
+            state['discussion_log'].append({
+                'player': player['name'],
+                'player_id': player['id'],
+                'statement': statement,
+                'round': round_num,
+            })
+            state['event_log'].append(f"Round {state['round']}: {player['name']} says: \"{statement}\"")
+
+        # The phase ends once every speculative vote is back, so the results survive in the saved state
+        for player_id, (seen, future) in prefetches.items():
+            result, reasoning, elapsed = future.result()
+            state['vote_prefetch'][player_id] = {'seen': seen, 'result': result, 'reasoning': reasoning,
+                                                 'elapsed': elapsed}
+            state['vote_prefetch_stats']['prefetched'] += 1
+
+
+def prefetch_vote(state, player, pool):
+    """Start a player's vote call early. Returns (statements it saw, future of call_ai's result)."""
+    prompt = generate_vote_prompt(player, state)
+    future = pool.submit(contextvars.copy_context().run, call_ai, player, state, 'vote', prompt,
+                         call_kind='vote_speculative')
+    return len(state['discussion_log']), future
+
+
+def stale_vote(state, player, prefetched):
+    """True if a statement the speculative vote didn't see could change it.
+
+    That is a statement by another player that names the voter (an accusation or an alibi) or the
+    player the voter picked. The voter's own statements can't change their vote.
+    """
+    if prefetched['reasoning'].startswith('API Error'):
+        return True
+    pick = resolve_name(prefetched['result'].get('vote'), PLAYER_INDEX)
+    watched = {player['name'], pick} - {None}
+    for entry in state['discussion_log'][prefetched['seen']:]:
+        if entry['player_id'] == player['id']:
+            continue
+        if mentioned_names(entry['statement'], PLAYER_INDEX) & watched:
+            return True
+    return False
 
-        state['timing'][player['id']]['last'] = elapsed
-        state['timing'][player['id']]['total'] = round(state['timing'][player['id']]['total'] + elapsed, 2)
-        state['reasoning'][player['id']] = reasoning
 
-        statement = result.get('statement', 'I have nothing to say.')
-        state['discussion_log'].append({
-            'player': player['name'],
-            'player_id': player['id'],
-            'statement': statement,
-            'round': round_num,
-        })
-        state['event_log'].append(f"Round {state['round']}: {player['name']} says: \"{statement}\"")
+def take_prefetched_vote(state, player):
+    """The player's speculative vote, unless a statement made after it started makes it stale.
+
+    A stale vote is cast again and the speculative call's tokens are counted as wasted in
+    vote_prefetch_stats.
+    """
+    prefetched = state.get('vote_prefetch', {}).pop(player['id'], None)
+    if prefetched is None:
+        return None
+    stats = state['vote_prefetch_stats']
+    if not stale_vote(state, player, prefetched):
+        stats['hits'] += 1
+        state['event_log'].append(f"Round {state['round']}: {player['name']}'s vote was cast during the discussion")
+        return prefetched['result'], prefetched['reasoning'], prefetched['elapsed']
+
+    stats['revotes'] += 1
+    for row in state['call_log']:
+        if row[0] == player['id'] and row[1] == 'vote_speculative' and row[2] == state['round']:
+            stats['wasted_input_tokens'] += row[4]
+            stats['wasted_output_tokens'] += row[5]
+    return None
+
+
+def vote_prefetch_summary(states):
+    """Speculative vote hit rate and wasted tokens over games played with speculative_votes."""
+    total = {'prefetched': 0, 'hits': 0, 'revotes': 0, 'wasted_input_tokens': 0, 'wasted_output_tokens': 0}
+    for state in states:
+        for key, value in state.get('vote_prefetch_stats', {}).items():
+            total[key] += value
+    total['hit_rate'] = round(total['hits'] / total['prefetched'], 3) if total['prefetched'] else None
+    return total
 
 
+@traced()
 def execute_voting_phase(state):
     """Execute voting for all alive players. Returns ejection result."""
     alive = alive_players(state)
     votes = {}  # player_id -> vote_target
 
     for player in alive:
-        prompt = generate_vote_prompt(player, state)
-        result, reasoning, elapsed = call_ai(player, state, 'vote', prompt)
-
-        state['timing'][player['id']]['last'] = elapsed
-        state['timing'][player['id']]['total'] = round(state['timing'][player['id']]['total'] + elapsed, 2)
-        state['reasoning'][player['id']] = reasoning
+        prefetched = take_prefetched_vote(state, player)
+        if prefetched:
+            result, reasoning, elapsed = prefetched
+        else:
+            prompt = generate_vote_prompt(player, state)
+            result, reasoning, elapsed = call_ai(player, state, 'vote', prompt)
+        record_call(state, player, elapsed, reasoning)
 
-        vote_target = result.get('vote', 'skip')
-        vote_reason = result.get('reason', '')
+        vote_target = validate_vote(player, state, result)
+        vote_reason = clip_text(result.get('reason') or '', STATEMENT_MAX_CHARS)
         votes[player['id']] = vote_target
+        state.setdefault('vote_history', []).append([state['round'], player['id'], vote_target])
 
         state['vote_results'][player['id']] = {
             'voter': player['name'],
@@ -613,49 +1029,32 @@ def execute_voting_phase(state):
         }
 
 
-# ─── API Endpoints ───────────────────────────────────────────────────
-
-@app.route('/')
-def index():
-    return render_template('index.html')
-
-
-@app.route('/api/start-game', methods=['POST'])
-def start_game():
-    global GAME_STATE
-    data = request.get_json()
-
-    gpt_model = data.get('gpt_model', 'gpt-5.1')
-    claude_model = data.get('claude_model', 'claude-haiku-4.5')
-
-    state = init_game_state(gpt_model=gpt_model, claude_model=claude_model)
-    GAME_STATE = state
-
-    return jsonify({
-        'success': True,
-        'game_state': get_client_state(state)
-    })
-
-
-@app.route('/api/game-state', methods=['GET'])
-def get_game_state_route():
-    global GAME_STATE
-    if not GAME_STATE:
-        return jsonify({'error': 'No game in progress'}), 400
-    return jsonify(get_client_state(GAME_STATE))
-
-
-@app.route('/api/next-phase', methods=['POST'])
-def next_phase():
-    """Advance to the next phase of the game."""
-    global GAME_STATE
-    state = GAME_STATE
-    if not state:
-        return jsonify({'error': 'No game in progress'}), 400
-
-    if state['game_over']:
-        return jsonify({'error': 'Game is over', 'game_state': get_client_state(state)}), 400
-
+def record_meeting_time(state, part, seconds):
+    """Add wall-clock time to this round's meeting entry, to compare discussion modes."""
+    meetings = state.setdefault('meeting_log', [])
+    if not meetings or meetings[-1]['round'] != state['round']:
+        meetings.append({'round': state['round'], 'mode': state.get('discussion_mode', 'sequential'),
+                         'speakers': len(alive_players(state)), 'discussion_seconds': 0.0, 'voting_seconds': 0.0})
+    meetings[-1][part] = round(meetings[-1][part] + seconds, 3)
+
+
+def meeting_stats(states):
+    """Mean meeting wall-clock time per discussion mode over finished games."""
+    by_mode = {}
+    for state in states:
+        for m in state.get('meeting_log', []):
+            s = by_mode.setdefault(m['mode'], {'meetings': 0, 'discussion_seconds': 0.0, 'voting_seconds': 0.0})
+            s['meetings'] += 1
+            s['discussion_seconds'] += m['discussion_seconds']
+            s['voting_seconds'] += m['voting_seconds']
+    return {mode: {'meetings': s['meetings'],
+                   'mean_discussion_seconds': round(s['discussion_seconds'] / s['meetings'], 3),
+                   'mean_voting_seconds': round(s['voting_seconds'] / s['meetings'], 3)}
+            for mode, s in by_mode.items()}
+
+
+def advance_phase(state):
+    """Run the current phase and move the game on to the next one. Returns the phase result data."""
     phase = state['phase']
     result_data = {}
 
@@ -703,7 +1102,9 @@ def next_phase():
 
     elif phase == 'discussion':
         # Execute one round of discussion
+        started = time.perf_counter()
         execute_discussion_phase(state, state['discussion_round'])
+        record_meeting_time(state, 'discussion_seconds', time.perf_counter() - started)
         state['discussion_round'] += 1
 
         if state['discussion_round'] >= 2:
@@ -712,7 +1113,9 @@ def next_phase():
 
     elif phase == 'voting':
         # Execute voting
+        started = time.perf_counter()
         vote_result = execute_voting_phase(state)
+        record_meeting_time(state, 'voting_seconds', time.perf_counter() - started)
         state['phase'] = 'results'
         result_data['vote_result'] = vote_result
 
@@ -733,6 +1136,7 @@ def next_phase():
         state['discussion_log'] = []
         state['discussion_round'] = 0
         state['vote_results'] = {}
+        state['vote_prefetch'] = {}
         state['ejected_this_round'] = None
 
         # Check win
@@ -742,16 +1146,302 @@ def next_phase():
             state['winner'] = winner
             state['win_reason'] = reason
 
-    GAME_STATE = state
+    trim_event_log(state)
+    state['version'] = state.get('version', 0) + 1
+    return result_data
+
+
+def record_result(state):
+    """Keep a finished game: compact its replay, then add it to the results store and the search archive."""
+    replay.finish(state['game_id'])
+    store = get_results_store()
+    if store is not None:
+        store.append(state)
+    archive = get_archive()
+    if archive is not None:
+        archive.add_game(state)
+
+
+# ─── API Endpoints ───────────────────────────────────────────────────
+
+@app.route('/')
+def index():
+    # Revalidated on every visit (a 304 for repeat visitors); the assets it links are immutable
+    response = make_response(render_template('index.html'))
+    response.headers['Cache-Control'] = 'no-cache'
+    response.add_etag(weak=True)
+    response.make_conditional(request)
+    if response.status_code == 200:
+        compress_response(response, request.accept_encodings)
+    return response
+
+
+@app.route('/static/dist/<path:filename>')
+def static_asset(filename):
+    """Fingerprinted build output of assets.py, precompressed and cached forever."""
+    return assets.send_asset(filename, request.accept_encodings)
+
+
+def requested_game_id():
+    """Game id from the query string or JSON body; clients that don't send one get the newest game."""
+    data = request.get_json(silent=True) or {}
+    return request.args.get('game_id') or data.get('game_id') or STORE.latest_id()
+
+
+@app.route('/api/start-game', methods=['POST'])
+def start_game():
+    data = request.get_json()
+
+    gpt_model = data.get('gpt_model', 'gpt-5.1')
+    claude_model = data.get('claude_model', 'claude-haiku-4.5')
+    conversation_mode = data.get('conversation_mode', False)
+    discussion_mode = data.get('discussion_mode', 'sequential')
+    speculative_votes = data.get('speculative_votes', False)
+    if discussion_mode not in DISCUSSION_MODES:
+        return jsonify({'error': f"discussion_mode must be one of {', '.join(DISCUSSION_MODES)}"}), 400
+
+    state = init_game_state(gpt_model=gpt_model, claude_model=claude_model, conversation_mode=conversation_mode,
+                            backend=WEB_BACKEND, discussion_mode=discussion_mode,
+                            speculative_votes=speculative_votes)
+    STORE.create(state)
+    client_state = get_client_state(state)
+    snapshot = HUB.publish(state['game_id'], state['version'], client_state)
+    replay.record_frame(state['game_id'], client_state, state_json=snapshot.body)
 
     return jsonify({
         'success': True,
-        'phase': state['phase'],
-        'result': result_data,
-        'game_state': get_client_state(state)
+        'game_state': client_state
+    })
+
+
+@app.route('/api/game-state', methods=['GET'])
+def get_game_state_route():
+    game_id = requested_game_id()
+    state = STORE.get(game_id) if game_id else None
+    if not state:
+        return jsonify({'error': 'No game in progress'}), 400
+    return jsonify(get_client_state(state))
+
+
+@app.route('/api/next-phase', methods=['POST'])
+def next_phase():
+    """Advance to the next phase of the game."""
+    game_id = requested_game_id()
+    if not game_id:
+        return jsonify({'error': 'No game in progress'}), 400
+
+    # Only one worker may run a game's phase at a time
+    owner = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+    if not STORE.claim(game_id, owner):
+        if STORE.version(game_id) is None:  # no such game (or it was lost in a restart)
+            return jsonify({'error': 'No game in progress'}), 400
+        return jsonify({'error': 'This game is already advancing a phase'}), 409
+
+    try:
+        state = STORE.get(game_id)
+        if not state:
+            return jsonify({'error': 'No game in progress'}), 400
+
+        if state['game_over']:
+            return jsonify({'error': 'Game is over', 'game_state': get_client_state(state)}), 400
+
+        # ?profile=1 (or an X-Profile: 1 header) also samples stacks for this request
+        profile = request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'
+        with tracing.trace(game_id, 'next_phase', profile=profile, phase=state['phase'], round=state['round']):
+            result_data = advance_phase(state)
+
+            with span('save_state'):
+                if not STORE.save(state, owner):
+                    return jsonify({'error': 'Phase lease expired; another worker took over this game'}), 409
+
+            with span('serialize'):
+                client_state = get_client_state(state)
+                snapshot = HUB.publish(game_id, state['version'], client_state)
+                response = jsonify({
+                    'success': True,
+                    'phase': state['phase'],
+                    'result': result_data,
+                    'game_state': client_state
+                })
+
+            with span('record_replay'):
+                replay.record_frame(game_id, client_state, result_data,
+                                    state_json=snapshot.body if snapshot.version == state['version'] else None)
+            if state['game_over']:
+                with span('record_result'):
+                    record_result(state)
+        return response
+    finally:
+        STORE.release(game_id, owner)
+
+
+@app.after_request
+def compress_api_response(response):
+    """Negotiated gzip/brotli for large /api/* responses."""
+    if request.path.startswith('/api/'):
+        compress_response(response, request.accept_encodings)
+    return response
+
+
+# ─── Spectators ──────────────────────────────────────────────────────
+
+def load_spectator_state(game_id):
+    state = STORE.get(game_id)
+    return (state.get('version', 0), get_client_state(state)) if state else None
+
+
+# Renders each state version once and fans it out to every spectator (see spectator_hub.py)
+HUB = SpectatorHub(STORE.version, load_spectator_state)
+
+
+@app.route('/api/spectate/<game_id>', methods=['GET'])
+def spectate_state(game_id):
+    """Newest client state of a game, pre-rendered.
+
+    With ?since=<version>, waits up to ?wait= seconds (long-poll) for a newer version
+    and answers with a delta ({version, base, set, append}) when the spectator is
+    exactly one version behind, or 204 if nothing changed in time.
+    """
+    snapshot = HUB.current(game_id)
+    if snapshot is None:
+        return jsonify({'error': 'Unknown game'}), 404
+
+    since = request.args.get('since', type=int)
+    if since is not None and snapshot.version <= since:
+        wait = min(request.args.get('wait', default=LONG_POLL_TIMEOUT, type=float), LONG_POLL_TIMEOUT)
+        try:
+            snapshot = HUB.long_poll(game_id, since, timeout=wait)
+        except HubFull:
+            return jsonify({'error': 'Too many spectators'}), 503, {'Retry-After': '5'}
+        if snapshot is None:
+            return '', 204
+
+    etag = f'"v{snapshot.version}"'
+    if since is None and request.headers.get('If-None-Match') == etag:
+        return '', 304, {'ETag': etag}
+
+    # Snapshots are pre-compressed with gzip only, once per version
+    use_gzip = bool(request.accept_encodings['gzip'])
+    response = app.response_class(snapshot.payload(since, use_gzip), mimetype='application/json')
+    response.headers['ETag'] = etag
+    response.headers['X-State-Version'] = str(snapshot.version)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+@app.route('/api/spectate/<game_id>/stream', methods=['GET'])
+def spectate_stream(game_id):
+    """Server-sent events: a 'snapshot' event, then a 'delta' or 'snapshot' per new version."""
+    if HUB.current(game_id) is None:
+        return jsonify({'error': 'Unknown game'}), 404
+    since = request.headers.get('Last-Event-ID', type=int)
+    try:
+        frames = HUB.stream(game_id, since)
+    except HubFull:
+        return jsonify({'error': 'Too many spectators'}), 503, {'Retry-After': '5'}
+    return app.response_class(frames, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
     })
 
 
+# ─── Results ─────────────────────────────────────────────────────────
+
+LEADERBOARDS = {}  # include_stub -> Leaderboard, each updated incrementally
+
+
+@app.route('/api/leaderboard', methods=['GET'])
+def leaderboard_route():
+    """Elo / TrueSkill ratings, win-rate intervals and matchup stats over all recorded games."""
+    store = get_results_store()
+    if store is None:
+        return jsonify({'error': 'The results store is disabled'}), 404
+    include_stub = request.args.get('include_stub') == '1'
+    board = LEADERBOARDS.get(include_stub)
+    if board is None:
+        board = LEADERBOARDS.setdefault(include_stub, Leaderboard(store, include_stub=include_stub))
+    return app.response_class(board.serialized(), mimetype='application/json')
+
+
+@app.route('/api/search', methods=['GET'])
+def search_route():
+    """Full-text + faceted search over archived games (see archive.py).
+
+    ?q=medbay bluff&kind=statement&role=impostor&model=gpt-5.1&player=GPT-1&round=2&limit=50&offset=0
+    """
+    archive = get_archive()
+    if archive is None:
+        return jsonify({'error': 'The archive is disabled'}), 404
+    args = request.args
+    start = time.perf_counter()
+    result = archive.search(
+        args.get('q'),
+        limit=min(args.get('limit', default=50, type=int), 500),
+        offset=args.get('offset', default=0, type=int),
+        facets=args.get('facets', '1') != '0',
+        round=args.get('round', type=int),
+        **{k: args.get(k) for k in ('game_id', 'player', 'model', 'role', 'kind', 'winner', 'win_reason')},
+    )
+    result['took_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return jsonify(result)
+
+
+@app.route('/replays/<path:filename>', methods=['GET'])
+def replay_file(filename):
+    """Finished replays as static files (with HTTP range support, for seeking)."""
+    if not filename.endswith(('.replay', '.index.json')):
+        return jsonify({'error': 'Not found'}), 404
+    response = send_from_directory(os.path.abspath(replay.REPLAY_DIR), filename, conditional=True)
+    # Replays never change once written
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+@app.route('/debug/spectators', methods=['GET'])
+def spectator_stats():
+    return jsonify(HUB.summary())
+
+
+def process_rss():
+    """Resident set size of this process in bytes (Linux; None elsewhere)."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+@app.route('/debug/memory', methods=['GET'])
+def memory_stats():
+    """Where this worker's memory goes: stored games (largest first), spectator snapshots, traces."""
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({
+        'worker': WORKER_ID,
+        'rss_bytes': process_rss(),
+        'store': STORE.stats(),
+        'games': STORE.footprints(limit),
+        'spectators': HUB.footprint(),
+        'traces': tracing.cached_trace_count(),
+    })
+
+
+@app.route('/debug/traces/<game_id>', methods=['GET'])
+def debug_trace(game_id):
+    """Timeline of the latest traced phase of a game (?format=json for Chrome trace JSON)."""
+    t = tracing.latest_trace(game_id)
+    if t is None:
+        return jsonify({'error': 'No trace for this game'}), 404
+    if request.args.get('format') == 'json':
+        return jsonify(tracing.chrome_trace(t))
+    return render_template('trace.html', trace=t, rows=tracing.timeline_rows(t), totals=tracing.span_totals(t))
+
+
 def get_client_state(state):
     """Get state formatted for the client (hides impostor role from raw data)."""
     players_client = []
@@ -770,6 +1460,8 @@ def get_client_state(state):
         })
 
     return {
+        'game_id': state.get('game_id'),
+        'version': state.get('version', 0),
         'players': players_client,
         'round': state['round'],
         'phase': state['phase'],
@@ -778,11 +1470,13 @@ def get_client_state(state):
         'bodies': state['bodies'],
         'discussion_log': state['discussion_log'],
         'discussion_round': state.get('discussion_round', 0),
+        'discussion_mode': state.get('discussion_mode', 'sequential'),
         'vote_results': {
             pid: state['vote_results'][pid]
             for pid in state['vote_results']
         },
         'event_log': state['event_log'][-20:],
+        'event_count': event_count(state),  # lets the client append only the new entries
         'game_over': state['game_over'],
         'winner': state['winner'],
         'win_reason': state.get('win_reason'),
@@ -799,4 +1493,5 @@ def get_client_state(state):
 
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5002)
+    # Development server only; production runs the wsgi:app entry point under gunicorn
+    app.run(debug=os.getenv('FLASK_DEBUG') == '1', port=5002, threaded=True)
@@ -0,0 +1,330 @@
+import os
+import re
+import time
+import zlib
+import fcntl
+import sqlite3
+import argparse
+import threading
+from collections import OrderedDict
+
+import replay
+from serialization import dumps, loads
+
+# Searchable archive of finished games' transcripts.
+#
+# A game's documents (events, statements, votes and every distinct reasoning text)
+# are compressed into one chunk that is appended to the current segment file,
+# data/archive/segment-NNNNNN.seg. A SQLite catalog (index.db) maps games to their
+# chunk and holds an FTS5 full-text index over the documents, plus one metadata
+# row per document (game, round, player, model, role, kind).
+#
+# Facet values are indexed as single tokens in their own FTS columns, so a filter
+# such as role=impostor is one more posting list to intersect with the text
+# terms rather than a join. The FTS index is contentless: document text lives
+# only in the segments, and a search decompresses just the chunks of the games
+# it returns. Queries are ANDs of single terms, so the index keeps which column a
+# term occurs in but not its positions.
+#
+#   python archive.py search medbay --kind statement --role impostor
+
+ARCHIVE_DIR = os.getenv('AMONG_US_ARCHIVE_DIR', 'data/archive')
+
+# A new segment file is started once the current one reaches this size
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# Decompressed chunks kept in memory for building snippets
+CHUNK_CACHE_SIZE = 256
+
+FACETS = ('kind', 'model', 'role', 'player', 'round')
+FILTERS = ('game_id', 'round', 'player', 'model', 'role', 'kind', 'winner', 'win_reason')
+SNIPPET_CHARS = 160
+
+ROUND_PREFIX = re.compile(r"^Round (\d+): ")
+SAYS = re.compile(r"^(.+?) says: \"(.*)\"$", re.S)
+VOTED = re.compile(r"^(.+?) voted for ")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    segment INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    documents INTEGER NOT NULL,
+    gpt_model TEXT,
+    claude_model TEXT,
+    impostor_model TEXT,
+    winner TEXT,
+    win_reason TEXT,
+    rounds INTEGER,
+    archived_at REAL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    game_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    round INTEGER,
+    player TEXT,
+    model TEXT,
+    role TEXT,
+    kind TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_game ON documents (game_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    text, game_id, round, player, model, role, kind, winner, win_reason,
+    content='', columnsize=0, detail='column', tokenize='porter unicode61'
+);
+"""
+
+
+def facet_token(value):
+    """A facet value as one alphanumeric FTS token ("gpt-5.1" -> "gptx2d5x2e1")."""
+    return 'v' + ''.join(c if c.isalnum() and c.isascii() else f"x{ord(c):02x}" for c in str(value).lower())
+
+
+def game_documents(state):
+    """A finished game's searchable documents, in game order.
+
+    Statements and votes come from the event log. Reasoning comes from the game's
+    replay, which holds every phase's reasoning (the game state keeps only the latest).
+    """
+    by_name = {p['name']: p for p in state['players']}
+    by_id = {p['id']: p for p in state['players']}
+    models = {'openai': state['gpt_model_key'], 'anthropic': state['claude_model_key']}
+
+    def doc(kind, round_num, player, text):
+        return {
+            'kind': kind, 'round': round_num, 'text': text,
+            'player': player['name'] if player else None,
+            'model': models[player['team']] if player else None,
+            'role': player['role'] if player else None,
+        }
+
+    docs = []
+    for entry in state['event_log']:
+        m = ROUND_PREFIX.match(entry)
+        round_num = int(m.group(1)) if m else None
+        body = entry[m.end():] if m else entry
+        said = SAYS.match(body)
+        voted = VOTED.match(body)
+        if said and said.group(1) in by_name:
+            docs.append(doc('statement', round_num, by_name[said.group(1)], said.group(2)))
+        elif voted and voted.group(1) in by_name:
+            docs.append(doc('vote', round_num, by_name[voted.group(1)], body))
+        else:
+            docs.append(doc('event', round_num, None, body))
+
+    seen = {}
+    states = list(replay.iter_states(state['game_id'])) or [{'round': state['round'], 'reasoning': state['reasoning']}]
+    for client_state in states:
+        for pid, text in client_state.get('reasoning', {}).items():
+            if text and seen.get(pid) != text and pid in by_id:
+                seen[pid] = text
+                docs.append(doc('reasoning', client_state['round'], by_id[pid], text))
+    return docs
+
+
+class Archive:
+    def __init__(self, path=ARCHIVE_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._local = threading.local()
+        self._cache = OrderedDict()  # game_id -> decompressed documents
+        self._cache_lock = threading.Lock()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(os.path.join(self.path, 'index.db'), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _segment_path(self, segment):
+        return os.path.join(self.path, f"segment-{segment:06d}.seg")
+
+    # ─── Writing ─────────────────────────────────────────────────────
+
+    def add_game(self, state):
+        """Archive and index a finished game. Games already archived are skipped."""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM games WHERE game_id = ?", (state['game_id'],)).fetchone():
+            return False
+        docs = game_documents(state)
+        chunk = zlib.compress(dumps(docs), 9)
+        impostor = next(p for p in state['players'] if p['role'] == 'impostor')
+
+        with open(os.path.join(self.path, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            segment, offset = self._append_chunk(chunk)
+            with conn:
+                conn.execute(
+                    "INSERT INTO games VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (state['game_id'], segment, offset, len(chunk), len(docs),
+                     state['gpt_model_key'], state['claude_model_key'],
+                     state['gpt_model_key'] if impostor['team'] == 'openai' else state['claude_model_key'],
+                     state['winner'], state['win_reason'], state['round'], time.time()),
+                )
+                for seq, d in enumerate(docs):
+                    cur = conn.execute(
+                        "INSERT INTO documents (game_id, seq, round, player, model, role, kind) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (state['game_id'], seq, d['round'], d['player'], d['model'], d['role'], d['kind']),
+                    )
+                    facets = (state['game_id'], d['round'], d['player'], d['model'], d['role'], d['kind'],
+                              state['winner'], state['win_reason'])
+                    conn.execute(
+                        "INSERT INTO documents_fts (rowid, text, game_id, round, player, model, role, kind, "
+                        "winner, win_reason) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (cur.lastrowid, d['text'], *(facet_token(v) if v is not None else '' for v in facets)),
+                    )
+        return True
+
+    def _append_chunk(self, chunk):
+        """Append to the newest segment (rolling over when full). Call with the archive lock held."""
+        segments = sorted(int(name[8:14]) for name in os.listdir(self.path) if name.startswith('segment-'))
+        segment = segments[-1] if segments else 1
+        path = self._segment_path(segment)
+        if os.path.exists(path) and os.path.getsize(path) + len(chunk) > SEGMENT_MAX_BYTES:
+            segment += 1
+            path = self._segment_path(segment)
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            f.write(chunk)
+        return segment, offset
+
+    # ─── Reading ─────────────────────────────────────────────────────
+
+    def documents(self, game_id):
+        """All documents of one archived game (decompressed from its chunk, cached)."""
+        with self._cache_lock:
+            if game_id in self._cache:
+                self._cache.move_to_end(game_id)
+                return self._cache[game_id]
+        row = self._conn().execute("SELECT segment, offset, length FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        if row is None:
+            return None
+        with open(self._segment_path(row[0]), 'rb') as f:
+            f.seek(row[1])
+            docs = loads(zlib.decompress(f.read(row[2])))
+        with self._cache_lock:
+            self._cache[game_id] = docs
+            while len(self._cache) > CHUNK_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return docs
+
+    def search(self, query=None, limit=50, offset=0, facets=True, **filters):
+        """Full-text and faceted search.
+
+        query: words that must all appear (stemmed, case-insensitive); None to browse by filters only.
+        filters: game_id, round, player, model, role, kind, plus winner / win_reason of the game.
+        Returns {'total', 'hits': [...], 'facets': {facet: {value: count}}}.
+        """
+        terms = re.findall(r"\w+", query or "")
+        clauses = [f'"{t}"' for t in terms]
+        clauses += [f"{key} : {facet_token(filters[key])}" for key in FILTERS if filters.get(key) not in (None, '')]
+        conn = self._conn()
+
+        if clauses:
+            match = " AND ".join(clauses)
+            matched = "SELECT rowid FROM documents_fts WHERE documents_fts MATCH ?"
+            total = conn.execute("SELECT COUNT(*) FROM documents_fts WHERE documents_fts MATCH ?", (match,)).fetchone()[0]
+            ids = [r[0] for r in conn.execute(f"{matched} ORDER BY rowid DESC LIMIT ? OFFSET ?", (match, limit, offset))]
+            source, params = "documents_fts f JOIN documents d ON d.id = f.rowid WHERE documents_fts MATCH ?", (match,)
+        else:
+            total = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            ids = [r[0] for r in conn.execute("SELECT id FROM documents ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset))]
+            source, params = "documents d", ()
+
+        rows = {}
+        if ids:
+            rows = {r[0]: r[1:] for r in conn.execute(
+                f"SELECT id, game_id, seq, round, player, model, role, kind FROM documents "
+                f"WHERE id IN ({','.join('?' * len(ids))})", ids)}
+        hits = []
+        for doc_id in ids:
+            game_id, seq, round_num, player, model, role, kind = rows[doc_id]
+            docs = self.documents(game_id)
+            text = docs[seq]['text'] if docs and seq < len(docs) else ''
+            hits.append({'game_id': game_id, 'round': round_num, 'player': player, 'model': model,
+                         'role': role, 'kind': kind, 'snippet': snippet(text, terms)})
+
+        result = {'total': total, 'hits': hits}
+        if facets:
+            # One pass over the matches, grouped by every facet at once
+            counts = {facet: {} for facet in FACETS}
+            columns = ", ".join(f"d.{facet}" for facet in FACETS)
+            for row in conn.execute(f"SELECT {columns}, COUNT(*) FROM {source} GROUP BY {columns}", params):
+                for facet, value in zip(FACETS, row):
+                    counts[facet][str(value)] = counts[facet].get(str(value), 0) + row[-1]
+            result['facets'] = {
+                facet: dict(sorted(values.items(), key=lambda kv: -kv[1])[:20]) for facet, values in counts.items()
+            }
+        return result
+
+    def stats(self):
+        conn = self._conn()
+        games, docs, compressed = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(documents), 0), COALESCE(SUM(length), 0) FROM games").fetchone()
+        return {'games': games, 'documents': docs, 'compressed_bytes': compressed}
+
+
+def snippet(text, terms, width=SNIPPET_CHARS):
+    """A window of text around the first query term (whole text if short)."""
+    if len(text) <= width:
+        return text
+    lowered = text.lower()
+    positions = [lowered.find(t.lower()[:5]) for t in terms]
+    positions = [p for p in positions if p >= 0]
+    start = max(0, min(positions) - width // 3) if positions else 0
+    end = min(len(text), start + width)
+    return ("…" if start else "") + text[start:end] + ("…" if end < len(text) else "")
+
+
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_archive():
+    """The process-wide archive, or None when AMONG_US_ARCHIVE_DIR is set to ''."""
+    global _archive
+    if not ARCHIVE_DIR:
+        return None
+    with _archive_lock:
+        if _archive is None:
+            _archive = Archive(ARCHIVE_DIR)
+        return _archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the archive of finished games.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_search = sub.add_parser('search', help="full-text search with optional facet filters")
+    p_search.add_argument('query', nargs='*')
+    for key in ('game_id', 'player', 'model', 'role', 'kind', 'winner', 'win_reason'):
+        p_search.add_argument(f"--{key.replace('_', '-')}", dest=key)
+    p_search.add_argument('--round', type=int)
+    p_search.add_argument('--limit', type=int, default=20)
+    sub.add_parser('stats', help="archive size")
+    args = parser.parse_args()
+
+    archive = Archive(ARCHIVE_DIR)
+    if args.command == 'stats':
+        print(archive.stats())
+        return
+    filters = {k: getattr(args, k) for k in ('game_id', 'player', 'model', 'role', 'kind', 'winner', 'win_reason', 'round')}
+    t0 = time.perf_counter()
+    result = archive.search(" ".join(args.query), limit=args.limit, **filters)
+    took = (time.perf_counter() - t0) * 1000
+    for hit in result['hits']:
+        who = f"{hit['player']} ({hit['role']}, {hit['model']})" if hit['player'] else "-"
+        print(f"{hit['game_id']} r{hit['round']} {hit['kind']:<9} {who}: {hit['snippet']}")
+    print(f"\n{result['total']} matches in {took:.1f} ms")
+    for facet, counts in result['facets'].items():
+        print(f"  {facet}: {counts}")
+
+
+if __name__ == '__main__':
+    main()
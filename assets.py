@@ -0,0 +1,244 @@
+import os
+import re
+import sys
+import gzip
+import json
+import hashlib
+import argparse
+import mimetypes
+import posixpath
+import threading
+import urllib.request
+
+from flask import send_file, abort
+from werkzeug.security import safe_join
+
+# Static asset pipeline.
+#
+#   python assets.py build   fingerprint, minify and precompress static/ into static/dist/
+#   python assets.py fonts   download the web fonts into static/fonts/ (run once, commit the result)
+#
+# build copies every file under static/ to static/dist/ with a content hash in its
+# name (css/style.css -> css/style.3f2a9c1e0b.css). CSS and JS are minified when
+# rcssmin / rjsmin are installed, url() references inside CSS are rewritten to the
+# hashed names, and text assets get .gz (and, with the brotli package, .br)
+# siblings. static/dist/manifest.json maps each source path to its hashed path.
+#
+# Templates call asset('css/style.css'). After a build that returns the hashed
+# /static/dist/ URL, served with a one-year immutable Cache-Control and the
+# precompressed variant the client accepts. Without a build it returns the plain
+# /static/ URL, so development needs no build step.
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+
+HASH_CHARS = 10
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Already-compressed formats (images, woff2) are only fingerprinted
+PRECOMPRESS = ('.css', '.js', '.svg', '.json', '.txt', '.ttf', '.otf')
+
+FONTS_DIR = os.path.join(STATIC_DIR, 'fonts')
+FONTS_CSS_URL = 'https://fonts.googleapis.com/css2?family=Bungee&family=Rubik:wght@400;500;600;700;800;900&display=swap'
+# Google serves woff2 only to browsers it recognises
+FONTS_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+
+CSS_URL = re.compile(r"url\(\s*(['\"]?)([^'\")]+)\1\s*\)")
+
+
+# ─── Build ───────────────────────────────────────────────────────────
+
+def source_files():
+    """Paths under static/ (relative, '/'-separated), excluding the build output. CSS last, so its url()s resolve."""
+    paths = []
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) != DIST_DIR)
+        for name in sorted(files):
+            paths.append(os.path.relpath(os.path.join(root, name), STATIC_DIR).replace(os.sep, '/'))
+    return sorted(paths, key=lambda p: p.endswith('.css'))
+
+
+def hashed_name(path, data):
+    stem, ext = posixpath.splitext(path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:HASH_CHARS]}{ext}"
+
+
+def rewrite_css_urls(css, path, manifest):
+    """Point url() references at the hashed files they resolve to."""
+    base = posixpath.dirname(path)
+
+    def replace(match):
+        ref = match.group(2).split('?')[0].split('#')[0]
+        if ref.startswith('/static/'):
+            target = ref[len('/static/'):]
+        else:
+            target = posixpath.normpath(posixpath.join(base, ref))
+        if target not in manifest:
+            return match.group(0)
+        return f"url({posixpath.relpath(manifest[target], base)})"
+
+    return CSS_URL.sub(replace, css)
+
+
+def minify(path, data, manifest):
+    if path.endswith('.css'):
+        css = rewrite_css_urls(data.decode(), path, manifest)
+        return (rcssmin.cssmin(css) if rcssmin else css).encode()
+    if path.endswith('.js') and rjsmin:
+        return rjsmin.jsmin(data.decode()).encode()
+    return data
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build():
+    """Write static/dist/ and its manifest. Returns {path: {hashed, bytes, gzip, br}} for the report."""
+    manifest, report = {}, {}
+    for path in source_files():
+        with open(os.path.join(STATIC_DIR, path), 'rb') as f:
+            data = minify(path, f.read(), manifest)
+        hashed = hashed_name(path, data)
+        manifest[path] = hashed
+        out = os.path.join(DIST_DIR, hashed)
+        entry = report[path] = {'hashed': hashed, 'bytes': len(data)}
+        if os.path.exists(out):
+            continue  # same content as an earlier build
+        write_file(out, data)
+        if path.endswith(PRECOMPRESS):
+            write_file(out + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                write_file(out + '.br', brotli.compress(data, quality=11))
+    for entry in report.values():
+        out = os.path.join(DIST_DIR, entry['hashed'])
+        for suffix, key in (('.gz', 'gzip'), ('.br', 'br')):
+            if os.path.exists(out + suffix):
+                entry[key] = os.path.getsize(out + suffix)
+    # Older hashed files stay, so pages rendered before this build keep loading
+    write_file(MANIFEST_PATH, json.dumps(manifest, indent=1, sort_keys=True).encode())
+    return report
+
+
+def fetch(url):
+    request = urllib.request.Request(url, headers={'User-Agent': FONTS_USER_AGENT})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return response.read()
+
+
+def download_fonts():
+    """Vendor the Google Fonts stylesheet and its woff2 files into static/fonts/. Returns the files written."""
+    css = fetch(FONTS_CSS_URL).decode()
+    files = {}  # remote url -> local name; Rubik's weights share one variable font file
+
+    def replace(match):
+        url = match.group(2)
+        if url not in files:
+            family = re.sub(r"\W", '', url.split('/s/')[1].split('/')[0]).lower() if '/s/' in url else 'font'
+            files[url] = f"{family}-{len(files)}{posixpath.splitext(url)[1]}"
+        return f"url({files[url]})"
+
+    css = CSS_URL.sub(replace, css)
+    os.makedirs(FONTS_DIR, exist_ok=True)
+    for url, name in files.items():
+        write_file(os.path.join(FONTS_DIR, name), fetch(url))
+    write_file(os.path.join(FONTS_DIR, 'fonts.css'), css.encode())
+    return ['fonts.css'] + list(files.values())
+
+
+# ─── Serving ─────────────────────────────────────────────────────────
+
+_manifest = (None, {})  # (mtime, manifest)
+_manifest_lock = threading.Lock()
+
+
+def load_manifest():
+    """The build manifest, reloaded when a new build replaces it ({} before the first build)."""
+    global _manifest
+    try:
+        mtime = os.stat(MANIFEST_PATH).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    with _manifest_lock:
+        if _manifest[0] != mtime:
+            with open(MANIFEST_PATH) as f:
+                _manifest = (mtime, json.load(f))
+        return _manifest[1]
+
+
+def asset_url(path):
+    """URL of a static file: its fingerprinted build output if there is one, the source file otherwise."""
+    hashed = load_manifest().get(path)
+    return f"/static/dist/{hashed}" if hashed else f"/static/{path}"
+
+
+def has_asset(path):
+    return path in load_manifest() or os.path.exists(os.path.join(STATIC_DIR, path))
+
+
+def send_asset(filename, accept_encodings):
+    """Serve a fingerprinted file, precompressed when the client accepts it. Names never change content."""
+    path = safe_join(DIST_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accept_encodings[candidate] and os.path.exists(path + suffix):
+            path, encoding = path + suffix, candidate
+            break
+    response = send_file(path, mimetype=mimetype, max_age=31536000, etag=False, conditional=True)
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or vendor static assets.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help="fingerprint, minify and precompress static/ into static/dist/")
+    sub.add_parser('fonts', help="download the web fonts into static/fonts/")
+    args = parser.parse_args()
+
+    if args.command == 'fonts':
+        for name in download_fonts():
+            print(f"static/fonts/{name}")
+        return
+
+    report = build()
+    print(f"{'asset':<42} {'bytes':>9} {'gzip':>9} {'br':>9}")
+    for path, entry in report.items():
+        print(f"{entry['hashed']:<42} {entry['bytes']:>9} {entry.get('gzip', '-'):>9} {entry.get('br', '-'):>9}")
+    missing = [name for name, module in (('rcssmin', rcssmin), ('rjsmin', rjsmin), ('brotli', brotli)) if module is None]
+    if missing:
+        print(f"\nWARNING: {', '.join(missing)} not installed; CSS/JS are left unminified or .br files are not "
+              f"written. Run pip install -r requirements.txt and build again.", file=sys.stderr)
+    if not os.path.exists(os.path.join(FONTS_DIR, 'fonts.css')):
+        print("\nWARNING: web fonts are not vendored, so the page still loads them from Google Fonts. "
+              "Run python assets.py fonts, commit static/fonts/ and build again.", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+import json
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import Future
+
+import anthropic
+from openai import OpenAI
+
+import openai_model
+import anthropic_model
+from tracing import record_usage
+
+# Batch execution backend for headless tournaments.
+#
+# Game threads use BatchCollector.call() like any other entry in app.CALL_BACKENDS.
+# Calls are queued until the games go quiet, grouped by provider and model, submitted
+# as one OpenAI Batch / Anthropic Message Batches job each, polled until done, and
+# every result is handed back to the game thread that is waiting on it.
+
+# USD per 1M tokens at standard (non-batch) rates: (input, output)
+PRICING = {
+    'gpt-5-mini': (0.25, 2.00),
+    'gpt-5.1': (1.25, 10.00),
+    'gpt-5.2': (1.75, 14.00),
+    'claude-haiku-4-5-20251001': (1.00, 5.00),
+    'claude-sonnet-4-5-20250929': (3.00, 15.00),
+    'claude-opus-4-5-20251101': (5.00, 25.00),
+}
+
+# Both providers bill batch requests at half price
+BATCH_DISCOUNT = 0.5
+
+
+def estimate_cost(model_id, input_tokens, output_tokens, discount=BATCH_DISCOUNT):
+    """Estimated USD cost of a batch, or None for models missing from PRICING."""
+    if model_id not in PRICING:
+        return None
+    in_price, out_price = PRICING[model_id]
+    return round((input_tokens * in_price + output_tokens * out_price) / 1_000_000 * discount, 6)
+
+
+# ─── Providers ────────────────────────────────────────────────────────
+
+class OpenAIBatchProvider:
+    """Submits calls through the OpenAI Batch API (/v1/responses endpoint)."""
+
+    name = 'openai'
+
+    def __init__(self, base_url=None, api_key=None):
+        if base_url or api_key:
+            self.client = OpenAI(base_url=base_url, api_key=api_key)
+        else:
+            self.client = openai_model.get_client()
+
+    def submit(self, calls):
+        lines = []
+        for c in calls:
+            lines.append(json.dumps({
+                'custom_id': c['custom_id'],
+                'method': 'POST',
+                'url': '/v1/responses',
+                'body': openai_model.build_batch_body(c['prompt_type'], c['prompt'], c['model_id'], c['model_key']),
+            }))
+        input_file = self.client.files.create(file=('batch.jsonl', "\n".join(lines).encode('utf-8')), purpose='batch')
+        batch = self.client.batches.create(input_file_id=input_file.id, endpoint='/v1/responses', completion_window='24h')
+        return batch.id
+
+    def poll(self, batch_id):
+        """Return True once the batch has finished; raise if it can no longer finish."""
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status in ('failed', 'expired', 'cancelled'):
+            raise RuntimeError(f"OpenAI batch {batch_id} ended with status '{batch.status}'")
+        return batch.status == 'completed'
+
+    def results(self, batch_id, calls):
+        """Return {custom_id: (result, reasoning, usage) or Exception}."""
+        by_id = {c['custom_id']: c for c in calls}
+        batch = self.client.batches.retrieve(batch_id)
+        out = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                call = by_id.get(item.get('custom_id'))
+                if call is None:
+                    continue
+                response = item.get('response') or {}
+                if item.get('error') or response.get('status_code') != 200:
+                    out[call['custom_id']] = RuntimeError(f"Batch request failed: {item.get('error') or response}")
+                    continue
+                body = response['body']
+                try:
+                    result, reasoning = openai_model.parse_batch_body(call['prompt_type'], body, call['model_key'])
+                except Exception as e:
+                    out[call['custom_id']] = e
+                    continue
+                usage = body.get('usage') or {}
+                out[call['custom_id']] = (result, reasoning, {
+                    'input_tokens': usage.get('input_tokens', 0),
+                    'output_tokens': usage.get('output_tokens', 0),
+                })
+        return out
+
+
+class AnthropicBatchProvider:
+    """Submits calls through the Anthropic Message Batches API."""
+
+    name = 'anthropic'
+
+    def __init__(self, base_url=None, api_key=None):
+        if base_url or api_key:
+            self.client = anthropic.Anthropic(base_url=base_url, api_key=api_key)
+        else:
+            self.client = anthropic_model.get_client()
+
+    def submit(self, calls):
+        requests = [{
+            'custom_id': c['custom_id'],
+            'params': anthropic_model.build_batch_params(c['prompt_type'], c['prompt'], c['model_id'], c['use_thinking']),
+        } for c in calls]
+        batch = self.client.beta.messages.batches.create(requests=requests, betas=anthropic_model.BETAS)
+        return batch.id
+
+    def poll(self, batch_id):
+        """Return True once the batch has finished processing."""
+        batch = self.client.beta.messages.batches.retrieve(batch_id)
+        return batch.processing_status == 'ended'
+
+    def results(self, batch_id, calls):
+        """Return {custom_id: (result, reasoning, usage) or Exception}."""
+        by_id = {c['custom_id']: c for c in calls}
+        out = {}
+        for entry in self.client.beta.messages.batches.results(batch_id, betas=anthropic_model.BETAS):
+            call = by_id.get(entry.custom_id)
+            if call is None:
+                continue
+            if entry.result.type != 'succeeded':
+                out[call['custom_id']] = RuntimeError(f"Batch request {entry.result.type}")
+                continue
+            message = entry.result.message
+            try:
+                result, reasoning = anthropic_model.parse_batch_message(message, call['use_thinking'])
+            except Exception as e:
+                out[call['custom_id']] = e
+                continue
+            out[call['custom_id']] = (result, reasoning, {
+                'input_tokens': message.usage.input_tokens,
+                'output_tokens': message.usage.output_tokens,
+            })
+        return out
+
+
+def make_providers(base_url=None, api_key=None):
+    """Batch providers keyed by team. base_url points both at a stand-in server (see batch_server.py)."""
+    return {
+        'openai': OpenAIBatchProvider(base_url=f"{base_url.rstrip('/')}/v1" if base_url else None, api_key=api_key),
+        'anthropic': AnthropicBatchProvider(base_url=base_url, api_key=api_key),
+    }
+
+
+# ─── Collector ────────────────────────────────────────────────────────
+
+class BatchCollector:
+    """Collects model calls from concurrent games and runs them as provider batches.
+
+    A batch is submitted once no new call has arrived for `settle` seconds (every game
+    is then waiting on its phase) or `max_batch_size` calls are queued.
+    """
+
+    def __init__(self, providers, settle=0.5, poll_interval=30.0, max_batch_size=5000):
+        self.providers = providers
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.max_batch_size = max_batch_size
+
+        self.lock = threading.Lock()
+        self.pending = []
+        self.last_enqueue = 0.0
+        self.in_flight = []  # {'batch_id', 'provider', 'model_id', 'calls', 'submitted_at', 'next_poll'}
+        self.reports = []
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='batch-collector', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def call(self, team, prompt_type, prompt, model_id, model_key, use_thinking, conversation=None):
+        """Model backend entry point. Blocks until the call's batch has finished."""
+        if conversation is not None:
+            raise ValueError("The batch backend does not support conversation mode")
+        future = Future()
+        with self.lock:
+            self.pending.append({
+                'custom_id': f"call-{uuid.uuid4().hex}",
+                'team': team,
+                'prompt_type': prompt_type,
+                'prompt': prompt,
+                'model_id': model_id,
+                'model_key': model_key,
+                'use_thinking': use_thinking,
+                'future': future,
+            })
+            self.last_enqueue = time.time()
+        result, reasoning, usage = future.result()
+        # Reported from the caller's thread, where call_ai is metering this call
+        record_usage(usage['input_tokens'], usage['output_tokens'])
+        return result, reasoning
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._flush()
+            self._poll()
+            self._stop.wait(min(self.settle, 0.1))
+
+    def _flush(self):
+        with self.lock:
+            settled = time.time() - self.last_enqueue >= self.settle
+            if not self.pending or (not settled and len(self.pending) < self.max_batch_size):
+                return
+            calls, self.pending = self.pending, []
+
+        groups = {}
+        for c in calls:
+            groups.setdefault((c['team'], c['model_id']), []).append(c)
+
+        for (team, model_id), group in groups.items():
+            for i in range(0, len(group), self.max_batch_size):
+                chunk = group[i:i + self.max_batch_size]
+                provider = self.providers[team]
+                try:
+                    batch_id = provider.submit(chunk)
+                except Exception as e:
+                    logging.warning(f"Batch submit to {provider.name} failed: {e}")
+                    for c in chunk:
+                        c['future'].set_exception(e)
+                    continue
+                logging.info(f"Submitted {provider.name} batch {batch_id} ({len(chunk)} calls, {model_id})")
+                now = time.time()
+                self.in_flight.append({
+                    'batch_id': batch_id,
+                    'provider': provider,
+                    'model_id': model_id,
+                    'calls': chunk,
+                    'submitted_at': now,
+                    'next_poll': now + self.poll_interval,
+                })
+
+    def _poll(self):
+        now = time.time()
+        for batch in list(self.in_flight):
+            if now < batch['next_poll']:
+                continue
+            batch['next_poll'] = now + self.poll_interval
+            provider = batch['provider']
+            try:
+                if not provider.poll(batch['batch_id']):
+                    continue
+                results = provider.results(batch['batch_id'], batch['calls'])
+            except RuntimeError as e:
+                logging.warning(f"Batch {batch['batch_id']} failed: {e}")
+                results = {c['custom_id']: e for c in batch['calls']}
+            except Exception as e:
+                # Network/API hiccup: the batch itself is still running, try again next interval
+                logging.warning(f"Polling batch {batch['batch_id']} failed, retrying: {e}")
+                continue
+
+            self.in_flight.remove(batch)
+            self._resolve(batch, results)
+
+    def _resolve(self, batch, results):
+        succeeded = failed = input_tokens = output_tokens = 0
+        for c in batch['calls']:
+            res = results.get(c['custom_id'], RuntimeError("Missing from batch results"))
+            if isinstance(res, Exception):
+                failed += 1
+                c['future'].set_exception(res)
+                continue
+            result, reasoning, usage = res
+            succeeded += 1
+            input_tokens += usage['input_tokens']
+            output_tokens += usage['output_tokens']
+            c['future'].set_result((result, reasoning, usage))
+
+        wall = time.time() - batch['submitted_at']
+        report = {
+            'batch_id': batch['batch_id'],
+            'provider': batch['provider'].name,
+            'model_id': batch['model_id'],
+            'requests': len(batch['calls']),
+            'succeeded': succeeded,
+            'failed': failed,
+            'wall_seconds': round(wall, 2),
+            'requests_per_second': round(len(batch['calls']) / wall, 2) if wall else None,
+            'input_tokens': input_tokens,
+            'output_tokens': output_tokens,
+            'cost_usd': estimate_cost(batch['model_id'], input_tokens, output_tokens),
+        }
+        self.reports.append(report)
+        logging.info(
+            f"Batch {report['batch_id']} done: {succeeded}/{report['requests']} ok in {report['wall_seconds']}s, "
+            f"{input_tokens}+{output_tokens} tokens, ${report['cost_usd']}"
+        )
+
+    def summary(self):
+        """Totals across all finished batches."""
+        total = {'batches': len(self.reports), 'requests': 0, 'succeeded': 0, 'failed': 0,
+                 'input_tokens': 0, 'output_tokens': 0, 'cost_usd': 0.0}
+        for r in self.reports:
+            for key in ('requests', 'succeeded', 'failed', 'input_tokens', 'output_tokens'):
+                total[key] += r[key]
+            total['cost_usd'] += r['cost_usd'] or 0.0
+        total['cost_usd'] = round(total['cost_usd'], 6)
+        return total
@@ -0,0 +1,200 @@
+import json
+import time
+import uuid
+import argparse
+import threading
+
+from flask import Flask, jsonify, request, Response
+
+from stub_model import stub_reply, estimate_tokens
+
+# Local stand-in for the OpenAI Batch and Anthropic Message Batches APIs, for testing
+# the batch backend without API keys or cost. It implements just the endpoints the
+# SDKs hit from batch_backend.py and answers every request with the offline stub model.
+#
+#   python batch_server.py --port 5055 --delay 2
+#   python headless.py --games 10 --backend batch --batch-base-url http://127.0.0.1:5055
+
+app = Flask(__name__)
+
+# Seconds a submitted batch stays in progress before its results are available
+COMPLETION_DELAY = 2.0
+
+FILES = {}  # file_id -> bytes
+OPENAI_BATCHES = {}  # batch_id -> {'batch': dict, 'lines': [...], 'ready_at': float}
+ANTHROPIC_BATCHES = {}  # batch_id -> {'batch': dict, 'requests': [...], 'ready_at': float}
+_lock = threading.Lock()
+
+FORMAT_TYPES = {'ActionResponse': 'action', 'DiscussionResponse': 'discussion', 'VoteResponse': 'vote'}
+
+
+def _prompt_type_from_schema(schema):
+    props = schema.get('properties', {})
+    if 'room' in props:
+        return 'action'
+    if 'statement' in props:
+        return 'discussion'
+    return 'vote'
+
+
+def _last_user_text(messages):
+    content = messages[-1]['content']
+    if isinstance(content, str):
+        return content
+    return "".join(block.get('text', '') for block in content)
+
+
+# ─── OpenAI Batch API ────────────────────────────────────────────────
+
+@app.route('/v1/files', methods=['POST'])
+def openai_upload_file():
+    upload = request.files['file']
+    data = upload.read()
+    file_id = f"file-{uuid.uuid4().hex}"
+    with _lock:
+        FILES[file_id] = data
+    return jsonify({
+        'id': file_id, 'object': 'file', 'bytes': len(data), 'created_at': int(time.time()),
+        'filename': upload.filename, 'purpose': request.form.get('purpose', 'batch'), 'status': 'processed',
+    })
+
+
+@app.route('/v1/files/<file_id>/content', methods=['GET'])
+def openai_file_content(file_id):
+    if file_id not in FILES:
+        return jsonify({'error': {'message': 'No such file'}}), 404
+    return Response(FILES[file_id], mimetype='application/jsonl')
+
+
+@app.route('/v1/batches', methods=['POST'])
+def openai_create_batch():
+    data = request.get_json()
+    if data['input_file_id'] not in FILES:
+        return jsonify({'error': {'message': 'No such file'}}), 404
+    lines = [json.loads(l) for l in FILES[data['input_file_id']].decode('utf-8').splitlines() if l.strip()]
+    batch_id = f"batch_{uuid.uuid4().hex}"
+    batch = {
+        'id': batch_id, 'object': 'batch', 'endpoint': data['endpoint'], 'input_file_id': data['input_file_id'],
+        'completion_window': data['completion_window'], 'status': 'in_progress', 'created_at': int(time.time()),
+        'output_file_id': None, 'error_file_id': None,
+        'request_counts': {'total': len(lines), 'completed': 0, 'failed': 0},
+    }
+    with _lock:
+        OPENAI_BATCHES[batch_id] = {'batch': batch, 'lines': lines, 'ready_at': time.time() + COMPLETION_DELAY}
+    return jsonify(batch)
+
+
+def _complete_openai_batch(entry):
+    out = []
+    for line in entry['lines']:
+        body = line['body']
+        prompt_type = FORMAT_TYPES.get(body.get('text', {}).get('format', {}).get('name'), 'vote')
+        prompt = _last_user_text(body['input'])
+        reply = json.dumps(stub_reply(prompt_type, prompt))
+        input_tokens = sum(estimate_tokens(_last_user_text([m])) for m in body['input'])
+        output_tokens = estimate_tokens(reply)
+        out.append(json.dumps({
+            'id': f"batch_req_{uuid.uuid4().hex}",
+            'custom_id': line['custom_id'],
+            'response': {
+                'status_code': 200,
+                'request_id': uuid.uuid4().hex,
+                'body': {
+                    'id': f"resp_{uuid.uuid4().hex}", 'object': 'response', 'model': body['model'],
+                    'output': [{'type': 'message', 'role': 'assistant',
+                                'content': [{'type': 'output_text', 'text': reply}]}],
+                    'usage': {'input_tokens': input_tokens, 'output_tokens': output_tokens,
+                              'total_tokens': input_tokens + output_tokens},
+                },
+            },
+            'error': None,
+        }))
+    file_id = f"file-{uuid.uuid4().hex}"
+    FILES[file_id] = "\n".join(out).encode('utf-8')
+    entry['batch'].update({
+        'status': 'completed', 'output_file_id': file_id, 'completed_at': int(time.time()),
+        'request_counts': {'total': len(out), 'completed': len(out), 'failed': 0},
+    })
+
+
+@app.route('/v1/batches/<batch_id>', methods=['GET'])
+def openai_retrieve_batch(batch_id):
+    with _lock:
+        entry = OPENAI_BATCHES.get(batch_id)
+        if entry is None:
+            return jsonify({'error': {'message': 'No such batch'}}), 404
+        if entry['batch']['status'] == 'in_progress' and time.time() >= entry['ready_at']:
+            _complete_openai_batch(entry)
+        return jsonify(entry['batch'])
+
+
+# ─── Anthropic Message Batches API ───────────────────────────────────
+
+@app.route('/v1/messages/batches', methods=['POST'])
+def anthropic_create_batch():
+    data = request.get_json()
+    batch_id = f"msgbatch_{uuid.uuid4().hex}"
+    now = time.time()
+    batch = {
+        'id': batch_id, 'type': 'message_batch', 'processing_status': 'in_progress',
+        'request_counts': {'processing': len(data['requests']), 'succeeded': 0, 'errored': 0,
+                           'canceled': 0, 'expired': 0},
+        'created_at': _iso(now), 'expires_at': _iso(now + 86400), 'ended_at': None,
+        'archived_at': None, 'cancel_initiated_at': None, 'results_url': None,
+    }
+    with _lock:
+        ANTHROPIC_BATCHES[batch_id] = {'batch': batch, 'requests': data['requests'], 'ready_at': now + COMPLETION_DELAY}
+    return jsonify(batch)
+
+
+@app.route('/v1/messages/batches/<batch_id>', methods=['GET'])
+def anthropic_retrieve_batch(batch_id):
+    with _lock:
+        entry = ANTHROPIC_BATCHES.get(batch_id)
+        if entry is None:
+            return jsonify({'type': 'error', 'error': {'type': 'not_found_error', 'message': 'No such batch'}}), 404
+        batch = entry['batch']
+        if batch['processing_status'] == 'in_progress' and time.time() >= entry['ready_at']:
+            n = len(entry['requests'])
+            batch.update({
+                'processing_status': 'ended', 'ended_at': _iso(time.time()),
+                'request_counts': {'processing': 0, 'succeeded': n, 'errored': 0, 'canceled': 0, 'expired': 0},
+                'results_url': f"{request.host_url.rstrip('/')}/v1/messages/batches/{batch_id}/results",
+            })
+        return jsonify(batch)
+
+
+@app.route('/v1/messages/batches/<batch_id>/results', methods=['GET'])
+def anthropic_batch_results(batch_id):
+    entry = ANTHROPIC_BATCHES.get(batch_id)
+    if entry is None or entry['batch']['processing_status'] != 'ended':
+        return jsonify({'type': 'error', 'error': {'type': 'not_found_error', 'message': 'Results not ready'}}), 404
+    out = []
+    for req in entry['requests']:
+        params = req['params']
+        prompt = _last_user_text(params['messages'])
+        reply = json.dumps(stub_reply(_prompt_type_from_schema(params['output_format']['schema']), prompt))
+        out.append(json.dumps({
+            'custom_id': req['custom_id'],
+            'result': {'type': 'succeeded', 'message': {
+                'id': f"msg_{uuid.uuid4().hex}", 'type': 'message', 'role': 'assistant', 'model': params['model'],
+                'content': [{'type': 'text', 'text': reply}],
+                'stop_reason': 'end_turn', 'stop_sequence': None,
+                'usage': {'input_tokens': estimate_tokens(prompt), 'output_tokens': estimate_tokens(reply)},
+            }},
+        }))
+    return Response("\n".join(out), mimetype='application/binary')
+
+
+def _iso(ts):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI / Anthropic batch APIs.")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--delay', type=float, default=COMPLETION_DELAY,
+                        help="seconds before a submitted batch completes")
+    args = parser.parse_args()
+    COMPLETION_DELAY = args.delay
+    app.run(port=args.port, threaded=True)
@@ -0,0 +1,288 @@
+import gc
+import os
+import sys
+import copy
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import app
+from headless import run_game
+from repair import build_index
+from spectator_hub import Snapshot
+import serialization
+
+# Micro and end-to-end benchmarks for the game engine. All model calls go to the
+# offline stub backend, so this measures our own CPU cost only.
+#
+#   python bench.py run --out bench_results/baseline.json
+#   python bench.py run --out bench_results/current.json
+#   python bench.py compare bench_results/baseline.json bench_results/current.json --threshold 0.15
+
+LOBBY_SIZES = [4, 6, 10]
+RESULTS_DIR = 'bench_results'
+
+
+# ─── Fixtures ────────────────────────────────────────────────────────
+
+def make_state(lobby_size, seed=0):
+    """A fresh stub-backed game with `lobby_size` players (extra players beyond the usual 6 are generated).
+
+    Play it inside generated_player_names(), or votes for the generated players count as skips.
+    """
+    random.seed(seed)
+    state = app.init_game_state(backend='stub')
+    players = state['players']
+
+    if lobby_size < len(players):
+        impostor = app.get_impostor(state)
+        crew = [p for p in players if p['role'] == 'crewmate'][:lobby_size - 1]
+        state['players'] = [p for p in players if p is impostor or p in crew]
+    else:
+        for k in range(len(players), lobby_size):
+            team = 'openai' if k % 2 == 0 else 'anthropic'
+            pid, name = _generated_player(k)
+            task_a, task_b = app.ALL_TASKS[(2 * k) % len(app.ALL_TASKS)], app.ALL_TASKS[(2 * k + 1) % len(app.ALL_TASKS)]
+            players.append({
+                'id': pid, 'name': name, 'team': team,
+                'color': '#888888', 'role': 'crewmate', 'alive': True, 'ejected': False, 'location': 'Cafeteria',
+                'tasks': [{'name': t[0], 'room': t[1], 'done': False} for t in (task_a, task_b)], 'tasks_done': 0,
+            })
+
+    state['total_tasks_needed'] = sum(len(p['tasks']) for p in state['players'] if p['role'] == 'crewmate')
+    for i, p in enumerate(state['players']):
+        p['location'] = app.ROOMS[i % len(app.ROOMS)]
+    for i in range(15):
+        state['event_log'].append(f"Round 1: {state['players'][i % lobby_size]['name']} moved from Cafeteria to MedBay")
+    return state
+
+
+def _generated_player(k):
+    """(id, name) of the k-th player of a lobby, for k past the usual players."""
+    pid = f"{'gpt' if k % 2 == 0 else 'claude'}-{k // 2 + 1}"
+    return pid, pid.replace('gpt', 'GPT').replace('claude', 'Claude')
+
+
+@contextmanager
+def generated_player_names(lobby_size=max(LOBBY_SIZES)):
+    """Make the answer validator resolve generated player names, restoring app's name indexes on exit."""
+    saved = dict(app.VOTE_INDEX), dict(app.PLAYER_INDEX)
+    extra = build_index([_generated_player(k)[1] for k in range(len(app.PLAYER_DEFS), lobby_size)])
+    app.VOTE_INDEX.update(extra)
+    app.PLAYER_INDEX.update(extra)
+    try:
+        yield
+    finally:
+        for index, original in zip((app.VOTE_INDEX, app.PLAYER_INDEX), saved):
+            index.clear()
+            index.update(original)
+
+
+def make_meeting_state(lobby_size, with_statements=False):
+    """A state in the discussion phase: one crewmate is dead and their body was found."""
+    state = make_state(lobby_size)
+    victim = next(p for p in state['players'] if p['role'] == 'crewmate')
+    victim['alive'] = False
+    state['bodies'] = [{'player_id': victim['id'], 'room': victim['location']}]
+    state['phase'] = 'discussion'
+    state['meeting_triggered'] = True
+    state['meeting_reason'] = f"Someone found {victim['name']}'s body in {victim['location']}!"
+    if with_statements:
+        for rnd in range(2):
+            for p in app.alive_players(state):
+                state['discussion_log'].append({
+                    'player': p['name'], 'player_id': p['id'], 'round': rnd,
+                    'statement': f"I was in {p['location']} and saw nothing unusual this round.",
+                })
+        state['phase'] = 'voting'
+    return state
+
+
+def make_midgame_state(lobby_size, phases=12):
+    """A state after a dozen stub-played phases, for realistic client-state payloads."""
+    state = make_state(lobby_size)
+    for _ in range(phases):
+        if state['game_over']:
+            break
+        app.advance_phase(state)
+    for pid in state['reasoning']:
+        state['reasoning'][pid] = "Thinking about who was where and whose story holds up. " * 20
+    return state
+
+
+# ─── Measurement ─────────────────────────────────────────────────────
+
+def measure(fn, setup=None, min_time=0.3, repeats=5, alloc_samples=10):
+    """Time fn(setup()) and sample its allocations. Only fn is timed."""
+    rates = []
+    for _ in range(repeats):
+        gc.collect()
+        total, ops = 0.0, 0
+        while total < min_time / repeats or ops == 0:
+            arg = setup() if setup else None
+            t0 = time.perf_counter()
+            fn(arg)
+            total += time.perf_counter() - t0
+            ops += 1
+        rates.append(ops / total)
+
+    peaks, retained, sizes = [], [], []
+    tracemalloc.start()
+    for _ in range(alloc_samples):
+        arg = setup() if setup else None
+        gc.collect()
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn(arg)
+        current, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - base)
+        retained.append(current - base)
+        if isinstance(result, (bytes, str)):
+            sizes.append(len(result))
+        del result, arg
+    tracemalloc.stop()
+
+    median = statistics.median(rates)
+    result = {
+        'ops_per_sec': round(median, 2),
+        'best_ops_per_sec': round(max(rates), 2),
+        'us_per_op': round(1e6 / median, 2),
+        'alloc_peak_bytes': int(statistics.median(peaks)),
+        'alloc_retained_bytes': int(statistics.median(retained)),
+    }
+    if sizes:
+        # Benchmarks that return a payload also report its size on the wire
+        result['output_bytes'] = int(statistics.median(sizes))
+    return result
+
+
+def benchmarks():
+    """Yield (name, fn, setup) for every benchmark."""
+    for n in LOBBY_SIZES:
+        state = make_state(n)
+        crew = next(p for p in state['players'] if p['role'] == 'crewmate')
+        impostor = app.get_impostor(state)
+        yield f"prompt.action.crewmate[{n}]", lambda _, s=state, p=crew: app.generate_action_prompt(p, s), None
+        yield f"prompt.action.impostor[{n}]", lambda _, s=state, p=impostor: app.generate_action_prompt(p, s), None
+
+        voting = make_meeting_state(n, with_statements=True)
+        voter = app.alive_players(voting)[0]
+        yield f"prompt.discussion[{n}]", lambda _, s=voting, p=voter: app.generate_discussion_prompt(p, s, 1), None
+        yield f"prompt.vote[{n}]", lambda _, s=voting, p=voter: app.generate_vote_prompt(p, s), None
+
+        yield f"phase.action[{n}]", app.execute_action_phase, lambda s=state: copy.deepcopy(s)
+        yield f"phase.discovery[{n}]", app.execute_discovery_phase, lambda n=n: make_meeting_state(n)
+        yield f"phase.discussion[{n}]", lambda s: app.execute_discussion_phase(s, 0), lambda n=n: make_meeting_state(n)
+        yield f"phase.voting[{n}]", app.execute_voting_phase, lambda s=voting: copy.deepcopy(s)
+        yield f"check_win_conditions[{n}]", lambda _, s=state: app.check_win_conditions(s), None
+
+        midgame = make_midgame_state(n)
+        yield f"client_state.build[{n}]", lambda _, s=midgame: app.get_client_state(s), None
+        yield f"client_state.json[{n}]", lambda _, s=midgame: serialization.dumps(app.get_client_state(s)), None
+        yield f"client_state.json_stdlib[{n}]", lambda _, s=midgame: _stdlib_json(app.get_client_state(s)), None
+        payload = serialization.dumps(app.get_client_state(midgame))
+        yield f"client_state.gzip[{n}]", lambda _, d=payload: serialization.compress(d, 'gzip'), None
+        if serialization.brotli is not None:
+            yield f"client_state.brotli[{n}]", lambda _, d=payload: serialization.compress(d, 'br'), None
+        yield f"spectate.publish[{n}]", lambda _, s=midgame: Snapshot(1, app.get_client_state(s)), None
+
+        yield f"game.headless[{n}]", lambda s: run_game(s, record=False), lambda n=n: make_state(n, seed=random.randrange(1 << 30))
+
+
+def _stdlib_json(obj):
+    """What Flask's default provider produced before the fast serializer, for comparison."""
+    return json.dumps(obj, sort_keys=True, separators=(',', ':')).encode()
+
+
+def run(args):
+    results = {}
+    random.seed(0)
+    with generated_player_names():
+        for name, fn, setup in benchmarks():
+            if args.filter and args.filter not in name:
+                continue
+            min_time = args.min_time * (5 if name.startswith('game.') else 1)
+            results[name] = measure(fn, setup, min_time=min_time)
+            r = results[name]
+            size = f" {r['output_bytes']:>10,} B out" if 'output_bytes' in r else ''
+            print(f"{name:<32} {r['ops_per_sec']:>12,.1f} ops/s {r['us_per_op']:>12,.1f} us/op "
+                  f"{r['alloc_peak_bytes']:>12,} B peak{size}")
+
+    report = {'meta': _meta(), 'results': results}
+    out = args.out or os.path.join(RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {len(results)} results to {out}")
+
+
+def _meta():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        base = json.load(f)['results']
+    with open(args.current) as f:
+        current = json.load(f)['results']
+
+    regressions = []
+    print(f"{'benchmark':<32} {'base ops/s':>12} {'now ops/s':>12} {'change':>8} {'alloc':>8}")
+    for name in sorted(set(base) & set(current)):
+        b, c = base[name], current[name]
+        speed = c['ops_per_sec'] / b['ops_per_sec'] - 1
+        alloc = (c['alloc_peak_bytes'] / b['alloc_peak_bytes'] - 1) if b['alloc_peak_bytes'] else 0.0
+        flag = ''
+        if speed < -args.threshold or alloc > args.threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<32} {b['ops_per_sec']:>12,.1f} {c['ops_per_sec']:>12,.1f} {speed:>+8.1%} {alloc:>+8.1%}{flag}")
+
+    for name in sorted(set(base) ^ set(current)):
+        print(f"{name:<32} only in {'baseline' if name in base else 'current'}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Game engine benchmarks (offline stub model).")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_run = sub.add_parser('run', help="run the benchmarks and save the results as JSON")
+    p_run.add_argument('--out', default=None, help=f"output file (default: {RESULTS_DIR}/bench-<time>.json)")
+    p_run.add_argument('--filter', default=None, help="only run benchmarks whose name contains this")
+    p_run.add_argument('--min-time', type=float, default=0.3, help="seconds of timing per benchmark")
+    p_run.set_defaults(func=run)
+
+    p_cmp = sub.add_parser('compare', help="compare two result files and flag regressions")
+    p_cmp.add_argument('baseline')
+    p_cmp.add_argument('current')
+    p_cmp.add_argument('--threshold', type=float, default=0.10,
+                       help="flag slowdowns / allocation growth beyond this fraction (default 0.10)")
+    p_cmp.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+import os
+import time
+import zlib
+import itertools
+import atexit
+import shutil
+import sqlite3
+import tempfile
+import threading
+
+from serialization import dumps, loads
+
+# Pluggable game state storage.
+#
+# The web app keeps no game state in process memory: each request loads the game
+# from a store and saves it back, so any worker process can serve any game.
+# Advancing a phase also takes a lease on the game, so two workers (or two browser
+# tabs) can never run the same game's phase at once.
+#
+#   AMONG_US_STORE=sqlite:data/games.db   (default) shared by every worker on the host
+#   AMONG_US_STORE=memory                 single-process stand-in, state lost on restart
+#
+# Finished games, and games nobody has touched for COLD_AFTER seconds, are kept
+# compressed: the SQLite store compresses their rows in place, the memory store
+# spills them to files under AMONG_US_SPILL_DIR. Both look for newly cold games
+# (at most every SWEEP_INTERVAL seconds) whenever a game is read or saved, and read
+# compressed games without making them hot again, so memory and the database's hot
+# pages follow the games being played rather than every game ever played.
+
+# Seconds a phase lease is held before another worker may take the game over.
+# Phases with slow models can take a few minutes.
+LEASE_TTL = 600
+
+DEFAULT_STORE = 'sqlite:data/games.db'
+
+COLD_AFTER = 300
+SWEEP_INTERVAL = 30  # seconds between looks for newly cold games
+COMPRESS_LEVEL = 6
+SPILL_DIR = os.getenv('AMONG_US_SPILL_DIR', 'data/spill')  # '' keeps memory-store games resident
+
+
+def pack(state):
+    return zlib.compress(dumps(state), COMPRESS_LEVEL)
+
+
+def unpack(data):
+    """A stored state, compressed or plain JSON."""
+    return loads(data if data[:1] in (b'{', '{') else zlib.decompress(data))
+
+
+def footprint(state):
+    """Approximate size of a game in bytes (its encoded JSON), with the largest fields."""
+    sections = {key: len(dumps(value)) for key, value in state.items()}
+    top = sorted(sections.items(), key=lambda kv: -kv[1])[:6]
+    return {'bytes': sum(sections.values()), 'largest': dict(top)}
+
+
+class SQLiteGameStore:
+    """Games as JSON rows in a SQLite database (WAL mode, safe across processes)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS games (
+                    game_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    lease_owner TEXT,
+                    lease_expires REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS games_created ON games (created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS games_updated ON games (updated_at)")
+        self._compacted_until = 0.0  # rows last updated before this are already compressed
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+        self._sizes = {}  # game_id -> (version, footprint()), filled in by footprints()
+        self._sizes_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create(self, state):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO games (game_id, state, version, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (state['game_id'], dumps(state), state.get('version', 0), now, now),
+            )
+        self._sweep()
+
+    def get(self, game_id):
+        self._sweep()
+        row = self._conn().execute("SELECT state FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return unpack(row[0]) if row else None
+
+    def version(self, game_id):
+        """The stored state version, without loading the state. None if the game is unknown."""
+        row = self._conn().execute("SELECT version FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return row[0] if row else None
+
+    def latest_id(self):
+        row = self._conn().execute("SELECT game_id FROM games ORDER BY created_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def save(self, state, owner=None):
+        """Write the state back. With an owner, only succeeds while that owner holds the lease."""
+        data = pack(state) if state.get('game_over') else dumps(state)
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE games SET state = ?, version = ?, updated_at = ? "
+                "WHERE game_id = ? AND (? IS NULL OR lease_owner = ?)",
+                (data, state.get('version', 0), time.time(), state['game_id'], owner, owner),
+            )
+        self._sweep()
+        return cur.rowcount == 1
+
+    def _sweep(self):
+        """Compress the rows of games that went cold since the last sweep. Throttled; any worker may run it."""
+        now = time.time()
+        if now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + SWEEP_INTERVAL
+            cutoff = now - COLD_AFTER
+            conn = self._conn()
+            rows = conn.execute(
+                "SELECT game_id, state, updated_at FROM games "
+                "WHERE updated_at >= ? AND updated_at < ? AND substr(state, 1, 1) IN ('{', X'7B')",
+                (self._compacted_until, cutoff)).fetchall()
+            with conn:
+                for game_id, data, updated_at in rows:
+                    # Skipped if the game was saved again in the meantime
+                    conn.execute("UPDATE games SET state = ? WHERE game_id = ? AND updated_at = ?",
+                                 (zlib.compress(data if isinstance(data, bytes) else data.encode(), COMPRESS_LEVEL),
+                                  game_id, updated_at))
+            self._compacted_until = cutoff
+        finally:
+            self._sweep_lock.release()
+
+    def stats(self):
+        games, stored, compressed = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(length(state)), 0), "
+            "COALESCE(SUM(substr(state, 1, 1) NOT IN ('{', X'7B')), 0) FROM games").fetchone()
+        return {'kind': 'sqlite', 'games': games, 'stored_bytes': stored, 'compressed_games': compressed}
+
+    def footprints(self, limit=20):
+        """The largest uncompressed (running) games: their size and largest fields, worked out once per version."""
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT game_id, version FROM games WHERE substr(state, 1, 1) IN ('{', X'7B') "
+            "ORDER BY length(state) DESC LIMIT ?", (limit,)).fetchall()
+        with self._sizes_lock:
+            cached = {game_id: self._sizes.get(game_id) for game_id, _ in rows}
+        result = {}
+        for game_id, version in rows:
+            if cached[game_id] is None or cached[game_id][0] != version:
+                row = conn.execute("SELECT version, state FROM games WHERE game_id = ?", (game_id,)).fetchone()
+                cached[game_id] = (row[0], footprint(unpack(row[1])))
+            result[game_id] = cached[game_id][1]
+        with self._sizes_lock:
+            self._sizes = cached  # games that dropped out of the largest are forgotten
+        return result
+
+    def claim(self, game_id, owner, ttl=LEASE_TTL):
+        """Take the game's lease unless someone else holds an unexpired one. Returns True on success."""
+        now = time.time()
+        with self._conn() as conn:
+            cur = conn.execute(
+                "UPDATE games SET lease_owner = ?, lease_expires = ? "
+                "WHERE game_id = ? AND (lease_owner IS NULL OR lease_expires < ? OR lease_owner = ?)",
+                (owner, now + ttl, game_id, now, owner),
+            )
+        return cur.rowcount == 1
+
+    def release(self, game_id, owner):
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE games SET lease_owner = NULL, lease_expires = NULL WHERE game_id = ? AND lease_owner = ?",
+                (game_id, owner),
+            )
+
+
+class MemoryGameStore:
+    """In-process key-value stand-in with the same interface.
+
+    States are kept as encoded JSON snapshots, so every get() returns a private copy that
+    the caller may mutate while other threads read the same game. Finished and cold games
+    are spilled to compressed files in a private directory under spill_dir. A spilled game
+    is read straight from its file and only becomes resident again when it is saved.
+    Compression and file I/O happen outside the store lock, so they never hold up other games.
+    """
+
+    def __init__(self, spill_dir=SPILL_DIR, cold_after=COLD_AFTER):
+        self.games = {}  # game_id -> (version, encoded state)
+        self.touched = {}  # game_id -> last access, for resident games
+        self.spilling = {}  # game_id -> (version, encoded state) being written to disk, still readable
+        self.spilled = {}  # game_id -> (version, compressed bytes, path)
+        self.sizes = {}  # game_id -> (version, footprint()), filled in by footprints()
+        self.created = []  # game ids in creation order
+        self.leases = {}  # game_id -> (owner, expires)
+        self.lock = threading.Lock()
+        self.cold_after = cold_after
+        self.spill_dir = None
+        self._next_sweep = 0.0
+        self._spill_seq = itertools.count()
+        if spill_dir:
+            # Spilled games belong to this process only; nothing survives a restart
+            os.makedirs(spill_dir, exist_ok=True)
+            self.spill_dir = tempfile.mkdtemp(prefix='memory-store-', dir=spill_dir)
+            atexit.register(shutil.rmtree, self.spill_dir, True)
+
+    def _queue_spill(self, game_id, entry):
+        """Take a game out of the resident set for _write_spills(). Call with the lock held."""
+        self.games.pop(game_id, None)
+        self.touched.pop(game_id, None)
+        self.sizes.pop(game_id, None)
+        self.spilling[game_id] = entry
+        return game_id
+
+    def _write_spills(self, game_ids):
+        """Compress queued games and write them to disk. Call without the lock."""
+        for game_id in game_ids:
+            with self.lock:
+                entry = self.spilling.get(game_id)
+            if entry is None:
+                continue
+            data = zlib.compress(entry[1], COMPRESS_LEVEL)
+            path = os.path.join(self.spill_dir, f"{game_id}.{next(self._spill_seq)}.json.z")
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+            with self.lock:
+                current = self.spilling.get(game_id) is entry
+                if current:
+                    del self.spilling[game_id]
+                    self.spilled[game_id] = (entry[0], len(data), path)
+            if not current:  # saved again while it was being written
+                os.remove(path)
+
+    def _unspill(self, game_id):
+        """Forget a game's spill file, returning its path for removal. Call with the lock held."""
+        self.spilling.pop(game_id, None)
+        spilled = self.spilled.pop(game_id, None)
+        return spilled[2] if spilled else None
+
+    def _sweep(self):
+        """Queue games idle for cold_after seconds for spilling. Throttled. Call with the lock held."""
+        now = time.time()
+        if not self.spill_dir or now < self._next_sweep:
+            return []
+        self._next_sweep = now + SWEEP_INTERVAL
+        return [self._queue_spill(game_id, self.games[game_id]) for game_id, touched in list(self.touched.items())
+                if now - touched > self.cold_after and self.leases.get(game_id, (None, 0))[1] < now]
+
+    def create(self, state):
+        data = dumps(state)
+        with self.lock:
+            self.games[state['game_id']] = (state.get('version', 0), data)
+            self.touched[state['game_id']] = time.time()
+            self.created.append(state['game_id'])
+            spills = self._sweep()
+        self._write_spills(spills)
+
+    def get(self, game_id):
+        with self.lock:
+            spills = self._sweep()
+            entry = self.games.get(game_id) or self.spilling.get(game_id)
+            if game_id in self.games:
+                self.touched[game_id] = time.time()
+            path = self.spilled[game_id][2] if game_id in self.spilled else None
+        self._write_spills(spills)
+        if entry is not None:
+            return loads(entry[1])
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return loads(zlib.decompress(f.read()))
+        except FileNotFoundError:  # saved (and the file dropped) since we looked
+            return self.get(game_id)
+
+    def version(self, game_id):
+        with self.lock:
+            entry = self.games.get(game_id) or self.spilling.get(game_id) or self.spilled.get(game_id)
+            return entry[0] if entry else None
+
+    def latest_id(self):
+        return self.created[-1] if self.created else None
+
+    def save(self, state, owner=None):
+        data = dumps(state)  # outside the lock; the caller owns this dict
+        with self.lock:
+            game_id = state['game_id']
+            if owner is not None and self.leases.get(game_id, (None, 0))[0] != owner:
+                return False
+            stale = self._unspill(game_id)  # this save supersedes any spill file
+            entry = (state.get('version', 0), data)
+            if state.get('game_over') and self.spill_dir:
+                spills = [self._queue_spill(game_id, entry)]
+            else:
+                self.games[game_id] = entry
+                self.touched[game_id] = time.time()
+                spills = []
+            spills += self._sweep()
+        if stale:
+            os.remove(stale)
+        self._write_spills(spills)
+        return True
+
+    def claim(self, game_id, owner, ttl=LEASE_TTL):
+        now = time.time()
+        with self.lock:
+            if game_id not in self.games and game_id not in self.spilling and game_id not in self.spilled:
+                return False
+            holder, expires = self.leases.get(game_id, (None, 0))
+            if holder is not None and holder != owner and expires >= now:
+                return False
+            self.leases[game_id] = (owner, now + ttl)
+            return True
+
+    def release(self, game_id, owner):
+        with self.lock:
+            if self.leases.get(game_id, (None, 0))[0] == owner:
+                del self.leases[game_id]
+
+    def stats(self):
+        with self.lock:
+            resident = list(self.games.values()) + list(self.spilling.values())
+            spilled = list(self.spilled.values())
+        return {
+            'kind': 'memory',
+            'resident_games': len(resident),
+            'resident_bytes': sum(len(data) for _, data in resident),
+            'spilled_games': len(spilled),
+            'spilled_bytes': sum(size for _, size, _ in spilled),
+        }
+
+    def footprints(self, limit=20):
+        """The largest resident games: their size and largest fields, worked out once per saved version."""
+        with self.lock:
+            largest = sorted(self.games.items(), key=lambda kv: -len(kv[1][1]))[:limit]
+            cached = {game_id: self.sizes.get(game_id) for game_id, _ in largest}
+        result = {}
+        for game_id, (version, data) in largest:
+            if cached[game_id] is None or cached[game_id][0] != version:
+                cached[game_id] = (version, footprint(loads(data)))
+            result[game_id] = cached[game_id][1]
+        with self.lock:
+            self.sizes.update((game_id, size) for game_id, size in cached.items() if game_id in self.games)
+        return result
+
+
+def open_store(spec=None):
+    """Open the store described by spec (default: AMONG_US_STORE, then DEFAULT_STORE)."""
+    spec = spec or os.getenv('AMONG_US_STORE') or DEFAULT_STORE
+    if spec == 'memory':
+        return MemoryGameStore()
+    if spec.startswith('sqlite:'):
+        return SQLiteGameStore(spec[len('sqlite:'):])
+    raise ValueError(f"Unknown game store '{spec}' (expected 'memory' or 'sqlite:<path>')")
@@ -0,0 +1,21 @@
+import os
+
+# Gunicorn settings for `gunicorn -c gunicorn.conf.py wsgi:app`.
+#
+# Phase requests spend most of their time waiting on model APIs, so each worker
+# runs threads, and the timeout must cover a full phase of slow model calls.
+
+bind = os.getenv('AMONG_US_BIND', '0.0.0.0:5002')
+workers = int(os.getenv('AMONG_US_WORKERS', '4'))
+# Every open spectator stream holds a thread; for large audiences use an async
+# worker instead (AMONG_US_WORKER_CLASS=gevent, after `pip install gevent`)
+worker_class = os.getenv('AMONG_US_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('AMONG_US_THREADS', '8'))
+timeout = 600
+graceful_timeout = 30
+keepalive = 5
+
+# AMONG_US_ACCESS_LOG= turns the access log off (load tests)
+accesslog = os.getenv('AMONG_US_ACCESS_LOG', '-') or None
+errorlog = '-'
+loglevel = os.getenv('AMONG_US_LOG_LEVEL', 'info')
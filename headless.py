@@ -0,0 +1,148 @@
+import json
+import time
+import logging
+import argparse
+import threading
+
+import app
+import replay
+import tracing
+
+# Run games without the web UI, e.g. for tournaments. Each game gets its own thread
+# and is driven with app.advance_phase() until it is over.
+#
+#   python headless.py --games 20 --gpt-model gpt-5-mini --claude-model claude-haiku-4.5
+#   python headless.py --games 200 --backend batch
+
+
+def run_game(state, trace=False, record=True):
+    """Play a game to the end. Returns the final state.
+
+    With trace=True every phase is traced like a /api/next-phase request (see tracing.py).
+    With record=True the game is recorded as a replay, added to the results store and archived.
+    """
+    if record:
+        replay.record_frame(state['game_id'], app.get_client_state(state))
+    while not state['game_over']:
+        if trace:
+            with tracing.trace(state['game_id'], 'advance_phase', phase=state['phase'], round=state['round']):
+                result = app.advance_phase(state)
+        else:
+            result = app.advance_phase(state)
+        if record:
+            replay.record_frame(state['game_id'], app.get_client_state(state), result)
+    if record:
+        app.record_result(state)
+    return state
+
+
+def run_games(num_games, gpt_model='gpt-5.1', claude_model='claude-haiku-4.5', backend='live',
+              conversation_mode=False, trace=False, discussion_mode='sequential', speculative_votes=False):
+    """Play num_games games concurrently. Returns their final states."""
+    states = [
+        app.init_game_state(gpt_model=gpt_model, claude_model=claude_model,
+                            conversation_mode=conversation_mode, backend=backend, discussion_mode=discussion_mode,
+                            speculative_votes=speculative_votes)
+        for _ in range(num_games)
+    ]
+    threads = [threading.Thread(target=run_game, args=(s, trace), name=f"game-{s['game_id']}") for s in states]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return states
+
+
+def game_summary(state):
+    impostor = app.get_impostor(state)
+    return {
+        'game_id': state['game_id'],
+        'winner': state['winner'],
+        'win_reason': state['win_reason'],
+        'rounds': state['round'],
+        'impostor': impostor['name'],
+        'impostor_team': impostor['team'],
+        'discussion_mode': state['discussion_mode'],
+        'meetings': state['meeting_log'],
+        'vote_prefetch': state['vote_prefetch_stats'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play Among Us games without the web UI.")
+    parser.add_argument('--games', type=int, default=1)
+    parser.add_argument('--gpt-model', default='gpt-5.1', choices=sorted(app.GPT_MODELS))
+    parser.add_argument('--claude-model', default='claude-haiku-4.5', choices=sorted(app.CLAUDE_MODELS))
+    parser.add_argument('--backend', default='live', choices=['live', 'batch', 'stub'],
+                        help="stub: offline model (AMONG_US_STUB_LATENCY sets its delay per call)")
+    parser.add_argument('--discussion-mode', default='sequential', choices=app.DISCUSSION_MODES,
+                        help="simultaneous: each discussion round's statements are generated at once")
+    parser.add_argument('--speculative-votes', action='store_true',
+                        help="start vote calls during the last discussion round, re-voting if later statements name the voter or their pick")
+    parser.add_argument('--conversation-mode', action='store_true',
+                        help="thread each player's turns (live backend only)")
+    parser.add_argument('--batch-base-url', default=None,
+                        help="send batches to a stand-in server (see batch_server.py) instead of the real APIs")
+    parser.add_argument('--poll-interval', type=float, default=None,
+                        help="seconds between batch status checks (default 30, or 1 with --batch-base-url)")
+    parser.add_argument('--trace', action='store_true',
+                        help=f"write a Chrome trace per game to {tracing.TRACE_DIR or tracing.DEFAULT_TRACE_DIR}/")
+    parser.add_argument('--report', default=None, help="write games and batch reports to this JSON file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    if args.trace and not tracing.TRACE_DIR:
+        tracing.TRACE_DIR = tracing.DEFAULT_TRACE_DIR
+
+    collector = None
+    if args.backend == 'batch':
+        if args.conversation_mode:
+            parser.error("--conversation-mode is not supported with the batch backend")
+        from batch_backend import BatchCollector, make_providers
+
+        api_key = 'stand-in' if args.batch_base_url else None
+        poll_interval = args.poll_interval or (1.0 if args.batch_base_url else 30.0)
+        collector = BatchCollector(make_providers(args.batch_base_url, api_key), poll_interval=poll_interval).start()
+        app.CALL_BACKENDS['batch'] = collector.call
+
+    start = time.time()
+    states = run_games(args.games, args.gpt_model, args.claude_model, backend=args.backend,
+                       conversation_mode=args.conversation_mode, trace=args.trace,
+                       discussion_mode=args.discussion_mode, speculative_votes=args.speculative_votes)
+    elapsed = time.time() - start
+
+    games = [game_summary(s) for s in states]
+    for g in games:
+        print(f"{g['game_id']}  {g['winner']:<10} {g['win_reason']:<17} rounds={g['rounds']}  "
+              f"impostor={g['impostor']} ({g['impostor_team']})")
+    crew_wins = sum(1 for g in games if g['winner'] == 'crewmates')
+    print(f"\n{len(games)} games in {elapsed:.1f}s — crewmates {crew_wins}, impostor {len(games) - crew_wins}")
+
+    meetings = app.meeting_stats(states)
+    for mode, m in meetings.items():
+        print(f"{m['meetings']} meetings ({mode}): discussion {m['mean_discussion_seconds']:.2f}s, "
+              f"voting {m['mean_voting_seconds']:.2f}s on average")
+
+    report = {'games': games, 'elapsed_seconds': round(elapsed, 2), 'meetings': meetings}
+    if args.speculative_votes:
+        p = report['vote_prefetch'] = app.vote_prefetch_summary(states)
+        print(f"speculative votes: {p['hits']}/{p['prefetched']} used (hit rate {p['hit_rate']}), "
+              f"{p['revotes']} re-votes wasted {p['wasted_input_tokens']}+{p['wasted_output_tokens']} tokens")
+    if collector:
+        collector.stop()
+        summary = collector.summary()
+        print(f"{summary['batches']} batches, {summary['requests']} requests "
+              f"({summary['failed']} failed), {summary['input_tokens']}+{summary['output_tokens']} tokens, "
+              f"est. ${summary['cost_usd']:.4f}")
+        report['batches'] = collector.reports
+        report['batch_summary'] = summary
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+import math
+import threading
+
+from serialization import dumps
+
+# Model ratings, updated incrementally from the results store.
+#
+# Each game is scored as a match between the impostor's model and the other
+# team's model: the impostor's model wins if the impostor wins, the other model
+# wins if the crew does. Every Leaderboard keeps a cursor into the store and only
+# reads games appended since its last update, so a query never rescans history.
+
+ELO_START = 1500.0
+ELO_K = 24.0
+
+# TrueSkill defaults (two-player, no draws)
+TS_MU = 25.0
+TS_SIGMA = TS_MU / 3
+TS_BETA = TS_SIGMA / 2
+TS_TAU = TS_SIGMA / 100
+
+Z_95 = 1.96
+
+
+def wilson_interval(wins, games, z=Z_95):
+    """95% Wilson score interval for a win rate, as [low, high]."""
+    if games == 0:
+        return [0.0, 1.0]
+    p = wins / games
+    denom = 1 + z * z / games
+    centre = (p + z * z / (2 * games)) / denom
+    half = z * math.sqrt(p * (1 - p) / games + z * z / (4 * games * games)) / denom
+    return [round(max(0.0, centre - half), 4), round(min(1.0, centre + half), 4)]
+
+
+def elo_update(winner, loser, k=ELO_K):
+    expected = 1 / (1 + 10 ** ((loser['elo'] - winner['elo']) / 400))
+    winner['elo'] += k * (1 - expected)
+    loser['elo'] -= k * (1 - expected)
+
+
+def _pdf(x):
+    return math.exp(-x * x / 2) / math.sqrt(2 * math.pi)
+
+
+def _cdf(x):
+    return (1 + math.erf(x / math.sqrt(2))) / 2
+
+
+def trueskill_update(winner, loser):
+    """Two-player TrueSkill update without draws (Herbrich et al., 2007)."""
+    for r in (winner, loser):
+        r['sigma'] = math.sqrt(r['sigma'] ** 2 + TS_TAU ** 2)
+    c = math.sqrt(2 * TS_BETA ** 2 + winner['sigma'] ** 2 + loser['sigma'] ** 2)
+    t = (winner['mu'] - loser['mu']) / c
+    v = _pdf(t) / max(_cdf(t), 1e-12)
+    w = v * (v + t)
+    for r, sign in ((winner, 1), (loser, -1)):
+        var = r['sigma'] ** 2
+        r['mu'] += sign * var / c * v
+        r['sigma'] = math.sqrt(var * max(1 - var / (c * c) * w, 1e-6))
+
+
+def new_model_stats(model):
+    return {
+        'model': model, 'elo': ELO_START, 'mu': TS_MU, 'sigma': TS_SIGMA,
+        'games': 0, 'wins': 0, 'impostor_games': 0, 'impostor_wins': 0, 'crew_games': 0, 'crew_wins': 0,
+        'calls': 0, 'failed_calls': 0, 'input_tokens': 0, 'output_tokens': 0, 'latency_total': 0.0,
+    }
+
+
+class Leaderboard:
+    """Ratings and win rates over the games in a ResultsStore."""
+
+    def __init__(self, store, include_stub=False):
+        self.store = store
+        self.include_stub = include_stub
+        self.cursor = 0  # games read so far
+        self.games = 0  # games counted (stub games may be skipped)
+        self.models = {}
+        self.matchups = {}
+        self.lock = threading.Lock()
+        self._cached = None  # (cursor, serialized snapshot)
+
+    def update(self):
+        """Fold in games appended since the last update. Returns how many were read."""
+        with self.lock:
+            rows = len(self.store)
+            if rows <= self.cursor:
+                return 0
+            store, start = self.store, self.cursor
+            col = {name: store.column(name, rows) for name in (
+                'gpt_model', 'claude_model', 'backend', 'impostor_team', 'impostor_model', 'winner', 'rounds',
+                'players_end', 'calls_end')}
+            calls_total = col['calls_end'][rows - 1]
+            players_total = col['players_end'][rows - 1]
+            player_team = store.column('player_team', players_total)
+            call = {name: store.column(name, calls_total) for name in (
+                'call_player', 'call_latency', 'call_input_tokens', 'call_output_tokens', 'call_ok')}
+
+            for row in range(start, rows):
+                if not self.include_stub and store.decode('backend', col['backend'][row]) == 'stub':
+                    continue
+                self._add_game(row, col, call, player_team)
+            self.cursor = rows
+            return rows - start
+
+    def _add_game(self, row, col, call, player_team):
+        store = self.store
+        gpt = store.decode('gpt_model', col['gpt_model'][row])
+        claude = store.decode('claude_model', col['claude_model'][row])
+        impostor_model = store.decode('impostor_model', col['impostor_model'][row])
+        crew_model = claude if impostor_model == gpt else gpt
+        impostor_won = store.decode('winner', col['winner'][row]) == 'impostor'
+
+        impostor = self.models.setdefault(impostor_model, new_model_stats(impostor_model))
+        crew = self.models.setdefault(crew_model, new_model_stats(crew_model))
+        winner, loser = (impostor, crew) if impostor_won else (crew, impostor)
+        elo_update(winner, loser)
+        trueskill_update(winner, loser)
+        for stats in (impostor, crew):
+            stats['games'] += 1
+        winner['wins'] += 1
+        impostor['impostor_games'] += 1
+        impostor['impostor_wins'] += int(impostor_won)
+        crew['crew_games'] += 1
+        crew['crew_wins'] += int(not impostor_won)
+
+        # Calls are attributed to the model of the calling player's team
+        team_models = {'openai': gpt, 'anthropic': claude}
+        first_player = col['players_end'][row - 1] if row else 0
+        first_call = col['calls_end'][row - 1] if row else 0
+        for i in range(first_call, col['calls_end'][row]):
+            team = store.decode('player_team', player_team[first_player + call['call_player'][i]])
+            stats = self.models[team_models[team]]
+            stats['calls'] += 1
+            stats['failed_calls'] += int(not call['call_ok'][i])
+            stats['input_tokens'] += call['call_input_tokens'][i]
+            stats['output_tokens'] += call['call_output_tokens'][i]
+            stats['latency_total'] += call['call_latency'][i]
+
+        matchup = self.matchups.setdefault((gpt, claude), {
+            'gpt_model': gpt, 'claude_model': claude, 'games': 0, 'impostor_wins': 0, 'rounds_total': 0})
+        matchup['games'] += 1
+        matchup['impostor_wins'] += int(impostor_won)
+        matchup['rounds_total'] += col['rounds'][row]
+        self.games += 1
+
+    def snapshot(self):
+        """The leaderboard as a JSON-serializable dict, models ordered by Elo."""
+        models = []
+        for s in sorted(self.models.values(), key=lambda s: -s['elo']):
+            models.append({
+                'model': s['model'],
+                'elo': round(s['elo'], 1),
+                'trueskill': {'mu': round(s['mu'], 3), 'sigma': round(s['sigma'], 3),
+                              'conservative': round(s['mu'] - 3 * s['sigma'], 3)},
+                'games': s['games'],
+                'win_rate': round(s['wins'] / s['games'], 4) if s['games'] else None,
+                'win_rate_ci': wilson_interval(s['wins'], s['games']),
+                'impostor': {'games': s['impostor_games'], 'wins': s['impostor_wins'],
+                             'win_rate_ci': wilson_interval(s['impostor_wins'], s['impostor_games'])},
+                'crew': {'games': s['crew_games'], 'wins': s['crew_wins'],
+                         'win_rate_ci': wilson_interval(s['crew_wins'], s['crew_games'])},
+                'calls': s['calls'],
+                'failed_calls': s['failed_calls'],
+                'avg_latency': round(s['latency_total'] / s['calls'], 3) if s['calls'] else None,
+                'avg_input_tokens': round(s['input_tokens'] / s['calls'], 1) if s['calls'] else None,
+                'avg_output_tokens': round(s['output_tokens'] / s['calls'], 1) if s['calls'] else None,
+            })
+        matchups = [{
+            **{k: m[k] for k in ('gpt_model', 'claude_model', 'games', 'impostor_wins')},
+            'impostor_win_rate_ci': wilson_interval(m['impostor_wins'], m['games']),
+            'avg_rounds': round(m['rounds_total'] / m['games'], 2),
+        } for m in sorted(self.matchups.values(), key=lambda m: -m['games'])]
+        return {'games': self.games, 'models': models, 'matchups': matchups}
+
+    def serialized(self):
+        """update() and the snapshot as JSON bytes, re-encoded only when new games arrived."""
+        self.update()
+        with self.lock:
+            if self._cached is None or self._cached[0] != self.cursor:
+                self._cached = (self.cursor, dumps(self.snapshot()))
+            return self._cached[1]
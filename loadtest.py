@@ -0,0 +1,433 @@
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from collections import defaultdict
+
+# Load test for the HTTP API.
+#
+#   python loadtest.py --drivers 50 --spectators 500 --duration 120
+#
+# Starts a local server (gunicorn by default) whose games use the offline stub
+# model, with its store and data directories in a temporary directory. It then runs
+# two kinds of virtual users against it:
+#
+#   drivers     play games the way the browser's runGameLoop does: start-game, then
+#               game-state, a pause, next-phase, and the phase's animation time, over
+#               and over. A finished game is followed by a new one.
+#   spectators  watch running games through /api/spectate long-polls, read-only.
+#
+# Every second it samples throughput, errors and the server's resident memory
+# (all worker processes together). At the end it reports p50/p95/p99 latency
+# and error and timeout counts per endpoint. --url targets a server that is already running.
+
+# runGameLoop's waits in seconds (static/js/game.js), scaled by --pace
+PRE_PHASE_WAIT = 1.0
+POST_PHASE_WAIT = 0.5
+EVENTS_WAIT = 1.5
+MEETING_WAIT = 2.5
+VOTE_WAIT = 2.5
+EJECTION_WAIT = 4.8
+CONFLICT_WAIT = 2.0
+
+READY_TIMEOUT = 30
+
+# Spectators long-poll with ?wait=LONG_POLL_WAIT. A request that gets no answer within
+# --timeout seconds (default REQUEST_TIMEOUT) counts as a timeout. So does one still
+# running at the end of the test STUCK_AFTER seconds past the time it should have taken.
+LONG_POLL_WAIT = 10
+REQUEST_TIMEOUT = 20
+STUCK_AFTER = 5
+
+
+# ─── Measurements ────────────────────────────────────────────────────
+
+class Stats:
+    """Latencies and outcomes per endpoint, plus per-second counters for the timeline."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))  # endpoint -> status -> count
+        self.interval = defaultdict(int)  # counters since the last sample
+        self.in_flight = {}  # request token -> (endpoint, start), until the request is recorded
+        self.games_started = 0
+        self.games_finished = 0
+
+    def begin(self, endpoint):
+        """Note a request as started. Returns the token to record it with."""
+        token = object()
+        with self.lock:
+            self.in_flight[token] = (endpoint, time.perf_counter())
+        return token
+
+    def record(self, token, status):
+        """Record a finished request. status is the HTTP status, 'timeout', or None for a connection error."""
+        ok = isinstance(status, int) and (status < 400 or status == 409)  # 409: another driver holds the phase
+        with self.lock:
+            if token not in self.in_flight:  # already counted as stuck by close_stuck()
+                return
+            endpoint, start = self.in_flight.pop(token)
+            self.latencies[endpoint].append(time.perf_counter() - start)
+            self.interval['requests'] += 1
+            if not ok:
+                self.errors[endpoint][str(status)] += 1
+                self.interval['errors'] += 1
+
+    def take_interval(self):
+        with self.lock:
+            counts, self.interval = dict(self.interval), defaultdict(int)
+            return counts
+
+    def close_stuck(self, limits):
+        """Record requests still running past their endpoint's limit (seconds) as timeouts."""
+        now = time.perf_counter()
+        with self.lock:
+            stuck = [token for token, (endpoint, start) in self.in_flight.items() if now - start > limits(endpoint)]
+        for token in stuck:
+            self.record(token, 'timeout')
+        return len(stuck)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+
+def process_tree_rss(pid):
+    """Resident memory in bytes of a process and all its descendants (Linux /proc)."""
+    children = defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children[ppid].append(int(entry))
+    total, todo = 0, [pid]
+    while todo:
+        p = todo.pop()
+        todo.extend(children.get(p, []))
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return total
+
+
+# ─── Virtual users ───────────────────────────────────────────────────
+
+class Client:
+    """One keep-alive HTTP connection, reopened after errors, timing every request into Stats."""
+
+    def __init__(self, host, port, stats, timeout=REQUEST_TIMEOUT):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.stats = stats
+        self.conn = None
+
+    def request(self, method, path, endpoint, body=None):
+        """Returns (status, decoded JSON or None). Status is None on a connection error."""
+        headers = {'Accept-Encoding': 'gzip'}
+        if body is not None:
+            body = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        token = self.stats.begin(endpoint)
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            self.close()
+            self.stats.record(token, 'timeout' if isinstance(e, TimeoutError) else None)
+            return None, None
+        self.stats.record(token, status)
+        if response.getheader('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+class LoadTest:
+    def __init__(self, host, port, drivers, spectators, duration, pace=1.0, ramp=5.0, seed=0,
+                 timeout=REQUEST_TIMEOUT):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.drivers, self.spectators = drivers, spectators
+        self.duration, self.pace, self.ramp = duration, pace, ramp
+        self.stats = Stats()
+        self.stop = threading.Event()
+        self.games = {}  # game_id -> latest version seen by its driver, for spectators to pick
+        self.games_lock = threading.Lock()
+        self.random = random.Random(seed)
+
+    def sleep(self, seconds):
+        self.stop.wait(seconds * self.pace)
+
+    def driver(self, index):
+        self.stop.wait(self.ramp * index / max(1, self.drivers))
+        client = Client(self.host, self.port, self.stats, self.timeout)
+        while not self.stop.is_set():
+            status, data = client.request('POST', '/api/start-game', 'start-game', {})
+            if status != 200 or not data:
+                self.sleep(1.0)
+                continue
+            game_id = data['game_state']['game_id']
+            with self.games_lock:
+                self.stats.games_started += 1
+                self.games[game_id] = 0
+            self.play(client, game_id)
+            with self.games_lock:
+                self.games.pop(game_id, None)
+        client.close()
+
+    def play(self, client, game_id):
+        """One game, paced like runGameLoop."""
+        while not self.stop.is_set():
+            status, state = client.request('GET', f"/api/game-state?game_id={game_id}", 'game-state')
+            if status != 200 or not state:
+                return
+            if state.get('game_over'):
+                return self.finished()
+            self.sleep(PRE_PHASE_WAIT)
+
+            status, data = client.request('POST', f"/api/next-phase?game_id={game_id}", 'next-phase')
+            if status == 409:
+                self.sleep(CONFLICT_WAIT)
+                continue
+            if status != 200 or not data or not data.get('success'):
+                return
+            result = data.get('result') or {}
+            with self.games_lock:
+                self.games[game_id] = data['game_state']['version']
+            if result.get('events'):
+                self.sleep(EVENTS_WAIT)
+            if result.get('meeting'):
+                self.sleep(MEETING_WAIT)
+            if result.get('vote_result'):
+                self.sleep(EJECTION_WAIT if result['vote_result'].get('ejected') else VOTE_WAIT)
+            if result.get('game_over') or data['game_state'].get('game_over'):
+                return self.finished()
+            self.sleep(POST_PHASE_WAIT)
+
+    def finished(self):
+        with self.games_lock:
+            self.stats.games_finished += 1
+
+    def spectator(self, index):
+        rng = random.Random(index)
+        self.stop.wait(self.ramp * index / max(1, self.spectators))
+        client = Client(self.host, self.port, self.stats, self.timeout)
+        while not self.stop.is_set():
+            with self.games_lock:
+                running = list(self.games)
+            if not running:
+                self.stop.wait(0.5)
+                continue
+            game_id = rng.choice(running)
+            status, state = client.request('GET', f"/api/spectate/{game_id}", 'spectate')
+            if status != 200 or not state:
+                self.stop.wait(1.0)
+                continue
+            version = state['version']
+            # Follow the game with long-polls until it ends
+            while not self.stop.is_set() and not state.get('game_over'):
+                status, delta = client.request('GET', f"/api/spectate/{game_id}?since={version}&wait={LONG_POLL_WAIT}",
+                                               'spectate-wait')
+                if status == 200 and delta:
+                    if 'base' in delta:
+                        state.update(delta['set'])  # appended log entries aren't needed here
+                        version = delta['version']
+                    else:
+                        state, version = delta, delta['version']
+                elif status != 204:
+                    self.stop.wait(1.0)
+                    break
+        client.close()
+
+    def run(self, server_pid=None, sample_interval=1.0, on_sample=None):
+        threads = [threading.Thread(target=self.driver, args=(i,), daemon=True) for i in range(self.drivers)]
+        threads += [threading.Thread(target=self.spectator, args=(i,), daemon=True) for i in range(self.spectators)]
+        for t in threads:
+            t.start()
+
+        timeline = []
+        start = time.perf_counter()
+        while (elapsed := time.perf_counter() - start) < self.duration:
+            time.sleep(min(sample_interval, self.duration - elapsed))
+            counts = self.stats.take_interval()
+            with self.games_lock:
+                running = len(self.games)
+            sample = {
+                't': round(time.perf_counter() - start, 1),
+                'rps': round(counts.get('requests', 0) / sample_interval, 1),
+                'errors': counts.get('errors', 0),
+                'games_running': running,
+                'rss_mb': round(process_tree_rss(server_pid) / 2 ** 20, 1) if server_pid else None,
+            }
+            timeline.append(sample)
+            if on_sample:
+                on_sample(sample)
+        self.stop.set()
+        elapsed = time.perf_counter() - start
+        # Users stuck in a long-poll are daemon threads; don't wait out their requests
+        deadline = time.time() + 5
+        for t in threads:
+            t.join(timeout=max(0, deadline - time.time()))
+        self.stats.close_stuck(lambda endpoint: STUCK_AFTER + (LONG_POLL_WAIT if endpoint == 'spectate-wait' else 0))
+        return self.report(timeline, elapsed)
+
+    def report(self, timeline, elapsed):
+        endpoints = {}
+        for endpoint, values in sorted(self.stats.latencies.items()):
+            values = sorted(values)
+            errors = sum(self.stats.errors[endpoint].values())
+            timeouts = self.stats.errors[endpoint].get('timeout', 0)
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'rps': round(len(values) / elapsed, 1),
+                'p50_ms': round(percentile(values, 50) * 1000, 1),
+                'p95_ms': round(percentile(values, 95) * 1000, 1),
+                'p99_ms': round(percentile(values, 99) * 1000, 1),
+                'max_ms': round(values[-1] * 1000, 1),
+                'errors': errors,
+                'error_rate': round(errors / len(values), 4),
+                'timeouts': timeouts,
+                'error_statuses': dict(self.stats.errors[endpoint]),
+            }
+        rss = [s['rss_mb'] for s in timeline if s['rss_mb'] is not None]
+        return {
+            'config': {'drivers': self.drivers, 'spectators': self.spectators, 'duration': self.duration,
+                       'pace': self.pace},
+            'elapsed': round(elapsed, 1),
+            'games_started': self.stats.games_started,
+            'games_finished': self.stats.games_finished,
+            'endpoints': endpoints,
+            'still_running': len(self.stats.in_flight),  # cut off by the end of the test, not counted
+            'rss_mb': {'start': rss[0], 'peak': max(rss), 'end': rss[-1]} if rss else None,
+            'timeline': timeline,
+        }
+
+
+# ─── Server ──────────────────────────────────────────────────────────
+
+def start_server(kind, port, data_dir, workers, threads, stub_latency):
+    """Launch a local server on the stub model with all its state under data_dir."""
+    env = dict(
+        os.environ,
+        AMONG_US_BACKEND='stub',
+        AMONG_US_STUB_LATENCY=str(stub_latency),
+        AMONG_US_STORE=f"sqlite:{os.path.join(data_dir, 'games.db')}",
+        AMONG_US_REPLAY_DIR=os.path.join(data_dir, 'replays'),
+        AMONG_US_RESULTS_DIR=os.path.join(data_dir, 'results'),
+        AMONG_US_ARCHIVE_DIR=os.path.join(data_dir, 'archive'),
+        AMONG_US_TRACE_DIR='',
+        AMONG_US_BIND=f"127.0.0.1:{port}",
+        AMONG_US_WORKERS=str(workers),
+        AMONG_US_THREADS=str(threads),
+        AMONG_US_LOG_LEVEL='warning',
+        AMONG_US_ACCESS_LOG='',
+    )
+    root = os.path.dirname(os.path.abspath(__file__))
+    if kind == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+    else:
+        cmd = [sys.executable, '-c', f"from app import app; app.run(port={port}, threaded=True)"]
+    log = open(os.path.join(data_dir, 'server.log'), 'w')
+    process = subprocess.Popen(cmd, cwd=root, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.time() + READY_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited; see {log.name}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            conn.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"server did not start within {READY_TIMEOUT}s; see {log.name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the HTTP API with simulated players and spectators.")
+    parser.add_argument('--drivers', type=int, default=20, help="concurrent games being played")
+    parser.add_argument('--spectators', type=int, default=100, help="read-only viewers")
+    parser.add_argument('--duration', type=float, default=60, help="seconds")
+    parser.add_argument('--pace', type=float, default=1.0,
+                        help="scale of the browser's waits between requests (0 = back to back)")
+    parser.add_argument('--ramp', type=float, default=5.0, help="seconds over which users start")
+    parser.add_argument('--url', default=None, help="test a running server (host:port) instead of starting one")
+    parser.add_argument('--server', default='gunicorn', choices=['gunicorn', 'flask'])
+    parser.add_argument('--port', type=int, default=5090)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--stub-latency', type=float, default=0.0, help="seconds added to every stub model call")
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT,
+                        help=f"seconds before a request counts as timed out (default {REQUEST_TIMEOUT})")
+    parser.add_argument('--out', default=None, help="write the full report (with timeline) to this JSON file")
+    args = parser.parse_args()
+
+    process, data_dir = None, None
+    if args.url:
+        host, _, port = args.url.replace('http://', '').partition(':')
+        port = int(port or 80)
+    else:
+        host, port = '127.0.0.1', args.port
+        data_dir = tempfile.mkdtemp(prefix='among-us-load-')
+        process = start_server(args.server, port, data_dir, args.workers, args.threads, args.stub_latency)
+        print(f"{args.server} server pid {process.pid}, data in {data_dir}")
+
+    test = LoadTest(host, port, args.drivers, args.spectators, args.duration, pace=args.pace, ramp=args.ramp,
+                    timeout=args.timeout)
+    print(f"{'t':>6} {'req/s':>8} {'errors':>7} {'games':>6} {'rss MB':>8}")
+    try:
+        report = test.run(server_pid=process.pid if process else None, on_sample=lambda s: print(
+            f"{s['t']:>6} {s['rps']:>8} {s['errors']:>7} {s['games_running']:>6} {s['rss_mb'] or '-':>8}"))
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=30)
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"\n{report['games_started']} games started, {report['games_finished']} finished in {report['elapsed']}s")
+    print(f"{'endpoint':<15} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} "
+          f"{'timeouts':>8}")
+    for name, e in report['endpoints'].items():
+        print(f"{name:<15} {e['requests']:>9} {e['rps']:>8} {e['p50_ms']:>8} {e['p95_ms']:>8} {e['p99_ms']:>8} "
+              f"{e['error_rate']:>7.2%} {e['timeouts']:>8}")
+    if report['rss_mb']:
+        print(f"server RSS: {report['rss_mb']['start']} MB at start, {report['rss_mb']['peak']} MB peak, "
+              f"{report['rss_mb']['end']} MB at end")
+    print("spectate-wait latencies include the long-poll wait for the next version")
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,8 +3,18 @@ from pydantic import BaseModel
 from typing import Literal, Optional
 from dotenv import load_dotenv
 
+from tracing import span, record_usage
+
 load_dotenv()
-client = OpenAI()
+_client = None
+
+
+def get_client():
+    """Shared OpenAI client, created on first use so offline runs don't need an API key."""
+    global _client
+    if _client is None:
+        _client = OpenAI()
+    return _client
 
 # ─── Structured Response Models ───────────────────────────────────────
 
@@ -23,6 +33,13 @@ class VoteResponse(BaseModel):
     reason: Optional[str] = None
 
 
+RESPONSE_MODELS = {
+    "action": ActionResponse,
+    "discussion": DiscussionResponse,
+    "vote": VoteResponse,
+}
+
+
 # ─── Reasoning Config ─────────────────────────────────────────────────
 
 MINIMAL_REASONING_MODELS = {'gpt-5-mini'}
@@ -54,92 +71,127 @@ def _extract_reasoning(response):
     return None
 
 
-SYSTEM_PROMPT = """You are an AI playing Among Us, a social deduction game.
-You are one of 6 players on a spaceship with 5 rooms: Cafeteria, Electrical, MedBay, Navigation, Reactor.
-There is 1 impostor and 5 crewmates. The impostor tries to kill crewmates; crewmates try to find and eject the impostor.
-Always respond with valid JSON matching the requested format exactly."""
-
-
-# ─── API Call Functions ───────────────────────────────────────────────
-
-def call_gpt_action(prompt: str, model: str = "gpt-5.1", model_key: str = None) -> tuple[dict, str | None]:
-    """Call GPT for an action decision. Returns (action_dict, reasoning)."""
+def _request_kwargs(prompt: str, model: str, model_key: str, previous_id: str | None = None) -> dict:
+    """Responses API arguments shared by live calls and batch lines (everything but the output format)."""
     show_reasoning, effort = _get_reasoning_config(model_key)
 
-    kwargs = {
-        "model": model,
-        "input": [
+    if previous_id:
+        input_items = [{"role": "user", "content": prompt}]
+    else:
+        input_items = [
             {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
-        ],
-        "text_format": ActionResponse,
+        ]
+
+    kwargs = {
+        "model": model,
+        "input": input_items,
     }
 
+    if previous_id:
+        kwargs["previous_response_id"] = previous_id
+
     if show_reasoning:
         kwargs["reasoning"] = {"effort": effort, "summary": "auto"}
     else:
         kwargs["reasoning"] = {"effort": "minimal"}
+    return kwargs
 
-    response = client.responses.parse(**kwargs)
-    parsed = response.output_parsed
 
-    result = {
-        "room": parsed.room,
-        "action": parsed.action,
-        "target": parsed.target,
-    }
+SYSTEM_PROMPT = """You are an AI playing Among Us, a social deduction game.
+You are one of 6 players on a spaceship with 5 rooms: Cafeteria, Electrical, MedBay, Navigation, Reactor.
+There is 1 impostor and 5 crewmates. The impostor tries to kill crewmates; crewmates try to find and eject the impostor.
+Always respond with valid JSON matching the requested format exactly."""
 
-    reasoning = _extract_reasoning(response) if show_reasoning else None
-    return result, reasoning
 
+# ─── API Call Functions ───────────────────────────────────────────────
 
-def call_gpt_discussion(prompt: str, model: str = "gpt-5.1", model_key: str = None) -> tuple[dict, str | None]:
-    """Call GPT for a discussion statement. Returns (discussion_dict, reasoning)."""
-    show_reasoning, effort = _get_reasoning_config(model_key)
+def _call_gpt(prompt: str, model: str, model_key: str, text_format, conversation: dict | None = None):
+    """Generic GPT call with structured output. Returns (parsed_model, reasoning).
 
-    kwargs = {
-        "model": model,
-        "input": [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt},
-        ],
-        "text_format": DiscussionResponse,
-    }
+    When a conversation dict is given and already holds a response id, the call is
+    chained with previous_response_id and only the new prompt is sent; the new
+    response id is stored back on success.
+    """
+    show_reasoning, _ = _get_reasoning_config(model_key)
+    previous_id = conversation.get("previous_response_id") if conversation else None
 
-    if show_reasoning:
-        kwargs["reasoning"] = {"effort": effort, "summary": "auto"}
-    else:
-        kwargs["reasoning"] = {"effort": "minimal"}
+    kwargs = _request_kwargs(prompt, model, model_key, previous_id)
+    kwargs["text_format"] = text_format
 
-    response = client.responses.parse(**kwargs)
-    parsed = response.output_parsed
+    with span("openai.responses.parse", "network", model=model, chained=bool(previous_id)) as s:
+        response = get_client().responses.parse(**kwargs)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            s.set(input_tokens=usage.input_tokens, output_tokens=usage.output_tokens)
+            record_usage(usage.input_tokens, usage.output_tokens)
+    if conversation is not None:
+        conversation["previous_response_id"] = response.id
 
-    result = {"statement": parsed.statement}
     reasoning = _extract_reasoning(response) if show_reasoning else None
-    return result, reasoning
+    return response.output_parsed, reasoning
 
 
-def call_gpt_vote(prompt: str, model: str = "gpt-5.1", model_key: str = None) -> tuple[dict, str | None]:
-    """Call GPT for a vote decision. Returns (vote_dict, reasoning)."""
-    show_reasoning, effort = _get_reasoning_config(model_key)
-
-    kwargs = {
-        "model": model,
-        "input": [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt},
-        ],
-        "text_format": VoteResponse,
+def call_gpt_action(prompt: str, model: str = "gpt-5.1", model_key: str = None,
+                    conversation: dict | None = None) -> tuple[dict, str | None]:
+    """Call GPT for an action decision. Returns (action_dict, reasoning)."""
+    parsed, reasoning = _call_gpt(prompt, model, model_key, ActionResponse, conversation)
+    result = {
+        "room": parsed.room,
+        "action": parsed.action,
+        "target": parsed.target,
     }
+    return result, reasoning
 
-    if show_reasoning:
-        kwargs["reasoning"] = {"effort": effort, "summary": "auto"}
-    else:
-        kwargs["reasoning"] = {"effort": "minimal"}
 
-    response = client.responses.parse(**kwargs)
-    parsed = response.output_parsed
+def call_gpt_discussion(prompt: str, model: str = "gpt-5.1", model_key: str = None,
+                        conversation: dict | None = None) -> tuple[dict, str | None]:
+    """Call GPT for a discussion statement. Returns (discussion_dict, reasoning)."""
+    parsed, reasoning = _call_gpt(prompt, model, model_key, DiscussionResponse, conversation)
+    return {"statement": parsed.statement}, reasoning
+
 
-    result = {"vote": parsed.vote, "reason": parsed.reason}
-    reasoning = _extract_reasoning(response) if show_reasoning else None
-    return result, reasoning
+def call_gpt_vote(prompt: str, model: str = "gpt-5.1", model_key: str = None,
+                  conversation: dict | None = None) -> tuple[dict, str | None]:
+    """Call GPT for a vote decision. Returns (vote_dict, reasoning)."""
+    parsed, reasoning = _call_gpt(prompt, model, model_key, VoteResponse, conversation)
+    return {"vote": parsed.vote, "reason": parsed.reason}, reasoning
+
+
+# ─── Batch Requests ───────────────────────────────────────────────────
+
+def _text_format(response_model) -> dict:
+    """Strict json_schema output format for a response model, as responses.parse() sends it."""
+    schema = response_model.model_json_schema()
+    for prop in schema["properties"].values():
+        prop.pop("default", None)  # strict mode: every field is required, optional ones are nullable
+    schema["required"] = list(schema["properties"])
+    schema["additionalProperties"] = False
+    return {"type": "json_schema", "strict": True, "name": response_model.__name__, "schema": schema}
+
+
+def build_batch_body(prompt_type: str, prompt: str, model: str, model_key: str = None) -> dict:
+    """Request body for one /v1/responses line of a Batch API input file."""
+    body = _request_kwargs(prompt, model, model_key)
+    body["text"] = {"format": _text_format(RESPONSE_MODELS[prompt_type])}
+    return body
+
+
+def parse_batch_body(prompt_type: str, body: dict, model_key: str = None) -> tuple[dict, str | None]:
+    """Parse a Responses API body from a batch output line. Returns (result_dict, reasoning)."""
+    show_reasoning, _ = _get_reasoning_config(model_key)
+    text = ""
+    reasoning_parts = []
+    for item in body.get("output", []):
+        if item.get("type") == "message":
+            for part in item.get("content", []):
+                if part.get("type") == "output_text":
+                    text += part.get("text", "")
+        elif item.get("type") == "reasoning":
+            for s in item.get("summary") or []:
+                if s.get("text"):
+                    reasoning_parts.append(s["text"])
+
+    parsed = RESPONSE_MODELS[prompt_type].model_validate_json(text)
+    reasoning = "\n".join(reasoning_parts) if show_reasoning and reasoning_parts else None
+    return parsed.model_dump(), reasoning
@@ -0,0 +1,92 @@
+import re
+import json
+import difflib
+import functools
+
+# Helpers for repairing model output locally instead of throwing it away:
+# case/alias-insensitive name lookup against precomputed indexes, and JSON
+# extraction that tolerates code fences, chatter and trailing commas.
+
+FILLER_WORDS = re.compile(r"\b(the|room|player|go|to|in)\b", re.IGNORECASE)
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def normalize(text) -> str:
+    """Lowercase and keep only letters and digits ("GPT-1 " -> "gpt1")."""
+    return re.sub(r"[^a-z0-9]", "", str(text or "").lower())
+
+
+def build_index(names, aliases=None) -> dict:
+    """Map normalized names and aliases to their canonical name."""
+    index = {normalize(n): n for n in names}
+    for alias, name in (aliases or {}).items():
+        index.setdefault(normalize(alias), name)
+    return index
+
+
+@functools.lru_cache(maxsize=8)
+def _mention_pattern(keys):
+    # "gpt1" matches "GPT-1", "gpt 1" or "GPT1's", but not "GPT-10"
+    parts = [r"[\W_]*".join(re.findall(r"[a-z]+|[0-9]+", k)) for k in sorted(keys, key=len, reverse=True)]
+    return re.compile(r"(?<![a-z0-9])(?:" + "|".join(parts) + r")(?![a-z0-9])", re.IGNORECASE)
+
+
+def mentioned_names(text, index: dict) -> set:
+    """Canonical names from the index that the text mentions as whole words."""
+    keys = frozenset(k for k in index if k)
+    if not keys or not text:
+        return set()
+    return {index[normalize(m)] for m in _mention_pattern(keys).findall(str(text))}
+
+
+def resolve_name(raw, index: dict, allowed=None):
+    """Resolve a model-written name to its canonical form, or None.
+
+    Tries an exact normalized match, then the name with filler words dropped
+    ("the MedBay room"), then a single canonical name contained in the text,
+    then a close spelling match. `allowed` limits the result to those names.
+    """
+    if allowed is not None:
+        allowed = set(allowed)
+        index = {k: v for k, v in index.items() if v in allowed}
+    if not index or raw is None:
+        return None
+
+    key = normalize(raw)
+    if key in index:
+        return index[key]
+
+    stripped = normalize(FILLER_WORDS.sub(" ", str(raw)))
+    if stripped in index:
+        return index[stripped]
+
+    contained = {v for k, v in index.items() if len(k) >= 4 and k in key}
+    if len(contained) == 1:
+        return contained.pop()
+
+    close = difflib.get_close_matches(stripped or key, list(index), n=2, cutoff=0.75)
+    if close and len({index[c] for c in close}) == 1:
+        return index[close[0]]
+    return None
+
+
+def extract_json(text: str) -> dict:
+    """Parse the first JSON object in a model reply. Raises ValueError if there is none."""
+    text = (text or "").strip()
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            return data
+    except ValueError:
+        pass
+
+    text = TRAILING_COMMA.sub(r"\1", text)
+    decoder = json.JSONDecoder()
+    for start in [m.start() for m in re.finditer(r"\{", text)]:
+        try:
+            data, _ = decoder.raw_decode(text, start)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            return data
+    raise ValueError(f"No JSON object found in model reply: {text[:200]!r}")
@@ -0,0 +1,126 @@
+import os
+import gzip
+import json
+
+from serialization import dumps, loads
+from spectator_hub import diff_state
+
+# Replays of finished games.
+#
+# While a game runs, each phase's client state and result are appended to
+# REPLAY_DIR/<game_id>.frames (one JSON line per phase). When the game ends the
+# frames are compacted into two static files:
+#
+#   <game_id>.replay      one gzip member per round. Its first line is a keyframe
+#                         with the full client state; later lines carry deltas.
+#   <game_id>.index.json  the byte range of each round's member, so a player can
+#                         seek to any round with a single HTTP range request
+#
+# Playing a replay needs no model calls and no server state, so the files can be
+# served by any static file server or CDN.
+
+REPLAY_DIR = os.getenv('AMONG_US_REPLAY_DIR', 'data/replays')
+
+FORMAT_VERSION = 1
+
+
+def frames_path(game_id):
+    return os.path.join(REPLAY_DIR, f"{game_id}.frames")
+
+
+def replay_path(game_id):
+    return os.path.join(REPLAY_DIR, f"{game_id}.replay")
+
+
+def index_path(game_id):
+    return os.path.join(REPLAY_DIR, f"{game_id}.index.json")
+
+
+def record_frame(game_id, client_state, result=None, state_json=None):
+    """Append one phase of a running game. state_json is client_state already encoded, if at hand."""
+    if not REPLAY_DIR:
+        return
+    os.makedirs(REPLAY_DIR, exist_ok=True)
+    body = state_json if state_json is not None else dumps(client_state)
+    with open(frames_path(game_id), 'ab') as f:
+        f.write(b'{"result":' + dumps(result or {}) + b',"state":' + body + b'}\n')
+
+
+def finish(game_id):
+    """Compact a finished game's frames into its .replay and .index.json files. Returns the index."""
+    path = frames_path(game_id)
+    if not REPLAY_DIR or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        frames = [loads(line) for line in f if line.strip()]
+
+    rounds, previous = [], None
+    for frame in frames:
+        state = frame['state']
+        if not rounds or rounds[-1]['round'] != state['round']:
+            rounds.append({'round': state['round'], 'lines': []})
+            entry = {'version': state['version'], 'result': frame['result'], 'state': state}
+        else:
+            entry = {'version': state['version'], 'result': frame['result'], 'delta': diff_state(previous, state)}
+        rounds[-1]['lines'].append(dumps(entry))
+        previous = state
+
+    index = {
+        'format': FORMAT_VERSION,
+        'game_id': game_id,
+        'frames': len(frames),
+        'winner': previous['winner'] if previous else None,
+        'win_reason': previous['win_reason'] if previous else None,
+        'gpt_display_name': previous.get('gpt_display_name') if previous else None,
+        'claude_display_name': previous.get('claude_display_name') if previous else None,
+        'rounds': [],
+    }
+    offset, raw_bytes = 0, 0
+    tmp = replay_path(game_id) + '.tmp'
+    with open(tmp, 'wb') as f:
+        for r in rounds:
+            raw = b'\n'.join(r['lines']) + b'\n'
+            member = gzip.compress(raw, compresslevel=9, mtime=0)
+            f.write(member)
+            index['rounds'].append({'round': r['round'], 'offset': offset, 'length': len(member),
+                                    'frames': len(r['lines'])})
+            offset += len(member)
+            raw_bytes += len(raw)
+    index['bytes'] = offset
+    index['raw_bytes'] = raw_bytes
+    os.replace(tmp, replay_path(game_id))
+
+    tmp = index_path(game_id) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp, index_path(game_id))
+    os.remove(path)
+    return index
+
+
+def read_round(game_id, entry):
+    """Decode one round of a replay from its index entry, as the browser does with a range request."""
+    with open(replay_path(game_id), 'rb') as f:
+        f.seek(entry['offset'])
+        member = f.read(entry['length'])
+    return [loads(line) for line in gzip.decompress(member).splitlines() if line]
+
+
+def iter_states(game_id):
+    """Every recorded client state of a finished replay, in order."""
+    path = index_path(game_id)
+    if not REPLAY_DIR or not os.path.exists(path):
+        return
+    with open(path) as f:
+        index = json.load(f)
+    state = None
+    for entry in index['rounds']:
+        for frame in read_round(game_id, entry):
+            if 'state' in frame:
+                state = frame['state']
+            else:
+                state = dict(state)
+                state.update(frame['delta']['set'])
+                for key, tail in frame['delta']['append'].items():
+                    state[key] = state[key] + tail
+            yield state
@@ -0,0 +1,269 @@
+import os
+import json
+import mmap
+import time
+import fcntl
+import threading
+from array import array
+
+# Columnar store of finished games.
+#
+# Every column is a flat binary file of fixed-width values (array typecodes) under
+# RESULTS_DIR, appended once per game and read back through mmap, so analytics
+# touch only the columns they need and never parse raw logs. Strings are
+# dictionary-encoded in dictionary.json. Lists (calls, votes, players) are flat
+# child columns with an end offset per game, like Arrow list arrays.
+#
+# Appends from several worker processes are serialized with a file lock. The
+# game_id column is written last, so its length is the committed row count; a
+# writer that finds longer columns (a crash mid-append) truncates them first.
+
+RESULTS_DIR = os.getenv('AMONG_US_RESULTS_DIR', 'data/results')
+
+SKIP = 255  # vote_target for skips and unresolved votes
+
+# name -> (typecode, width). Dictionary-encoded columns are listed in DICTIONARY_COLUMNS.
+GAME_COLUMNS = {
+    'finished_at': ('d', 1),
+    'gpt_model': ('H', 1),
+    'claude_model': ('H', 1),
+    'backend': ('B', 1),
+    'impostor_team': ('B', 1),
+    'impostor_model': ('H', 1),
+    'winner': ('B', 1),
+    'win_reason': ('B', 1),
+    'rounds': ('H', 1),
+    'players_end': ('Q', 1),
+    'calls_end': ('Q', 1),
+    'votes_end': ('Q', 1),
+}
+PLAYER_COLUMNS = {
+    'player_id': ('H', 1),
+    'player_team': ('B', 1),
+    'player_role': ('B', 1),
+    'player_survived': ('B', 1),
+}
+CALL_COLUMNS = {
+    'call_player': ('B', 1),  # index into the game's players
+    'call_kind': ('B', 1),
+    'call_round': ('H', 1),
+    'call_latency': ('f', 1),
+    'call_input_tokens': ('I', 1),
+    'call_output_tokens': ('I', 1),
+    'call_ok': ('B', 1),
+}
+VOTE_COLUMNS = {
+    'vote_round': ('H', 1),
+    'vote_voter': ('B', 1),  # index into the game's players
+    'vote_target': ('B', 1),  # index into the game's players, or SKIP
+}
+GAME_ID = ('B', 12)  # fixed-width ascii, written last
+
+DICTIONARY_COLUMNS = {
+    'gpt_model': 'model', 'claude_model': 'model', 'impostor_model': 'model',
+    'backend': 'backend', 'impostor_team': 'team', 'winner': 'winner', 'win_reason': 'win_reason',
+    'player_id': 'player_id', 'player_team': 'team', 'player_role': 'role', 'call_kind': 'call_kind',
+}
+
+
+class Column:
+    """One column file, appended with array.tobytes() and read through mmap."""
+
+    def __init__(self, path, typecode, width=1):
+        self.path = path
+        self.typecode = typecode
+        self.width = width
+        self.itemsize = array(typecode).itemsize * width
+        self._map = None
+        self._view = None
+        self._remap_lock = threading.Lock()
+
+    def length(self):
+        try:
+            return os.path.getsize(self.path) // self.itemsize
+        except FileNotFoundError:
+            return 0
+
+    def append(self, values):
+        with open(self.path, 'ab') as f:
+            f.write(array(self.typecode, values).tobytes())
+
+    def truncate(self, rows):
+        if self.length() > rows:
+            with open(self.path, 'r+b') as f:
+                f.truncate(rows * self.itemsize)
+
+    def view(self, rows):
+        """Zero-copy memoryview over the first `rows` values (remapped when the file has grown)."""
+        if rows == 0:
+            return memoryview(array(self.typecode))
+        needed = rows * self.itemsize
+        with self._remap_lock:
+            if self._map is None or len(self._map) < needed:
+                # Views handed out earlier keep the old mapping alive until they are dropped
+                with open(self.path, 'rb') as f:
+                    new_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._map, self._view = new_map, memoryview(new_map).cast(self.typecode)
+            return self._view[:rows * self.width]
+
+    def close(self):
+        with self._remap_lock:
+            if self._view is not None:
+                self._view.release()
+                self._view = None
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+
+
+class Dictionary:
+    """Append-only string dictionaries shared by all columns of one kind."""
+
+    def __init__(self, path):
+        self.path = path
+        self.values = {}  # kind -> [string, ...]
+        self.codes = {}  # kind -> {string: code}
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.values = json.load(f)
+        self.codes = {kind: {v: i for i, v in enumerate(vals)} for kind, vals in self.values.items()}
+
+    def encode(self, kind, value):
+        """Code for a value, adding it if new. Call with the store's write lock held."""
+        value = '' if value is None else str(value)
+        codes = self.codes.setdefault(kind, {})
+        if value not in codes:
+            codes[value] = len(codes)
+            self.values.setdefault(kind, []).append(value)
+            tmp = f"{self.path}.tmp"
+            with open(tmp, 'w') as f:
+                json.dump(self.values, f)
+            os.replace(tmp, self.path)
+        return codes[value]
+
+    def decode(self, kind, code):
+        values = self.values.get(kind, [])
+        if code >= len(values):
+            self.load()  # added by another process
+            values = self.values.get(kind, [])
+        return values[code]
+
+
+class ResultsStore:
+    def __init__(self, path=RESULTS_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.columns = {
+            name: Column(os.path.join(path, f"{name}.{typecode}{width if width > 1 else ''}"), typecode, width)
+            for name, (typecode, width) in
+            {**GAME_COLUMNS, **PLAYER_COLUMNS, **CALL_COLUMNS, **VOTE_COLUMNS, 'game_id': GAME_ID}.items()
+        }
+        self.dictionary = Dictionary(os.path.join(path, 'dictionary.json'))
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.columns['game_id'].length()
+
+    def _file_lock(self):
+        return open(os.path.join(self.path, '.lock'), 'w')
+
+    def append(self, state):
+        """Write one finished game. Safe across threads and processes."""
+        players = state['players']
+        slot = {p['id']: i for i, p in enumerate(players)}
+        by_name = {p['name']: i for i, p in enumerate(players)}
+        impostor = next(p for p in players if p['role'] == 'impostor')
+        impostor_model = state['gpt_model_key'] if impostor['team'] == 'openai' else state['claude_model_key']
+        calls = [c for c in state.get('call_log', []) if c[0] in slot]
+        votes = state.get('vote_history', [])
+
+        with self._lock, self._file_lock() as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            rows = len(self)
+            self._repair(rows)
+            self.dictionary.load()
+            enc = self.dictionary.encode
+            ends = self._ends(rows)
+
+            game = {
+                'finished_at': [time.time()],
+                'gpt_model': [enc('model', state['gpt_model_key'])],
+                'claude_model': [enc('model', state['claude_model_key'])],
+                'backend': [enc('backend', state.get('backend', 'live'))],
+                'impostor_team': [enc('team', impostor['team'])],
+                'impostor_model': [enc('model', impostor_model)],
+                'winner': [enc('winner', state['winner'])],
+                'win_reason': [enc('win_reason', state['win_reason'])],
+                'rounds': [state['round']],
+                'players_end': [ends['players_end'] + len(players)],
+                'calls_end': [ends['calls_end'] + len(calls)],
+                'votes_end': [ends['votes_end'] + len(votes)],
+            }
+            children = {
+                'player_id': [enc('player_id', p['id']) for p in players],
+                'player_team': [enc('team', p['team']) for p in players],
+                'player_role': [enc('role', p['role']) for p in players],
+                'player_survived': [int(p['alive']) for p in players],
+                'call_player': [slot[c[0]] for c in calls],
+                'call_kind': [enc('call_kind', c[1]) for c in calls],
+                'call_round': [c[2] for c in calls],
+                'call_latency': [c[3] for c in calls],
+                'call_input_tokens': [c[4] for c in calls],
+                'call_output_tokens': [c[5] for c in calls],
+                'call_ok': [int(c[6]) for c in calls],
+                'vote_round': [v[0] for v in votes],
+                'vote_voter': [slot.get(v[1], SKIP) for v in votes],
+                'vote_target': [by_name.get(v[2], SKIP) for v in votes],
+            }
+            for name, values in {**children, **game}.items():
+                self.columns[name].append(values)
+            self.columns['game_id'].append(state['game_id'].encode().ljust(12)[:12])
+            return rows
+
+    def _ends(self, rows):
+        """End offsets of the child columns after `rows` games."""
+        return {name: (self.columns[name].view(rows)[rows - 1] if rows else 0)
+                for name in ('players_end', 'calls_end', 'votes_end')}
+
+    def _repair(self, rows):
+        """Drop values a crashed writer appended past the committed row count."""
+        for name in GAME_COLUMNS:
+            self.columns[name].truncate(rows)
+        ends = self._ends(rows)
+        for columns, end in ((PLAYER_COLUMNS, 'players_end'), (CALL_COLUMNS, 'calls_end'), (VOTE_COLUMNS, 'votes_end')):
+            for name in columns:
+                self.columns[name].truncate(ends[end])
+
+    def column(self, name, rows=None):
+        """Read-only view of a game-level column (or a child column, given its total length)."""
+        rows = len(self) if rows is None else rows
+        return self.columns[name].view(rows)
+
+    def game_id(self, row):
+        view = self.columns['game_id'].view(row + 1)
+        return bytes(view[row * 12:(row + 1) * 12]).decode().strip()
+
+    def decode(self, name, code):
+        return self.dictionary.decode(DICTIONARY_COLUMNS[name], code)
+
+    def close(self):
+        for column in self.columns.values():
+            column.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide results store, or None when AMONG_US_RESULTS_DIR is set to ''."""
+    global _store
+    if not RESULTS_DIR:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ResultsStore(RESULTS_DIR)
+        return _store
@@ -0,0 +1,265 @@
+import gzip
+import time
+import threading
+
+from serialization import dumps, loads
+
+# Broadcast hub for spectators.
+#
+# Each game has a channel holding its newest client-state snapshot. A snapshot is
+# rendered once per state version: JSON bytes, their gzip encoding, SSE frames, and
+# a delta against the previous version. Every spectator of that version is then
+# served the same bytes, so the cost of a phase no longer grows with the audience.
+#
+# Channels live per worker process. Workers notice versions published by other
+# workers by checking the game store, at most once per REFRESH_INTERVAL per game,
+# however many spectators are waiting.
+
+# Seconds a long-poll request waits for a newer version before answering 204
+LONG_POLL_TIMEOUT = 25
+
+# Seconds between SSE keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+# Seconds between store checks for versions published by other workers
+REFRESH_INTERVAL = 0.5
+
+# Open streams and long-polls per game, per worker process
+MAX_SUBSCRIBERS = 5000
+
+# Channels without subscribers are dropped after this many idle seconds
+IDLE_TTL = 600
+
+
+class HubFull(Exception):
+    """Raised when a game already has MAX_SUBSCRIBERS connections on this worker."""
+
+
+def diff_state(old, new) -> dict:
+    """Changes from one client state to the next. Lists that only grew are sent as their new tail."""
+    changed, appended = {}, {}
+    for key, value in new.items():
+        before = old.get(key)
+        if before == value:
+            continue
+        if (isinstance(value, list) and isinstance(before, list)
+                and len(value) > len(before) and value[:len(before)] == before):
+            appended[key] = value[len(before):]
+        else:
+            changed[key] = value
+    return {'set': changed, 'append': appended}
+
+
+def _sse_frame(event, version, data):
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (version, event.encode(), data)
+
+
+class Snapshot:
+    """One state version, rendered once for every spectator."""
+
+    __slots__ = ('version', 'state', 'body', 'body_gzip', 'frame',
+                 'delta_body', 'delta_gzip', 'delta_frame', 'created_at')
+
+    def __init__(self, version, state, previous=None):
+        self.version = version
+        self.body = dumps(state)
+        # A detached copy for the next delta: the game keeps mutating lists it shares with the client state
+        self.state = loads(self.body)
+        self.body_gzip = gzip.compress(self.body, compresslevel=6)
+        self.frame = _sse_frame('snapshot', version, self.body)
+        self.delta_body = self.delta_gzip = self.delta_frame = None
+        if previous is not None and previous.version == version - 1:
+            delta = {'version': version, 'base': previous.version, **diff_state(previous.state, state)}
+            self.delta_body = dumps(delta)
+            self.delta_gzip = gzip.compress(self.delta_body, compresslevel=6)
+            self.delta_frame = _sse_frame('delta', version, self.delta_body)
+        self.created_at = time.time()
+
+    def payload(self, since=None, use_gzip=False):
+        """Body for a spectator that has version `since`: the delta when it is one version behind."""
+        if since == self.version - 1 and self.delta_body is not None:
+            return self.delta_gzip if use_gzip else self.delta_body
+        return self.body_gzip if use_gzip else self.body
+
+    def nbytes(self):
+        """Rendered bytes held by this snapshot (the detached state is counted at its encoded size)."""
+        rendered = (self.body, self.body_gzip, self.frame, self.delta_body, self.delta_gzip, self.delta_frame)
+        return len(self.body) + sum(len(b) for b in rendered if b is not None)
+
+
+class Channel:
+    """Newest snapshot of one game, plus the spectators waiting on it."""
+
+    def __init__(self, game_id):
+        self.game_id = game_id
+        self.latest = None
+        self.cond = threading.Condition()
+        self.subscribers = 0
+        self.checked_at = 0.0
+        self.last_used = time.time()
+
+    def publish(self, version, state):
+        """Render a new version and wake every waiting spectator.
+
+        Returns the new snapshot, or None when the version is not newer than the current one.
+        """
+        previous = self.latest
+        if previous is not None and version <= previous.version:
+            return None
+        snapshot = Snapshot(version, state, previous)
+        with self.cond:
+            if self.latest is not None and version <= self.latest.version:
+                return None
+            self.latest = snapshot
+            self.cond.notify_all()
+        return snapshot
+
+    def wait_newer(self, version, timeout):
+        with self.cond:
+            self.cond.wait_for(lambda: self._newer(version), timeout)
+            return self.latest
+
+    def _newer(self, version):
+        return self.latest is not None and (version is None or self.latest.version > version)
+
+
+class SpectatorHub:
+    """All channels of one worker process.
+
+    `current_version(game_id)` returns the stored version of a game (None if unknown),
+    and `load(game_id)` returns its (version, client_state); both read the game store.
+    """
+
+    def __init__(self, current_version, load):
+        self.current_version = current_version
+        self.load = load
+        self.channels = {}
+        self.lock = threading.Lock()
+        self.stats = {'published': 0, 'bytes_rendered': 0, 'refreshes': 0}
+
+    def channel(self, game_id):
+        now = time.time()
+        with self.lock:
+            channel = self.channels.get(game_id)
+            if channel is None:
+                self._sweep(now)
+                channel = self.channels[game_id] = Channel(game_id)
+            channel.last_used = now
+            return channel
+
+    def _sweep(self, now):
+        for game_id, channel in list(self.channels.items()):
+            if channel.subscribers == 0 and now - channel.last_used > IDLE_TTL:
+                del self.channels[game_id]
+
+    def publish(self, game_id, version, state):
+        """Called by the worker that just advanced the game."""
+        channel = self.channel(game_id)
+        snapshot = channel.publish(version, state)
+        if snapshot is None:
+            return channel.latest
+        self.stats['published'] += 1
+        self.stats['bytes_rendered'] += len(snapshot.body) + len(snapshot.delta_body or b'')
+        return snapshot
+
+    def refresh(self, channel):
+        """Pick up a version another worker wrote to the store. Throttled per channel, not per spectator."""
+        now = time.monotonic()
+        with channel.cond:
+            if now - channel.checked_at < REFRESH_INTERVAL:
+                return channel.latest
+            channel.checked_at = now
+        version = self.current_version(channel.game_id)
+        if version is not None and (channel.latest is None or version > channel.latest.version):
+            loaded = self.load(channel.game_id)
+            if loaded is not None:
+                self.stats['refreshes'] += 1
+                return self.publish(channel.game_id, *loaded)
+        return channel.latest
+
+    def current(self, game_id):
+        """The newest snapshot of a game, or None if the game does not exist."""
+        channel = self.channel(game_id)
+        snapshot = self.refresh(channel)
+        if snapshot is None and channel.subscribers == 0:
+            with self.lock:
+                self.channels.pop(game_id, None)
+        return snapshot
+
+    def wait(self, channel, version, timeout):
+        """Block until the channel has a version newer than `version` or the timeout passes."""
+        deadline = time.monotonic() + timeout
+        while True:
+            snapshot = self.refresh(channel)
+            if channel._newer(version):
+                return channel.latest
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return snapshot
+            channel.wait_newer(version, min(remaining, REFRESH_INTERVAL))
+
+    def join(self, game_id):
+        channel = self.channel(game_id)
+        with channel.cond:
+            if channel.subscribers >= MAX_SUBSCRIBERS:
+                raise HubFull(game_id)
+            channel.subscribers += 1
+        return channel
+
+    def leave(self, channel):
+        with channel.cond:
+            channel.subscribers -= 1
+        channel.last_used = time.time()
+
+    def long_poll(self, game_id, since, timeout=LONG_POLL_TIMEOUT):
+        """Newest snapshot once it is newer than `since`, or None on timeout."""
+        channel = self.join(game_id)
+        try:
+            snapshot = self.wait(channel, since, timeout)
+        finally:
+            self.leave(channel)
+        return snapshot if snapshot is not None and (since is None or snapshot.version > since) else None
+
+    def stream(self, game_id, since=None):
+        """Join the game's channel and return the SSE frames for one spectator."""
+        return self._frames(self.join(game_id), since)
+
+    def _frames(self, channel, since):
+        """Frames until the game-over snapshot.
+
+        The generator only renders its next frame once the previous one has been
+        written to the socket, so a slow spectator never queues frames: it skips the
+        versions it missed and gets the newest full snapshot instead of a delta.
+        """
+        try:
+            yield b"retry: 2000\n\n"
+            sent = since
+            while True:
+                snapshot = self.wait(channel, sent, KEEPALIVE_INTERVAL)
+                if snapshot is None or (sent is not None and snapshot.version <= sent):
+                    yield b": keep-alive\n\n"
+                    continue
+                if sent == snapshot.version - 1 and snapshot.delta_frame is not None:
+                    yield snapshot.delta_frame
+                else:
+                    yield snapshot.frame
+                sent = snapshot.version
+                if snapshot.state.get('game_over'):
+                    return
+        finally:
+            self.leave(channel)
+
+    def summary(self):
+        with self.lock:
+            channels = list(self.channels.values())
+        return {
+            'channels': len(channels),
+            'subscribers': sum(c.subscribers for c in channels),
+            **self.stats,
+        }
+
+    def footprint(self):
+        """Bytes of rendered snapshots held for this worker's spectators."""
+        with self.lock:
+            snapshots = [c.latest for c in self.channels.values() if c.latest is not None]
+        return {'channels': len(snapshots), 'bytes': sum(s.nbytes() for s in snapshots)}
@@ -48,22 +48,44 @@ const CREW_COLORS = {
 };
 
 let isRunning = false;
+let gameId = null;
+let playbackSpeed = 1;  // replay mode scales every sleep() by this
+let replaySeekTo = null;
 let lastState = null;
-let wanderTimer = null;
 const playerEls = {};
 const bodyEls = {};
 const playerPos = {};
 const playerRoom = {};
-const playerMoveUntil = {};
-const playerIdleTimers = {};
+const playerMoveUntil = {};  // performance.now() timestamps
+const walkingPlayers = new Set();
+
+// What is currently on screen, so updateUI only touches the parts of the DOM that changed
+const rendered = {
+    key: null,        // game_id:version of the last state rendered
+    gameId: null,
+    sections: {},     // section name -> value last written
+    discussion: { round: null, count: 0 },
+    events: 0,        // event_count of the last state rendered
+};
+
+// The single animation loop (see startAnimation)
+const motion = { frame: null, nextWander: 0 };
 
 const PLAYER_W = 34;
 const PLAYER_H = 40;
 const ROOM_PADDING = 14;
+const WANDER_INTERVAL = 1200;  // ms between idle wander steps
+const EVENT_LOG_LIMIT = 20;    // entries kept in the event log panel
 
 // ═══ INIT ══════════════════════════════════════════════════════════
 btnRun.addEventListener('click', startGame);
 
+// /?spectate=<game_id> watches a game someone else is running
+const params = new URLSearchParams(location.search);
+if (params.get('spectate')) spectate(params.get('spectate'));
+// /?replay=<game_id> plays a recorded game without any model calls
+if (params.get('replay')) replay(params.get('replay'));
+
 // ═══ CREWMATE SVG GENERATOR ═══════════════════════════════════════
 function crewmateSVG(color, size = 32) {
     return `<svg viewBox="0 0 80 90" width="${size}" height="${size * 90/80}">
@@ -102,10 +124,11 @@ async function startGame() {
         });
         const data = await res.json();
         if (data.success) {
+            gameId = data.game_state.game_id;
             modalOverlay.classList.add('hidden');
             gameContainer.classList.remove('hidden');
             updateUI(data.game_state);
-            startWanderLoop();
+            startAnimation();
             runGameLoop();
         }
     } catch (err) {
@@ -122,7 +145,7 @@ async function runGameLoop() {
     isRunning = true;
 
     while (isRunning) {
-        const stateRes = await fetch('/api/game-state');
+        const stateRes = await fetch(`/api/game-state?game_id=${gameId}`);
         if (!stateRes.ok) break;
         const state = await stateRes.json();
         if (state.error) break;
@@ -136,9 +159,12 @@ async function runGameLoop() {
 
         // Advance phase
         try {
-            const phaseRes = await fetch('/api/next-phase', { method: 'POST' });
+            const phaseRes = await fetch(`/api/next-phase?game_id=${gameId}`, { method: 'POST' });
             const pd = await phaseRes.json();
 
+            // Another tab or worker is already running this phase; wait for it
+            if (phaseRes.status === 409) { await sleep(2000); continue; }
+
             if (!pd.success) {
                 phaseStatus.textContent = 'Error: ' + (pd.error || 'Unknown');
                 if (pd.game_state && pd.game_state.game_over) showGameOver(pd.game_state);
@@ -147,29 +173,7 @@ async function runGameLoop() {
 
             updateUI(pd.game_state);
             const r = pd.result || {};
-
-            // Action events
-            if (r.events && r.events.length) {
-                phaseStatus.textContent = r.events[r.events.length - 1];
-                await sleep(1500);
-            }
-
-            // Meeting triggered
-            if (r.meeting) {
-                phaseStatus.textContent = r.meeting_reason || 'Emergency meeting!';
-                showMeetingAlert(r.meeting_reason);
-                await sleep(2500);
-            }
-
-            // Vote result — show cinematic ejection
-            if (r.vote_result) {
-                showVoteResults(r.vote_result, pd.game_state);
-                if (r.vote_result.ejected) {
-                    await showEjectionCinematic(r.vote_result, pd.game_state);
-                } else {
-                    await sleep(2500);
-                }
-            }
+            await showPhaseResult(r, pd.game_state);
 
             // Game over
             if (r.game_over || (pd.game_state && pd.game_state.game_over)) {
@@ -189,6 +193,112 @@ async function runGameLoop() {
     }
 }
 
+// Animate what a phase produced: its events, a meeting call, the vote outcome
+async function showPhaseResult(r, state) {
+    // Action events
+    if (r.events && r.events.length) {
+        phaseStatus.textContent = r.events[r.events.length - 1];
+        await sleep(1500);
+    }
+
+    // Meeting triggered
+    if (r.meeting) {
+        phaseStatus.textContent = r.meeting_reason || 'Emergency meeting!';
+        showMeetingAlert(r.meeting_reason);
+        await sleep(2500);
+    }
+
+    // Vote result — show cinematic ejection
+    if (r.vote_result) {
+        showVoteResults(r.vote_result, state);
+        if (r.vote_result.ejected) {
+            await showEjectionCinematic(r.vote_result, state);
+        } else {
+            await sleep(2500);
+        }
+    }
+}
+
+// ═══ SPECTATOR MODE ════════════════════════════════════════════════
+function spectate(id) {
+    modalOverlay.classList.add('hidden');
+    gameContainer.classList.remove('hidden');
+    startAnimation();
+
+    let state = null;
+    const source = new EventSource(`/api/spectate/${id}/stream`);
+    const show = () => {
+        updateUI(state);
+        setPhaseDisplay(state.phase);
+        if (state.game_over) { showGameOver(state); source.close(); }
+    };
+
+    source.addEventListener('snapshot', e => {
+        state = JSON.parse(e.data);
+        show();
+    });
+    source.addEventListener('delta', e => {
+        const d = JSON.parse(e.data);
+        if (!state || state.version !== d.base) return;
+        state = applyDelta(state, d);
+        show();
+    });
+}
+
+// A delta only changes some keys; lists that grew carry just their new tail
+function applyDelta(state, d) {
+    Object.assign(state, d.set);
+    for (const [key, tail] of Object.entries(d.append)) state[key] = state[key].concat(tail);
+    return state;
+}
+
+// ═══ REPLAY MODE ═══════════════════════════════════════════════════
+async function replay(id) {
+    modalOverlay.classList.add('hidden');
+    gameContainer.classList.remove('hidden');
+    const res = await fetch(`/replays/${id}.index.json`);
+    if (!res.ok) { phaseStatus.textContent = 'Replay not found'; return; }
+    const index = await res.json();
+
+    const controls = el('replay-controls');
+    const roundSelect = el('replay-round');
+    const speedSelect = el('replay-speed');
+    controls.classList.remove('hidden');
+    roundSelect.innerHTML = index.rounds.map((r, i) => `<option value="${i}">Round ${r.round}</option>`).join('');
+    roundSelect.addEventListener('change', () => { replaySeekTo = Number(roundSelect.value); });
+    speedSelect.addEventListener('change', () => { playbackSpeed = Number(speedSelect.value); });
+    startAnimation();
+
+    let state = null;
+    let i = 0;
+    while (i < index.rounds.length) {
+        roundSelect.value = i;
+        const frames = await fetchReplayRound(id, index.rounds[i]);
+        let seeked = false;
+        for (const f of frames) {
+            state = f.state || applyDelta(state, f.delta);
+            updateUI(state);
+            setPhaseDisplay(state.phase);
+            await showPhaseResult(f.result || {}, state);
+            await sleep(1000);
+            if (replaySeekTo !== null) { i = replaySeekTo; replaySeekTo = null; seeked = true; break; }
+        }
+        if (!seeked) i++;
+    }
+    if (state && state.game_over) showGameOver(state);
+}
+
+// Each round is its own gzip member, fetched with a range request from the static file
+async function fetchReplayRound(id, entry) {
+    const res = await fetch(`/replays/${id}.replay`, {
+        headers: { Range: `bytes=${entry.offset}-${entry.offset + entry.length - 1}` }
+    });
+    let member = await res.blob();
+    if (res.status === 200) member = member.slice(entry.offset, entry.offset + entry.length);  // range ignored
+    const text = await new Response(member.stream().pipeThrough(new DecompressionStream('gzip'))).text();
+    return text.split('\n').filter(Boolean).map(line => JSON.parse(line));
+}
+
 // ═══ PHASE DISPLAY ═════════════════════════════════════════════════
 function setPhaseDisplay(phase) {
     const labels = {
@@ -221,60 +331,68 @@ function setPhaseDisplay(phase) {
 }
 
 // ═══ UPDATE UI ═════════════════════════════════════════════════════
+// States are keyed by the server's state version: a state that is already on
+// screen is skipped, and otherwise each section is written only when its value
+// changed. The discussion and event logs only append their new entries.
 function updateUI(s) {
     if (!s) return;
     lastState = s;
 
-    roundNumberEl.textContent = s.round;
+    const key = `${s.game_id}:${s.version}`;
+    if (s.version !== undefined && key === rendered.key) return;
+    rendered.key = key;
+    if (s.game_id !== rendered.gameId) resetRendered(s.game_id);
+
+    if (changed('round', s.round)) roundNumberEl.textContent = s.round;
 
     // Tasks
-    const pct = Math.round((s.total_tasks_done / s.total_tasks_needed) * 100);
-    taskBarFill.style.width = pct + '%';
-    taskCount.textContent = s.total_tasks_done + '/' + s.total_tasks_needed;
+    if (changed('tasks', s.total_tasks_done + '/' + s.total_tasks_needed)) {
+        const pct = Math.round((s.total_tasks_done / s.total_tasks_needed) * 100);
+        taskBarFill.style.width = pct + '%';
+        taskCount.textContent = s.total_tasks_done + '/' + s.total_tasks_needed;
+    }
 
     // Model labels
-    el('gpt-model-label').textContent = s.gpt_display_name;
-    el('claude-model-label').textContent = s.claude_display_name;
+    if (changed('gpt-model', s.gpt_display_name)) el('gpt-model-label').textContent = s.gpt_display_name;
+    if (changed('claude-model', s.claude_display_name)) el('claude-model-label').textContent = s.claude_display_name;
 
     // Players
     if (s.players) {
         s.players.forEach(p => {
             // Role
             const roleEl = el('role-' + p.id);
-            if (roleEl) {
+            if (roleEl && changed('role-' + p.id, p.role)) {
                 roleEl.textContent = p.role.toUpperCase();
                 roleEl.className = 'pc-role role-' + p.role;
             }
 
-            // Status
-            const stEl = el('status-' + p.id);
-            if (stEl) {
-                if (p.ejected) { stEl.textContent = 'EJECTED'; stEl.className = 'pc-status ejected'; }
-                else if (!p.alive) { stEl.textContent = 'DEAD'; stEl.className = 'pc-status dead'; }
-                else { stEl.textContent = 'ALIVE'; stEl.className = 'pc-status alive'; }
+            // Status, and dead dimming
+            const status = p.ejected ? 'ejected' : !p.alive ? 'dead' : 'alive';
+            if (changed('status-' + p.id, status)) {
+                const stEl = el('status-' + p.id);
+                if (stEl) { stEl.textContent = status.toUpperCase(); stEl.className = 'pc-status ' + status; }
+                const card = el('player-' + p.id);
+                if (card) card.classList.toggle('player-dead', status !== 'alive');
             }
 
             // Location
             const locEl = el('location-' + p.id);
-            if (locEl) locEl.textContent = p.location;
+            if (locEl && changed('location-' + p.id, p.location)) locEl.textContent = p.location;
 
             // Tasks list
             const tEl = el('tasks-' + p.id);
-            if (tEl && p.tasks && p.tasks.length) {
-                tEl.innerHTML = p.tasks.map(t =>
-                    `<div class="task-item ${t.done ? 'task-done' : ''}">
-                        <span class="task-check">${t.done ? '\u2713' : '\u25CB'}</span>
-                        <span>${t.name} (${t.room})</span>
-                    </div>`
-                ).join('');
-            } else if (tEl && p.role === 'impostor') {
-                tEl.innerHTML = '<div class="task-item task-impostor">Impostor — no tasks</div>';
-            }
-
-            // Dead dimming
-            const card = el('player-' + p.id);
-            if (card) {
-                card.classList.toggle('player-dead', !p.alive || p.ejected);
+            const tasks = p.tasks || [];
+            if (tEl && changed('tasks-' + p.id, p.role + ':' + tasks.map(t => t.done ? 1 : 0).join(''))) {
+                if (tasks.length) {
+                    tEl.innerHTML = tasks.map(t =>
+                        `<div class="task-item ${t.done ? 'task-done' : ''}">
+                            <span class="task-check">${t.done ? '\u2713' : '\u25CB'}</span>
+                            <span>${t.name} (${t.room})</span>
+                        </div>`
+                    ).join('');
+                } else if (p.role === 'impostor') {
+                    tEl.innerHTML = '<div class="task-item task-impostor">Impostor — no tasks</div>';
+                }
             }
         });
 
@@ -285,7 +403,7 @@ function updateUI(s) {
     if (s.timing) {
         PLAYER_IDS.forEach(pid => {
             const t = s.timing[pid];
-            if (t) {
+            if (t && changed('time-' + pid, t.last + '/' + t.total)) {
                 const lE = el('time-last-' + pid);
                 const tE = el('time-total-' + pid);
                 if (lE) lE.textContent = t.last + 's';
@@ -298,44 +416,83 @@ function updateUI(s) {
     if (s.reasoning) {
         PLAYER_IDS.forEach(pid => {
             const rE = el('reasoning-' + pid);
-            if (rE && s.reasoning[pid]) rE.textContent = s.reasoning[pid].substring(0, 500);
+            const text = s.reasoning[pid] ? s.reasoning[pid].substring(0, 500) : null;
+            if (rE && text && changed('reasoning-' + pid, text)) rE.textContent = text;
         });
     }
 
-    // Discussion
+    // Discussion: one meeting per round, statements only ever appended within it
     if (s.discussion_log && s.discussion_log.length) {
         discussionPanel.classList.remove('hidden');
-        discussionLog.innerHTML = s.discussion_log.map(e => {
-            const c = CREW_COLORS[e.player_id] || '#fff';
-            return `<div class="chat-bubble" style="border-left-color:${c}">
-                <span class="chat-name" style="color:${c}">${e.player}:</span>
-                <span class="chat-text">${esc(e.statement)}</span>
-            </div>`;
-        }).join('');
-        discussionLog.scrollTop = discussionLog.scrollHeight;
+        const seen = rendered.discussion;
+        if (seen.round !== s.round || s.discussion_log.length < seen.count) {
+            discussionLog.textContent = '';
+            seen.round = s.round;
+            seen.count = 0;
+        }
+        if (s.discussion_log.length > seen.count) {
+            discussionLog.insertAdjacentHTML('beforeend', s.discussion_log.slice(seen.count).map(e => {
+                const c = CREW_COLORS[e.player_id] || '#fff';
+                return `<div class="chat-bubble" style="border-left-color:${c}">
+                    <span class="chat-name" style="color:${c}">${e.player}:</span>
+                    <span class="chat-text">${esc(e.statement)}</span>
+                </div>`;
+            }).join(''));
+            seen.count = s.discussion_log.length;
+            discussionLog.scrollTop = discussionLog.scrollHeight;
+        }
     }
 
     // Votes
     if (s.vote_results && Object.keys(s.vote_results).length) {
         votingPanel.classList.remove('hidden');
-        voteResults.innerHTML = Object.values(s.vote_results).map(v =>
-            `<div class="vote-entry">
-                <span class="vote-voter">${v.voter}</span>
-                <span class="vote-arrow">\u27A1</span>
-                <span class="vote-target">${v.vote}</span>
-                ${v.reason ? `<span class="vote-reason">(${esc(v.reason)})</span>` : ''}
-            </div>`
-        ).join('');
+        const votes = Object.values(s.vote_results);
+        if (changed('votes', votes.map(v => v.voter + '>' + v.vote).join('|'))) {
+            voteResults.innerHTML = votes.map(v =>
+                `<div class="vote-entry">
+                    <span class="vote-voter">${v.voter}</span>
+                    <span class="vote-arrow">\u27A1</span>
+                    <span class="vote-target">${v.vote}</span>
+                    ${v.reason ? `<span class="vote-reason">(${esc(v.reason)})</span>` : ''}
+                </div>`
+            ).join('');
+        }
     }
 
-    // Event log
+    // Event log, newest first. The server sends the last 20 entries and the total count.
     if (s.event_log) {
-        eventLogEl.innerHTML = [...s.event_log].reverse().map(e =>
-            `<div class="event-entry">${esc(e)}</div>`
-        ).join('');
+        const total = s.event_count !== undefined ? s.event_count : s.event_log.length;
+        let fresh = total - rendered.events;
+        if (fresh < 0) {  // seeked back in a replay
+            eventLogEl.textContent = '';
+            fresh = total;
+        }
+        if (fresh > 0) {
+            eventLogEl.insertAdjacentHTML('afterbegin', s.event_log.slice(-fresh).reverse().map(e =>
+                `<div class="event-entry">${esc(e)}</div>`
+            ).join(''));
+            while (eventLogEl.childElementCount > EVENT_LOG_LIMIT) eventLogEl.lastElementChild.remove();
+        }
+        rendered.events = total;
     }
 }
 
+// Record a section's new value; true if it differs from what is on screen
+function changed(section, value) {
+    if (rendered.sections[section] === value) return false;
+    rendered.sections[section] = value;
+    return true;
+}
+
+function resetRendered(id) {
+    rendered.gameId = id;
+    rendered.sections = {};
+    rendered.discussion = { round: null, count: 0 };
+    rendered.events = 0;
+    discussionLog.textContent = '';
+    eventLogEl.textContent = '';
+}
+
 // ═══ MAP UPDATE ════════════════════════════════════════════════════
 function updateMap(players, bodies, immediate = false) {
     if (!shipInterior || !mapPlayers || !mapBodies) return;
@@ -376,10 +533,13 @@ function updateMap(players, bodies, immediate = false) {
             mapBodies.appendChild(be);
             bodyEls[b.player_id] = be;
         }
-        const pos = randomPointInRoom(b.room, 18);
-        if (pos) {
-            be.style.left = `${pos.x}px`;
-            be.style.top = `${pos.y}px`;
+        if (immediate || be.dataset.room !== b.room) {
+            const pos = randomPointInRoom(b.room, 18);
+            if (pos) {
+                be.style.left = `${pos.x}px`;
+                be.style.top = `${pos.y}px`;
+                be.dataset.room = b.room;
+            }
         }
     });
     Object.keys(bodyEls).forEach(pid => {
@@ -441,32 +601,51 @@ function movePlayerTo(id, roomName, immediate = false) {
     elp.style.top = `${dest.y}px`;
     playerPos[id] = dest;
     playerRoom[id] = roomName;
-    playerMoveUntil[id] = Date.now() + duration * 1000;
+    playerMoveUntil[id] = performance.now() + duration * 1000;
 
     elp.classList.remove('idle');
     elp.classList.add('is-walking');
-    if (playerIdleTimers[id]) clearTimeout(playerIdleTimers[id]);
-    playerIdleTimers[id] = setTimeout(() => {
-        elp.classList.remove('is-walking');
-        elp.classList.add('idle');
-    }, duration * 1000 + 50);
+    walkingPlayers.add(id);
 }
 
-function startWanderLoop() {
-    if (wanderTimer) return;
-    wanderTimer = setInterval(() => {
-        if (!isRunning || !lastState || !lastState.players) return;
-        const now = Date.now();
-        lastState.players.forEach(p => {
-            if (p.ejected || !p.alive) return;
-            if (!playerRoom[p.id]) return;
-            const lock = playerMoveUntil[p.id] || 0;
-            if (now < lock) return;
-            movePlayerTo(p.id, playerRoom[p.id], false);
-        });
-    }, 1200);
+// ═══ ANIMATION SCHEDULER ═══════════════════════════════════════════
+// One requestAnimationFrame loop drives all map motion: it settles players that
+// finished walking and starts idle wander steps. It stops while the tab is hidden.
+function startAnimation() {
+    if (motion.frame === null && !document.hidden) motion.frame = requestAnimationFrame(tick);
+}
+
+function stopAnimation() {
+    if (motion.frame !== null) cancelAnimationFrame(motion.frame);
+    motion.frame = null;
 }
 
+function tick(now) {
+    motion.frame = requestAnimationFrame(tick);
+
+    walkingPlayers.forEach(id => {
+        if (now < playerMoveUntil[id] + 50) return;
+        playerEls[id].classList.remove('is-walking');
+        playerEls[id].classList.add('idle');
+        walkingPlayers.delete(id);
+    });
+
+    if (now < motion.nextWander) return;
+    motion.nextWander = now + WANDER_INTERVAL;
+    if (!isRunning || !lastState || !lastState.players) return;
+    lastState.players.forEach(p => {
+        if (p.ejected || !p.alive) return;
+        if (!playerRoom[p.id]) return;
+        if (now < (playerMoveUntil[p.id] || 0)) return;
+        movePlayerTo(p.id, playerRoom[p.id], false);
+    });
+}
+
+document.addEventListener('visibilitychange', () => {
+    if (document.hidden) stopAnimation();
+    else if (!gameContainer.classList.contains('hidden')) startAnimation();
+});
+
 function clamp(v, min, max) {
     return Math.max(min, Math.min(max, v));
 }
@@ -599,5 +778,5 @@ function esc(str) {
 }
 
 function sleep(ms) {
-    return new Promise(r => setTimeout(r, ms));
+    return new Promise(r => setTimeout(r, ms / playbackSpeed));
 }
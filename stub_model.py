@@ -0,0 +1,79 @@
+import re
+import time
+import zlib
+import random
+
+from tracing import record_usage
+
+# Offline stand-in for the GPT/Claude players. Answers are derived from the prompt
+# text alone (no API calls), so they are cheap, deterministic per prompt and always
+# valid for the game engine.
+
+DEFAULT_ROOMS = ['Cafeteria', 'Electrical', 'MedBay', 'Navigation', 'Reactor']
+
+STATEMENTS = [
+    "I was in {room} the whole time doing my tasks.",
+    "I came from {room} and didn't see anything suspicious.",
+    "Someone was acting weird near {room}, I'd keep an eye on them.",
+    "I can vouch for whoever was with me in {room}.",
+]
+
+
+def _rng(prompt: str) -> random.Random:
+    return random.Random(zlib.crc32(prompt.encode("utf-8")))
+
+
+def _field(prompt: str, label: str) -> str:
+    m = re.search(rf"^{re.escape(label)}:\s*(.*)$", prompt, re.MULTILINE)
+    return m.group(1).strip() if m else ""
+
+
+def _names(value: str) -> list[str]:
+    value = value.split("(")[0]
+    if not value or value.strip() == "none":
+        return []
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def stub_reply(prompt_type: str, prompt: str) -> dict:
+    """Return a valid answer for an action, discussion or vote prompt."""
+    rng = _rng(prompt)
+    rooms = _names(_field(prompt, "ROOMS")) or DEFAULT_ROOMS
+
+    if prompt_type == "action":
+        if "the IMPOSTOR" in prompt:
+            same_room = _names(_field(prompt, "PLAYERS IN YOUR ROOM"))
+            can_kill = "You CAN kill" in prompt
+            if can_kill and 1 <= len(same_room) <= 2:
+                return {"room": _field(prompt, "YOUR LOCATION") or rng.choice(rooms),
+                        "action": "kill", "target": same_room[0]}
+            return {"room": rng.choice(rooms), "action": rng.choice(["fake_task", "wait"]), "target": None}
+
+        task_rooms = re.findall(r"^\s+- .+ \(in (\w+)\)$", prompt, re.MULTILINE)
+        if task_rooms and rng.random() < 0.5:
+            return {"room": task_rooms[0], "action": "do_task", "target": None}
+        return {"room": rng.choice(rooms), "action": "wait", "target": None}
+
+    if prompt_type == "discussion":
+        m = re.search(r"You are in (\w+)\.", prompt)
+        room = m.group(1) if m else rng.choice(rooms)
+        return {"statement": rng.choice(STATEMENTS).format(room=room)}
+
+    candidates = _names(_field(prompt, "ALIVE PLAYERS YOU CAN VOTE FOR"))
+    if not candidates or rng.random() < 0.3:
+        return {"vote": "skip", "reason": "Not enough evidence."}
+    return {"vote": rng.choice(candidates), "reason": "Their story doesn't add up."}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for stand-in usage numbers."""
+    return max(1, len(text) // 4)
+
+
+def call_stub(team, prompt_type, prompt, model_id, model_key, use_thinking, conversation=None, latency=0.0):
+    """Model backend with call_model's signature. Returns (result, reasoning)."""
+    if latency:
+        time.sleep(latency)
+    reply = stub_reply(prompt_type, prompt)
+    record_usage(estimate_tokens(prompt), estimate_tokens(str(reply)))
+    return reply, f"[stub {model_id}] {prompt_type} decision"
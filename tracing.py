@@ -0,0 +1,347 @@
+import os
+import sys
+import json
+import time
+import threading
+import functools
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Span tracing for phase execution.
+#
+# A trace covers one phase request (/api/next-phase or a headless advance_phase).
+# Spans nest through a context variable, so code outside a trace pays almost nothing.
+# The latest trace per game is kept in memory for /debug/traces/<game_id>. With
+# AMONG_US_TRACE_DIR set, finished traces are also appended to <dir>/<game_id>.json in
+# Chrome trace-event format (JSON array form, loadable in chrome://tracing or ui.perfetto.dev).
+
+# Directory for exported traces; empty (the default) keeps traces in memory only
+TRACE_DIR = os.getenv('AMONG_US_TRACE_DIR', '')
+DEFAULT_TRACE_DIR = 'traces'  # used by headless.py --trace when AMONG_US_TRACE_DIR is unset
+
+# How many games keep their latest trace in memory
+MAX_LATEST_TRACES = 100
+
+# Seconds between stack samples when profiling is requested
+PROFILE_INTERVAL = 0.005
+
+LATEST_TRACES = OrderedDict()  # game_id -> Trace of its most recent phase
+_latest_lock = threading.Lock()  # guards LATEST_TRACES; request threads finish traces concurrently
+
+_current = contextvars.ContextVar('tracing_span', default=None)
+_usage = contextvars.ContextVar('tracing_usage', default=None)
+_export_lock = threading.Lock()
+_PID = os.getpid()
+_PROFILE_PID = _PID + 1  # sampled stacks get their own process row in the viewer
+
+
+def _now_us():
+    return time.time() * 1e6
+
+
+class Trace:
+    """All spans recorded while handling one phase of one game."""
+
+    def __init__(self, game_id, name, args):
+        self.game_id = game_id
+        self.name = name
+        self.args = args
+        self.events = []
+        self.thread_ids = set()
+        self.lock = threading.Lock()
+        self.exported_mtime = None  # st_mtime_ns of the trace file right after this trace was appended
+
+    def add(self, event):
+        with self.lock:
+            self.events.append(event)
+
+
+class Span:
+    __slots__ = ('trace', 'name', 'cat', 'args', 'start_us', 'start', 'tid')
+
+    def __init__(self, trace, name, cat, args):
+        self.trace = trace
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.tid = threading.get_ident()
+        self.start_us = _now_us()
+        self.start = time.perf_counter()
+        trace.thread_ids.add(self.tid)
+
+    def set(self, **args):
+        """Attach extra attributes (token counts, sizes...) to the span."""
+        self.args.update(args)
+
+    def finish(self):
+        self.trace.add({
+            'name': self.name, 'cat': self.cat, 'ph': 'X', 'pid': _PID, 'tid': self.tid,
+            'ts': round(self.start_us, 1), 'dur': round((time.perf_counter() - self.start) * 1e6, 1),
+            'args': self.args,
+        })
+
+
+class _NullSpan:
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+@contextmanager
+def span(name, cat='engine', **args):
+    """Record a span inside the current trace. Does nothing when no trace is active."""
+    parent = _current.get()
+    if parent is None:
+        yield _NULL_SPAN
+        return
+    s = Span(parent.trace, name, cat, args)
+    token = _current.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.args['error'] = repr(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.finish()
+
+
+def traced(name=None, cat='engine'):
+    """Decorator form of span() for whole functions."""
+    def decorator(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with span(label, cat):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def trace(game_id, name, profile=False, **args):
+    """Start a trace for one phase. With profile=True, the traced threads are also stack-sampled."""
+    t = Trace(game_id, name, args)
+    root = Span(t, name, 'request', dict(args))
+    token = _current.set(root)
+    profiler = SamplingProfiler(t).start() if profile else None
+    try:
+        yield root
+    except Exception as e:
+        root.args['error'] = repr(e)
+        raise
+    finally:
+        _current.reset(token)
+        root.finish()
+        if profiler:
+            profiler.stop()
+        _finish(t)
+
+
+def _finish(t):
+    with _latest_lock:
+        LATEST_TRACES[t.game_id] = t
+        LATEST_TRACES.move_to_end(t.game_id)
+        while len(LATEST_TRACES) > MAX_LATEST_TRACES:
+            LATEST_TRACES.popitem(last=False)
+    if TRACE_DIR:
+        export(t)
+
+
+# ─── Token Usage ─────────────────────────────────────────────────────
+
+@contextmanager
+def meter():
+    """Collect the token usage that model backends report inside this block (traced or not)."""
+    counts = {'input_tokens': 0, 'output_tokens': 0}
+    token = _usage.set(counts)
+    try:
+        yield counts
+    finally:
+        _usage.reset(token)
+
+
+def record_usage(input_tokens=0, output_tokens=0):
+    """Called by model backends with the usage of each request they make."""
+    counts = _usage.get()
+    if counts is not None:
+        counts['input_tokens'] += input_tokens or 0
+        counts['output_tokens'] += output_tokens or 0
+
+
+# ─── Sampling Profiler ───────────────────────────────────────────────
+
+class SamplingProfiler:
+    """Samples the stacks of a trace's threads and records them as nested spans.
+
+    Consecutive samples that share a frame are merged into one span, so the output
+    reads as a flame chart under the regular spans.
+    """
+
+    def __init__(self, trace, interval=PROFILE_INTERVAL):
+        self.trace = trace
+        self.interval = interval
+        self.open = {}  # tid -> [[frame_label, start_us], ...] from the outermost frame
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='trace-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        now = _now_us()
+        for tid in list(self.open):
+            self._update(tid, [], now)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            now = _now_us()
+            frames = sys._current_frames()
+            for tid in list(self.trace.thread_ids):
+                frame = frames.get(tid)
+                self._update(tid, _stack(frame) if frame else [], now)
+
+    def _update(self, tid, stack, now):
+        open_frames = self.open.setdefault(tid, [])
+        same = 0
+        while same < len(open_frames) and same < len(stack) and open_frames[same][0] == stack[same]:
+            same += 1
+        for label, start in reversed(open_frames[same:]):
+            self.trace.add({'name': label, 'cat': 'sample', 'ph': 'X', 'pid': _PROFILE_PID, 'tid': tid,
+                            'ts': round(start, 1), 'dur': round(now - start, 1)})
+        del open_frames[same:]
+        for label in stack[same:]:
+            open_frames.append([label, now])
+
+
+def _stack(frame):
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+# ─── Export and Rendering ────────────────────────────────────────────
+
+def _metadata():
+    return [
+        {'name': 'process_name', 'ph': 'M', 'pid': _PID, 'args': {'name': 'among-us server'}},
+        {'name': 'process_name', 'ph': 'M', 'pid': _PROFILE_PID, 'args': {'name': 'sampling profiler'}},
+    ]
+
+
+def chrome_trace(t):
+    """A trace as a Chrome trace-event JSON object."""
+    return {
+        'traceEvents': _metadata() + sorted(t.events, key=lambda e: e['ts']),
+        'displayTimeUnit': 'ms',
+        'otherData': {'game_id': t.game_id, 'name': t.name, **t.args},
+    }
+
+
+def export(t):
+    """Append a trace's events to TRACE_DIR/<game_id>.json.
+
+    The file uses the JSON array form of the trace-event format, whose closing bracket
+    is optional, so every phase of a game can be appended to the same file.
+    """
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    path = os.path.join(TRACE_DIR, f"{t.game_id}.json")
+    with _export_lock:
+        new_file = not os.path.exists(path)
+        with open(path, 'a') as f:
+            if new_file:
+                f.write("[\n")
+                for event in _metadata():
+                    f.write(json.dumps(event) + ",\n")
+            for event in sorted(t.events, key=lambda e: e['ts']):
+                f.write(json.dumps(event, default=str) + ",\n")
+        t.exported_mtime = os.stat(path).st_mtime_ns
+    return path
+
+
+def cached_trace_count():
+    with _latest_lock:
+        return len(LATEST_TRACES)
+
+
+def latest_trace(game_id):
+    """The game's most recent trace: from memory, or from its exported file when another
+    worker process has appended a newer phase since."""
+    with _latest_lock:
+        cached = LATEST_TRACES.get(game_id)
+    path = os.path.join(TRACE_DIR, f"{game_id}.json") if TRACE_DIR else None
+    if not path or not os.path.exists(path):
+        return cached
+    if cached is not None and cached.exported_mtime == os.stat(path).st_mtime_ns:
+        return cached
+    with open(path) as f:
+        events = json.loads(f.read().rstrip().rstrip(',') + "]")
+
+    roots = [e for e in events if e.get('cat') == 'request']
+    if not roots:
+        return None
+    root = max(roots, key=lambda e: e['ts'])
+    end = root['ts'] + root['dur']
+    t = Trace(game_id, root['name'], dict(root.get('args', {})))
+    t.events = [e for e in events if e.get('ph') == 'X' and root['ts'] <= e['ts'] <= end]
+    return t
+
+
+def timeline_rows(t):
+    """Lay a trace out for templates/trace.html: one row per thread, spans positioned in %."""
+    events = [e for e in t.events if e['ph'] == 'X']
+    if not events:
+        return []
+    t0 = min(e['ts'] for e in events)
+    total = max(e['ts'] + e['dur'] for e in events) - t0 or 1.0
+
+    lanes = {}
+    for e in sorted(events, key=lambda e: (e['ts'], -e['dur'])):
+        lanes.setdefault((e['pid'], e['tid']), []).append(e)
+
+    rows = []
+    for (pid, tid), lane in sorted(lanes.items(), key=lambda kv: kv[1][0]['ts']):
+        stack, bars = [], []
+        for e in lane:
+            while stack and stack[-1] <= e['ts']:
+                stack.pop()
+            bars.append({
+                'name': e['name'], 'cat': e['cat'], 'depth': len(stack), 'args': e.get('args', {}),
+                'ms': round(e['dur'] / 1000, 2),
+                'left': round((e['ts'] - t0) / total * 100, 3),
+                'width': max(round(e['dur'] / total * 100, 3), 0.05),
+            })
+            stack.append(e['ts'] + e['dur'])
+        rows.append({
+            'label': f"{'profiler' if pid == _PROFILE_PID else 'thread'} {tid}",
+            'depth': max(b['depth'] for b in bars) + 1,
+            'bars': bars,
+        })
+    return rows
+
+
+def span_totals(t):
+    """Count and total time per span name, largest first (sampled frames excluded)."""
+    totals = {}
+    for e in t.events:
+        if e['ph'] != 'X' or e['cat'] == 'sample':
+            continue
+        entry = totals.setdefault(e['name'], {'name': e['name'], 'cat': e['cat'], 'count': 0, 'ms': 0.0})
+        entry['count'] += 1
+        entry['ms'] += e['dur'] / 1000
+    for entry in totals.values():
+        entry['ms'] = round(entry['ms'], 2)
+    return sorted(totals.values(), key=lambda e: -e['ms'])
@@ -0,0 +1,10 @@
+from app import app
+
+# WSGI entry point for production serving:
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Every worker opens the shared game store (AMONG_US_STORE), so requests for
+# the same game can land on any worker.
+
+application = app